@@ -8,6 +8,7 @@ class AILogAdmin(admin.ModelAdmin):
     """
     # Mostra estas colunas na lista de logs
     list_display = ('timestamp', 'user', 'duration_ms', 'cost')
+    list_select_related = ('user',)
     
     # Adiciona filtros na lateral direita
     list_filter = ('timestamp', 'user')
@@ -0,0 +1,130 @@
+import json
+import logging
+import re
+from types import SimpleNamespace
+from typing import Optional
+
+from django.conf import settings
+
+from core.fakes import LatencyModel
+
+logger = logging.getLogger(__name__)
+
+# Palavras-chave das mensagens e a intenção que o Gemini falso devolve para elas.
+INTENT_RULES = (
+    (r'\b(resumo|relat[oó]rio)\b', 'pedir_resumo'),
+    (r'\btend[eê]ncia\b', 'pedir_tendencia'),
+    (r'\bcategorias\b', 'pedir_categorias'),
+    (r'\b(saldo|extrato)\b', 'pedir_saldo'),
+    (r'\b(ajuda|help)\b', 'pedir_ajuda'),
+    (r'\b(apagar|deletar) [uú]ltima\b', 'deletar_despesa'),
+    (r'\b(obrigad[oa]|valeu)\b', 'agradecimento'),
+    (r'\b(oi|ol[aá]|bom dia|boa tarde|boa noite)\b', 'saudacao'),
+)
+AMOUNT_PATTERN = re.compile(r'(\d+(?:[.,]\d{1,2})?)')
+INCOME_PATTERN = re.compile(r'\b(recebi|ganhei|sal[aá]rio)\b')
+EDIT_PATTERN = re.compile(r'\b(editar|corrigir|alterar)\b')
+
+
+class FakeGeminiError(Exception):
+    """
+    Falha simulada pelo Gemini falso (FAKE_AI_ERROR_RATE), no lugar dos erros da API real.
+    """
+
+
+class FakeGenerativeModel:
+    """
+    Substituto local do `genai.GenerativeModel`, ativado com AI_BACKEND='fake', para testes de carga sem rede.
+
+    Responde com a mesma interface (`generate_content(prompt).text`) depois de uma latência sorteada
+    (FAKE_AI_LATENCY_MEDIAN_MS / FAKE_AI_LATENCY_P99_MS) e falha numa fração FAKE_AI_ERROR_RATE das chamadas.
+    As respostas vêm de FAKE_AI_RESPONSES_FILE (trecho do prompt -> resposta), quando configurado, ou de regras simples
+    sobre o texto do usuário, no formato JSON que os prompts pedem.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.latency = LatencyModel(
+            settings.FAKE_AI_LATENCY_MEDIAN_MS, settings.FAKE_AI_LATENCY_P99_MS, settings.FAKE_AI_ERROR_RATE,
+        )
+
+    def generate_content(self, prompt: str) -> SimpleNamespace:
+        self.latency.wait()
+        if self.latency.should_fail():
+            raise FakeGeminiError("Falha simulada do Gemini falso.")
+        return SimpleNamespace(text=_canned_response(prompt) or _rule_based_response(prompt))
+
+
+def _canned_response(prompt: str) -> Optional[str]:
+    for match, response in _load_canned_responses():
+        if match in prompt:
+            return response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+    return None
+
+
+_canned_cache: dict = {}
+
+
+def _load_canned_responses() -> list:
+    """
+    Lê FAKE_AI_RESPONSES_FILE: uma lista JSON de {"match": "trecho do prompt", "response": texto ou objeto}.
+    """
+    path = settings.FAKE_AI_RESPONSES_FILE
+    if not path:
+        return []
+    if path not in _canned_cache:
+        with open(path, encoding='utf-8') as responses_file:
+            _canned_cache[path] = [(item['match'], item['response']) for item in json.load(responses_file)]
+    return _canned_cache[path]
+
+
+def _rule_based_response(prompt: str) -> str:
+    if '### Lançamentos:' in prompt:
+        return _categorize_batch(prompt)
+    # O texto do usuário vem no fim do prompt; os exemplos do prompt usam o mesmo formato antes dele.
+    user_texts = re.findall(r'Texto do usuário: (.*)\nSua saída:', prompt)
+    if not user_texts:
+        # Prompts sem texto do usuário (ex: insights do resumo mensal) recebem um texto fixo.
+        return "*Observação Principal* 💡\nSeus gastos seguem estáveis neste mês.\n\n*Dica* ✅\nContinue registrando tudo."
+    return json.dumps(_interpret(user_texts[-1].strip().lower(), _categories(prompt)), ensure_ascii=False)
+
+
+def _interpret(text: str, categories: list[str]) -> dict:
+    if EDIT_PATTERN.search(text):
+        amount_match = AMOUNT_PATTERN.search(text)
+        return {"intent": "editar_despesa", "amount": float(amount_match.group(1).replace(',', '.')) if amount_match else None,
+                "description": None}
+    for pattern, intent in INTENT_RULES:
+        if re.search(pattern, text):
+            return {"intent": intent, "months": None} if intent == 'pedir_tendencia' else {"intent": intent}
+    amount_match = AMOUNT_PATTERN.search(text)
+    if amount_match:
+        amount = float(amount_match.group(1).replace(',', '.'))
+        description = (text[:amount_match.start()] + text[amount_match.end():]).strip() or "sem descrição"
+        if INCOME_PATTERN.search(text):
+            return {"intent": "registrar_renda", "amount": amount, "description": description}
+        return {"intent": "registrar_despesa", "amount": amount, "description": description, "category": _fallback_category(categories)}
+    return {"intent": "indefinido"}
+
+
+def _categorize_batch(prompt: str) -> str:
+    descriptions_text = prompt.split('### Lançamentos:', 1)[1].split('-----', 1)[0]
+    try:
+        descriptions = json.loads(descriptions_text.strip())
+    except json.JSONDecodeError:
+        logger.warning("Fake Gemini could not read the descriptions list from the prompt.")
+        descriptions = []
+    category = _fallback_category(_categories(prompt))
+    return json.dumps({description: category for description in descriptions}, ensure_ascii=False)
+
+
+def _categories(prompt: str) -> list[str]:
+    match = re.search(r'### Categorias Disponíveis[^\n]*:\s*\n\s*(.*)\n', prompt)
+    return [name.strip() for name in match.group(1).split(',') if name.strip()] if match else []
+
+
+def _fallback_category(categories: list[str]) -> str:
+    # Como o prompt pede, "Outros" quando existir; senão, a primeira categoria do usuário.
+    if "Outros" in categories or not categories:
+        return "Outros"
+    return categories[0]
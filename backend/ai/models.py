@@ -1,12 +1,13 @@
 from django.db import models
 from django.conf import settings
-import uuid
+
+from core.ids import uuid7
 
 class AILog(models.Model):
     """
     Registra cada interação com a API da IA para depuração, análise e custos.
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     prompt_sent = models.TextField()
     response_received = models.TextField()
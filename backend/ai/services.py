@@ -6,14 +6,42 @@ from typing import Optional, Dict
 from pathlib import Path
 
 from django.conf import settings
+from django.utils import timezone
 import google.generativeai as genai
 
+from core.logs import log_payload
+from core.tracing import span
 from users.models import User
 from .models import AILog
 from expenses.models import Category
 
 logger = logging.getLogger(__name__)
 
+def extract_json_object(response_str: str) -> Optional[dict]:
+    """
+    Extrai o objeto JSON da resposta da IA, que pode vir cercado de texto ou de um bloco de código.
+    Retorna None se não houver um objeto JSON válido.
+    """
+    json_match = re.search(r'\{.*\}', response_str, re.DOTALL)
+    if json_match is None:
+        return None
+    try:
+        parsed = json.loads(json_match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _generative_model(model_name: str):
+    """
+    Modelo do Gemini, ou o substituto local quando AI_BACKEND='fake' (testes de carga sem rede).
+    """
+    if settings.AI_BACKEND == 'fake':
+        from .fakes import FakeGenerativeModel
+        return FakeGenerativeModel(model_name)
+    return genai.GenerativeModel(model_name)
+
+
 class AIService:
     """
     Serviço responsável por analisar o texto das mensagens dos usuários.
@@ -25,13 +53,13 @@ class AIService:
         try:
             genai.configure(api_key=settings.GEMINI_API_KEY)
         except Exception as e:
-            logger.critical(f"Falha ao configurar a API do Gemini: {e}")
+            logger.critical("Falha ao configurar a API do Gemini: %s", e)
 
     def interpret_message(self, message_text: str) -> Dict:
         """
         Usa a IA para interpretar a intenção do usuário e extrair dados, retornando um JSON.
         """
-        system_prompt_template = self._load_prompt_from_file('interprete_de_comandos_v2')
+        system_prompt_template = self._load_prompt_from_file('interprete_de_comandos_v3')
         if not system_prompt_template:
             return {"intent": "indefinido"}
 
@@ -41,21 +69,21 @@ class AIService:
         system_prompt = system_prompt_template.replace(
             "{{CATEGORIES_LIST}}", 
             ", ".join(category_names)
+        ).replace(
+            "{{CURRENT_DATE}}",
+            timezone.localdate().isoformat()
         )
 
         final_prompt = f"{system_prompt}\n\nTexto do usuário: {message_text}\nSua saída:"
         
         response_str = self._call_gemini_api(final_prompt)
-        logger.info(f"--- RESPOSTA BRUTA DA IA ---\n{response_str}\n-----------------------------")
+        log_payload(logger, logging.DEBUG, "Raw AI response for user %s", response_str, self.user.id)
         
-        try:
-            json_match = re.search(r'\{.*\}', response_str, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            raise json.JSONDecodeError
-        except (json.JSONDecodeError, AttributeError):
-            logger.error(f"Failed to parse JSON from AI response for user {self.user.id}. Raw: '{response_str}'")
+        ai_plan = extract_json_object(response_str)
+        if ai_plan is None:
+            log_payload(logger, logging.ERROR, "Failed to parse JSON from AI response for user %s", response_str, self.user.id)
             return {"intent": "indefinido"}
+        return ai_plan
 
     def _load_prompt_from_file(self, prompt_name: str) -> Optional[str]:
         """
@@ -66,7 +94,7 @@ class AIService:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return f.read()
         except FileNotFoundError:
-            logger.error(f"Prompt file not found: {prompt_name}.txt")
+            logger.error("Prompt file not found: %s.txt", prompt_name)
             return None
 
     def _call_gemini_api(self, prompt: str) -> str:
@@ -74,9 +102,11 @@ class AIService:
         Chama a API Gemini com o prompt fornecido e retorna a resposta como string.
         """
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash-lite')
+            model = _generative_model('gemini-2.5-flash-lite')
+            log_payload(logger, logging.DEBUG, "Prompt sent to Gemini for user %s", prompt, self.user.id)
             start_time = time.time()
-            response = model.generate_content(prompt)
+            with span('gemini.generate_content', **{'gen_ai.request.model': 'gemini-2.5-flash-lite', 'gen_ai.prompt_chars': len(prompt)}):
+                response = model.generate_content(prompt)
             end_time = time.time()
             duration_ms = max(0, int((end_time - start_time) * 1000))
             # Criamos o log aqui para registrar toda e qualquer chamada à IA
@@ -87,17 +117,17 @@ class AIService:
                 duration_ms=duration_ms
             )
 
-            logger.info(f"Main AI call for user {self.user.id} successful. Duration: {duration_ms}ms.")
+            logger.info("Main AI call for user %s successful. Duration: %sms.", self.user.id, duration_ms)
             return response.text
         except Exception:
-            logger.error(f"Error calling Gemini API for user {self.user.id}.", exc_info=True)
+            logger.error("Error calling Gemini API for user %s.", self.user.id, exc_info=True)
             return "{}" # Retorna um JSON vazio em caso de erro
         
     def generate_insight(self, summary_data: dict) -> str:
         """
         Usa a IA para gerar um insight a partir de dados financeiros estruturados.
         """
-        prompt_template = self._load_prompt_from_file('gerador_de_insights_v1')
+        prompt_template = self._load_prompt_from_file('gerador_de_insights_v2')
         if not prompt_template: return "Fique de olho nos seus gastos para alcançar seus objetivos!"
 
         # Formata os dados para incluir no prompt
@@ -109,6 +139,35 @@ class AIService:
         
         return self._call_gemini_api(final_prompt)
     
+    def categorize_descriptions(self, descriptions: list) -> Dict:
+        """
+        Usa a IA para categorizar, em uma única chamada, um lote de descrições de extrato.
+        Retorna um dicionário {descrição: categoria}, apenas com categorias existentes do usuário.
+        """
+        prompt_template = self._load_prompt_from_file('categorizador_em_lote_v1')
+        if not prompt_template or not descriptions:
+            return {}
+
+        category_names = list(Category.objects.filter(user=self.user).values_list('name', flat=True))
+        system_prompt = prompt_template.replace(
+            "{{CATEGORIES_LIST}}", ", ".join(category_names)
+        ).replace(
+            "{{DESCRIPTIONS_LIST}}", json.dumps(descriptions, ensure_ascii=False)
+        )
+
+        response_str = self._call_gemini_api(self._build_final_prompt_without_history(system_prompt))
+        categories = extract_json_object(response_str)
+        if categories is None:
+            logger.error("Failed to parse batch categorization from AI response for user %s.", self.user.id)
+            return {}
+
+        valid_names = set(category_names)
+        return {
+            description: category
+            for description, category in categories.items()
+            if description in descriptions and category in valid_names
+        }
+
     def _build_final_prompt_without_history(self, system_prompt: str) -> str:
         """
         Constrói um prompt final para a IA sem incluir um histórico de conversa.
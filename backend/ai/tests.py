@@ -1,3 +1,58 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from expenses.models import Category
+from users.models import User
+from .models import AILog
+from .services import AIService, extract_json_object
+
+
+@override_settings(AI_BACKEND='fake', FAKE_AI_LATENCY_MEDIAN_MS=0, FAKE_AI_LATENCY_P99_MS=0, FAKE_AI_ERROR_RATE=0)
+class FakeAIBackendTests(TestCase):
+    """
+    Suite de testes para o Gemini falso usado nos testes de carga.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(phone_number='5511999990000', username='5511999990000')
+        Category.objects.create(user=self.user, name='Alimentação')
+
+    def test_interprets_expense_from_user_text(self):
+        """
+        Garante que o Gemini falso devolve uma despesa no formato do prompt, com uma categoria do usuário.
+        """
+        plan = AIService(self.user).interpret_message("15,90 padaria")
+
+        self.assertEqual(plan, {"intent": "registrar_despesa", "amount": 15.9, "description": "padaria", "category": "Alimentação"})
+        self.assertEqual(AILog.objects.filter(user=self.user).count(), 1)
+
+    def test_simulated_errors_fall_back_like_real_failures(self):
+        """
+        Garante que as falhas simuladas passam pelo mesmo tratamento de erro das falhas da API real.
+        """
+        with override_settings(FAKE_AI_ERROR_RATE=1):
+            plan = AIService(self.user).interpret_message("oi")
+
+        # O _call_gemini_api devolve "{}" em qualquer falha da API.
+        self.assertEqual(plan, {})
+        self.assertFalse(AILog.objects.exists())
+
+
+class ExtractJsonObjectTests(TestCase):
+    """
+    Suite de testes para a extração do JSON das respostas da IA.
+    """
+
+    def test_extracts_object_surrounded_by_text(self):
+        """
+        Garante que o objeto é extraído mesmo dentro de um bloco de código com texto ao redor.
+        """
+        response = 'Aqui está:\n```json\n{"intent": "pedir_resumo"}\n```'
+
+        self.assertEqual(extract_json_object(response), {"intent": "pedir_resumo"})
+
+    def test_returns_none_without_valid_object(self):
+        """
+        Garante que respostas sem um objeto JSON válido retornam None, em vez de levantar.
+        """
+        self.assertIsNone(extract_json_object("Desculpe, não entendi."))
+        self.assertIsNone(extract_json_object('{"intent": '))
@@ -0,0 +1,276 @@
+"""
+Micro-benchmarks das funções mais quentes da camada de serviços.
+
+Roda num banco de teste criado na hora (com o SQLite padrão, em memória), com o Gemini falso (AI_BACKEND='fake',
+sem latência) e o servidor falso da Graph API no próprio processo. Para cada tamanho de fixture, um usuário recebe
+N despesas espalhadas pelo mês corrente e são medidos:
+
+- WebhookService.process_payload (usuário existente registrando uma despesa; e usuário novo);
+- WebhookService._find_or_create_user (existente e novo);
+- create_expense_from_ai_plan;
+- generate_or_get_monthly_summary (do cache e regenerado);
+- get_monthly_summary_reply (cache frio e quente);
+- _format_summary_message e a extração do JSON da resposta da IA (extract_json_object).
+
+Cada caso roda dentro de uma transação desfeita ao final, para não alterar a fixture dos seguintes, e registra o
+tempo por chamada (média, p50, p95, mínimo) e as consultas ao banco por chamada. Os logs abaixo de WARNING são
+desligados durante a medição. O resultado é gravado em JSON; `--baseline` compara com uma execução anterior e
+aponta as regressões (p50 acima de `--threshold` ou mais consultas).
+
+Uso (a partir de `backend/`):
+    python -m benchmarks.hot_paths --expenses 1000 --expenses 100000 --baseline benchmark_reports/<anterior>.json
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from ai.services import extract_json_object  # noqa: E402
+from benchmarks.reports import git_commit, read_report, write_report  # noqa: E402
+from core.fakes import LatencyModel  # noqa: E402
+from core.instrumentation import track_queries  # noqa: E402
+from expenses.models import Category, Expense  # noqa: E402
+from expenses.services import create_default_categories_for_user, create_expense_from_ai_plan  # noqa: E402
+from incomes.models import Income  # noqa: E402
+from meta.fakes import FakeGraphServer  # noqa: E402
+from meta.replies import get_monthly_summary_reply  # noqa: E402
+from meta.services import WebhookService  # noqa: E402
+from payments.models import PaymentMethod  # noqa: E402
+from payments.services import create_default_payment_methods_for_user  # noqa: E402
+from summaries.services import _format_summary_message, generate_or_get_monthly_summary  # noqa: E402
+from users.models import User  # noqa: E402
+from users.services import bump_data_version  # noqa: E402
+
+REPORT_VERSION = 1
+BATCH_SIZE = 5_000
+DESCRIPTIONS = ('mercado', 'padaria', 'uber', 'farmácia', 'almoço', 'gasolina', 'cinema', 'ifood', 'aluguel', 'academia')
+AI_RESPONSES = {
+    'clean': '{"intent": "registrar_despesa", "amount": 35.9, "description": "mercado", "category": "Alimentação"}',
+    'fenced': 'Claro! Aqui está:\n```json\n{"intent": "pedir_resumo"}\n```\nPosso ajudar em algo mais?',
+    'invalid': 'Desculpe, não entendi a mensagem.',
+}
+SUMMARY_DATA = {
+    'total_income': '8500.00', 'total_expenses': '6234.50', 'balance': '2265.50',
+    'categories': [{'name': name, 'total': f"{300 + index * 57.3:.2f}"} for index, name in enumerate(DESCRIPTIONS)],
+    'payment_methods': [{'name': name, 'total': '1500.00'} for name in ('Crédito', 'Débito', 'Pix', 'Dinheiro')],
+}
+INSIGHTS = "*Observação Principal* 💡\nSeus gastos com alimentação subiram 12% em relação ao mês passado."
+
+
+def _create_fixture_user(expenses: int) -> User:
+    """
+    Cria um usuário com as categorias e formas de pagamento padrão, uma renda e `expenses` despesas no mês corrente.
+    """
+    phone_number = f"5597{expenses:09d}"
+    user = User.objects.create_user(username=phone_number, phone_number=phone_number, first_name="Bench")
+    create_default_categories_for_user(user)
+    create_default_payment_methods_for_user(user)
+    categories = list(Category.objects.filter(user=user))
+    payment_methods = list(PaymentMethod.objects.filter(user=user)) or [None]
+
+    rng = random.Random(expenses)
+    now = timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_seconds = max((now - month_start).total_seconds() - 60, 1)
+    Income.objects.create(user=user, amount=Decimal('8500.00'), description="Salário", income_type='FIXA', transaction_date=month_start)
+    for offset in range(0, expenses, BATCH_SIZE):
+        Expense.objects.bulk_create([
+            Expense(
+                user=user, category=rng.choice(categories), payment_method=rng.choice(payment_methods),
+                amount=Decimal(rng.randint(100, 30_000)) / 100, description=rng.choice(DESCRIPTIONS),
+                transaction_date=month_start + timedelta(seconds=rng.uniform(0, month_seconds)),
+            )
+            for _ in range(min(BATCH_SIZE, expenses - offset))
+        ])
+    # Deixa o resumo do mês pronto, como estaria em produção, para o caso "do cache".
+    generate_or_get_monthly_summary(user)
+    return user
+
+
+def _webhook_payload(wa_id: str, wamid: str, text: str) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"field": "messages", "value": {
+            "contacts": [{"profile": {"name": "Bench User"}, "wa_id": wa_id}],
+            "messages": [{"from": wa_id, "id": wamid, "timestamp": str(int(time.time())), "type": "text", "text": {"body": text}}],
+        }}]}],
+    }
+
+
+def _fixture_cases(user: User) -> dict:
+    """
+    Casos que dependem do tamanho da fixture. Cada função recebe o número da chamada, para gerar ids únicos.
+    """
+    tag = user.phone_number[-6:]
+
+    def cold_summary_reply(call: int):
+        # Na produção, a versão dos dados do usuário muda a cada escrita; aqui ela é trocada a cada chamada.
+        bump_data_version(user.id)
+        return get_monthly_summary_reply(user)
+
+    return {
+        'process_payload': lambda call: WebhookService(received_at=time.time()).process_payload(
+            _webhook_payload(user.phone_number, f"wamid.BENCH{tag}{call:08d}", "35,90 mercado")
+        ),
+        'find_or_create_user.existing': lambda call: WebhookService()._find_or_create_user(user.phone_number, "Bench User"),
+        'create_expense_from_ai_plan': lambda call: create_expense_from_ai_plan(
+            user, {"amount": 35.9, "description": "mercado", "category": "Alimentação"}
+        ),
+        'generate_or_get_monthly_summary.cached': lambda call: generate_or_get_monthly_summary(user),
+        'generate_or_get_monthly_summary.regenerate': lambda call: generate_or_get_monthly_summary(user, force_regenerate=True),
+        'get_monthly_summary_reply.cold': cold_summary_reply,
+        'get_monthly_summary_reply.warm': lambda call: get_monthly_summary_reply(user),
+    }
+
+
+def _standalone_cases() -> dict:
+    """
+    Casos que não dependem da fixture.
+    """
+    cases = {
+        'process_payload.new_user': lambda call: WebhookService(received_at=time.time()).process_payload(
+            _webhook_payload(f"5596{call:09d}", f"wamid.BENCHNEW{call:08d}", "oi")
+        ),
+        'find_or_create_user.new': lambda call: WebhookService()._find_or_create_user(f"5595{call:09d}", "Bench User"),
+        '_format_summary_message': lambda call: _format_summary_message("Outubro", SUMMARY_DATA, INSIGHTS),
+    }
+    for label, response in AI_RESPONSES.items():
+        cases[f"extract_json_object.{label}"] = lambda call, response=response: extract_json_object(response)
+    return cases
+
+
+def measure(name: str, function, min_runs: int, max_runs: int, min_seconds: float) -> dict:
+    """
+    Roda `function` até `min_runs` vezes e por pelo menos `min_seconds` (sem passar de `max_runs`), dentro de uma
+    transação desfeita ao final. A primeira chamada aquece caches e conexões e conta as consultas.
+    """
+    with transaction.atomic():
+        with track_queries('benchmark', name, record=False) as tracker:
+            function(0)
+        durations = []
+        start = time.perf_counter()
+        while len(durations) < max_runs and (len(durations) < min_runs or time.perf_counter() - start < min_seconds):
+            call_start = time.perf_counter()
+            function(len(durations) + 1)
+            durations.append(time.perf_counter() - call_start)
+        transaction.set_rollback(True)
+
+    durations.sort()
+    return {
+        'name': name,
+        'runs': len(durations),
+        'mean_us': round(sum(durations) / len(durations) * 1_000_000, 1),
+        'p50_us': round(durations[len(durations) // 2] * 1_000_000, 1),
+        'p95_us': round(durations[min(int(len(durations) * 0.95), len(durations) - 1)] * 1_000_000, 1),
+        'min_us': round(durations[0] * 1_000_000, 1),
+        'queries': tracker.count,
+    }
+
+
+def run(args) -> list[dict]:
+    results = []
+    for name, function in _standalone_cases().items():
+        if args.only is None or args.only in name:
+            results.append({'expenses': None, **measure(name, function, args.min_runs, args.max_runs, args.min_seconds)})
+            _print_result(results[-1])
+    for expenses in args.expenses or [1_000, 100_000]:
+        user = _create_fixture_user(expenses)
+        for name, function in _fixture_cases(user).items():
+            if args.only is None or args.only in name:
+                results.append({'expenses': expenses, **measure(name, function, args.min_runs, args.max_runs, args.min_seconds)})
+                _print_result(results[-1])
+    return results
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+    Compara com um relatório anterior. Retorna os casos com regressão.
+    """
+    previous = {(result['name'], result['expenses']): result for result in baseline['results']}
+    regressions = []
+    print(f"\n{'comparação com a referência':<48} {'despesas':>9} {'p50 antes':>11} {'p50 agora':>11} {'var.':>7} {'consultas':>10}")
+    for result in results:
+        key = (result['name'], result['expenses'])
+        if key not in previous:
+            continue
+        before = previous[key]
+        change = (result['p50_us'] - before['p50_us']) / before['p50_us'] if before['p50_us'] else 0.0
+        regressed = change > threshold or result['queries'] > before['queries']
+        if regressed:
+            regressions.append(f"{result['name']} ({result['expenses'] or '-'})")
+        print(f"{result['name']:<48} {result['expenses'] or '-':>9} {before['p50_us']:>11} {result['p50_us']:>11} "
+              f"{change:>+7.0%} {before['queries']:>4} -> {result['queries']:<4}{'  REGRESSÃO' if regressed else ''}")
+    return regressions
+
+
+def _print_result(result: dict):
+    print(f"{result['name']:<48} {result['expenses'] or '-':>9} {result['runs']:>6} {result['mean_us']:>12} "
+          f"{result['p50_us']:>12} {result['p95_us']:>12} {result['queries']:>9}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--expenses', type=int, action='append', help="Despesas da fixture (pode repetir). Padrão: 1k e 100k.")
+    parser.add_argument('--only', help="Roda só os casos cujo nome contém este trecho.")
+    parser.add_argument('--min-runs', type=int, default=20)
+    parser.add_argument('--max-runs', type=int, default=2_000)
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="Tempo mínimo de medição por caso.")
+    parser.add_argument('--output', help="Arquivo do relatório (padrão: benchmark_reports/hot_paths-<data>.json).")
+    parser.add_argument('--baseline', help="Relatório anterior para comparação.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Aumento do p50 considerado regressão (0.2 = 20%%).")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Sai com código 1 se houver regressão.")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_database_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    graph_server = FakeGraphServer(('127.0.0.1', 0), LatencyModel(0, 0))
+    threading.Thread(target=graph_server.serve_forever, daemon=True).start()
+    fakes = override_settings(
+        AI_BACKEND='fake', FAKE_AI_LATENCY_MEDIAN_MS=0, FAKE_AI_LATENCY_P99_MS=0, FAKE_AI_ERROR_RATE=0,
+        FAKE_AI_RESPONSES_FILE=None, META_GRAPH_BASE_URL=f"http://127.0.0.1:{graph_server.server_port}",
+    )
+    logging.disable(logging.INFO)
+    try:
+        with fakes:
+            print(f"Banco: {connection.vendor}")
+            print(f"{'caso':<48} {'despesas':>9} {'runs':>6} {'média (µs)':>12} {'p50 (µs)':>12} {'p95 (µs)':>12} {'consultas':>9}")
+            results = run(args)
+    finally:
+        logging.disable(logging.NOTSET)
+        graph_server.shutdown()
+        connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+    report = {
+        'version': REPORT_VERSION,
+        'started_at': timezone.localtime().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'database': connection.vendor,
+        'params': {key: getattr(args, key) for key in ('expenses', 'min_runs', 'max_runs', 'min_seconds')},
+        'results': results,
+    }
+    output = write_report(report, 'hot_paths', args.output)
+    baseline = read_report(args.baseline)
+    regressions = compare(results, baseline, args.threshold) if baseline else []
+    print(f"\nRelatório gravado em {output}")
+    if regressions:
+        print(f"Regressões: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
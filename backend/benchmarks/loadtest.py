@@ -0,0 +1,398 @@
+"""
+Teste de carga de ponta a ponta do pipeline do WhatsApp.
+
+Gera conversas com um mix realista (usuários novos, registros e edições de despesas, resumos e pedidos de ajuda),
+posta os webhooks assinados (X-Hub-Signature-256) em `api/meta/webhook/` a uma taxa alvo e liga cada resposta
+enviada ao servidor falso da Graph API (`manage.py fake_graph_server`) à mensagem que a originou: pelo
+`context.message_id` da resposta ou, nas saudações de usuários novos, pela mensagem mais antiga sem resposta do
+mesmo número.
+
+O relatório traz a vazão, a distribuição do tempo entre o webhook e a resposta (geral e por cenário), a latência
+de aceite do webhook, a profundidade da fila 'interactive', os webhooks adiados e as variações no banco.
+Ele é gravado em JSON com o mesmo formato a cada execução; `--baseline` compara com um relatório anterior.
+
+Uso, contra o docker-compose com as APIs externas falsas:
+    docker-compose -f docker-compose.yml -f docker-compose.loadtest.yml up -d
+    docker-compose -f docker-compose.yml -f docker-compose.loadtest.yml exec web \\
+        python -m benchmarks.loadtest --rate 20 --duration 120 --baseline loadtest_reports/anterior.json
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import django
+import requests
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from ai.models import AILog  # noqa: E402
+from benchmarks.reports import git_commit, read_report, write_report  # noqa: E402
+from expenses.models import Expense  # noqa: E402
+from meta.backpressure import measure_queue_depth  # noqa: E402
+from meta.models import DeferredWebhook, FailedWebhook, Message  # noqa: E402
+
+REPORT_VERSION = 1
+DEFAULT_MIX = 'new_user=10,expense=45,edit=10,summary=15,help=20'
+EXPENSE_DESCRIPTIONS = ('mercado', 'padaria', 'uber', 'farmácia', 'almoço', 'gasolina', 'cinema', 'ifood')
+# Métricas comparadas com o relatório de referência (`--baseline`): caminho no relatório e se maior é melhor.
+COMPARED_METRICS = (
+    (('throughput', 'replied_per_second'), True),
+    (('latency_ms', 'received_to_replied', 'all', 'p50'), False),
+    (('latency_ms', 'received_to_replied', 'all', 'p95'), False),
+    (('latency_ms', 'received_to_replied', 'all', 'p99'), False),
+    (('latency_ms', 'webhook_accept', 'p99'), False),
+    (('errors', 'unreplied'), False),
+    (('queue', 'max_depth'), False),
+)
+
+
+@dataclass
+class Inbound:
+    wamid: str
+    wa_id: str
+    scenario: str
+    measured: bool
+    posted_at: float = 0.0
+    status: Optional[int] = None
+    accept_seconds: Optional[float] = None
+    replied_at: Optional[float] = None
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = _parse_mix(args.mix)
+        # Números únicos por execução, para que os "usuários novos" sejam de fato novos no banco.
+        self.run_tag = f"{int(time.time()) % 100_000:05d}"
+        self.inbound: dict[str, Inbound] = {}
+        self.pending_by_sender: dict[str, deque] = defaultdict(deque)
+        self.known_users: list[str] = []
+        self.new_users = 0
+        self.unmatched_sends = 0
+        self.queue_samples: list[tuple[Optional[int], int]] = []
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+
+    # --------------------------------------------------------------------------
+    # Geração das mensagens
+    # --------------------------------------------------------------------------
+    def _next_message(self, index: int, measured: bool, scenario: Optional[str] = None) -> tuple[Inbound, str]:
+        scenario = scenario or self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if scenario == 'new_user' or not self.known_users:
+            scenario = 'new_user'
+            self.new_users += 1
+            wa_id = f"5599{self.run_tag}{self.new_users:06d}"
+            self.known_users.append(wa_id)
+        else:
+            wa_id = self._idle_user()
+        message = Inbound(wamid=f"wamid.LOADTEST{self.run_tag}{index:08d}", wa_id=wa_id, scenario=scenario, measured=measured)
+        return message, self._message_text(scenario)
+
+    def _idle_user(self) -> str:
+        # Usuários reais esperam a resposta antes de mandar a próxima mensagem; prefere quem não tem pendências.
+        with self.lock:
+            for _ in range(5):
+                wa_id = self.rng.choice(self.known_users)
+                if not self.pending_by_sender[wa_id]:
+                    break
+        return wa_id
+
+    def _message_text(self, scenario: str) -> str:
+        if scenario == 'new_user':
+            return self.rng.choice(("oi", "olá", "bom dia"))
+        if scenario == 'expense':
+            return f"{self.rng.uniform(5, 300):.2f}".replace('.', ',') + " " + self.rng.choice(EXPENSE_DESCRIPTIONS)
+        if scenario == 'edit':
+            return f"corrigir última para {self.rng.randint(5, 300)}"
+        if scenario == 'summary':
+            return self.rng.choice(("resumo", "me manda o resumo do mês"))
+        return self.rng.choice(("ajuda", "não sei usar, ajuda"))
+
+    # --------------------------------------------------------------------------
+    # Envio dos webhooks
+    # --------------------------------------------------------------------------
+    def _post(self, message: Inbound, text: str):
+        body = json.dumps(_webhook_payload(message, text)).encode()
+        signature = hmac.new(self.args.app_secret.encode(), body, hashlib.sha256).hexdigest()
+        with self.lock:
+            self.inbound[message.wamid] = message
+            self.pending_by_sender[message.wa_id].append(message.wamid)
+        message.posted_at = time.time()
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.args.url, data=body, timeout=30,
+                headers={'Content-Type': 'application/json', 'X-Hub-Signature-256': f"sha256={signature}"},
+            )
+            message.status = response.status_code
+        except requests.RequestException:
+            message.status = 0
+        message.accept_seconds = time.perf_counter() - start
+
+    def _send_phase(self, count: int, measured: bool, first_index: int, scenario: Optional[str] = None) -> float:
+        """
+        Posta `count` mensagens em ritmo aberto (a taxa não cai se o sistema atrasar). Retorna a duração da fase.
+        """
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for offset in range(count):
+                wait = start + offset / self.args.rate - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                message, text = self._next_message(first_index + offset, measured, scenario)
+                pool.submit(self._post, message, text)
+        return time.monotonic() - start
+
+    def _wait_replies(self, messages: list[Inbound]):
+        deadline = time.monotonic() + self.args.drain_timeout
+        while time.monotonic() < deadline:
+            if all(message.replied_at or (message.status is not None and message.status != 200) for message in messages):
+                return
+            time.sleep(0.25)
+
+    # --------------------------------------------------------------------------
+    # Coleta das respostas e da fila
+    # --------------------------------------------------------------------------
+    def _collect_replies(self, stop: threading.Event):
+        last_seq = self._graph_sends(2 ** 62)['last_seq']
+        while True:
+            final = stop.is_set()
+            try:
+                data = self._graph_sends(last_seq)['data']
+            except requests.RequestException:
+                data = []
+            for send in data:
+                last_seq = send['seq']
+                self._match_reply(send)
+            if final:
+                return
+            time.sleep(0.25)
+
+    def _graph_sends(self, after: int) -> dict:
+        response = requests.get(f"{self.args.graph_url}/_fake/sends", params={'after': after}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _match_reply(self, send: dict):
+        with self.lock:
+            message = self.inbound.get(send['context_id']) if send['context_id'] else None
+            pending = self.pending_by_sender.get(send['to'])
+            if message is None and pending:
+                # Sem `context` (saudação de usuário novo): a resposta é da mensagem mais antiga ainda sem resposta.
+                message = self.inbound[pending[0]]
+            if message is None or message.replied_at is not None:
+                self.unmatched_sends += 1
+                return
+            message.replied_at = send['sent_at']
+            if pending and message.wamid in pending:
+                pending.remove(message.wamid)
+
+    def _sample_queue(self, stop: threading.Event):
+        try:
+            while not stop.wait(1.0):
+                self.queue_samples.append((measure_queue_depth(), DeferredWebhook.objects.count()))
+        finally:
+            connection.close()
+
+    # --------------------------------------------------------------------------
+    # Execução
+    # --------------------------------------------------------------------------
+    def run(self) -> dict:
+        stop = threading.Event()
+        collector = threading.Thread(target=self._collect_replies, args=(stop,), daemon=True)
+        sampler = threading.Thread(target=self._sample_queue, args=(stop,), daemon=True)
+        collector.start()
+
+        # Aquecimento: cada usuário da base recebe a saudação de usuário novo antes da fase medida.
+        self._send_phase(self.args.users, measured=False, first_index=0, scenario='new_user')
+        self._wait_replies(list(self.inbound.values()))
+
+        db_before = _db_snapshot()
+        sampler.start()
+        total = int(self.args.rate * self.args.duration)
+        started_at = time.time()
+        send_seconds = self._send_phase(total, measured=True, first_index=self.args.users)
+        measured = [message for message in list(self.inbound.values()) if message.measured]
+        self._wait_replies(measured)
+        elapsed = time.time() - started_at
+        stop.set()
+        collector.join()
+        sampler.join()
+        return self._report(measured, started_at, send_seconds, elapsed, db_before, _db_snapshot())
+
+    def _report(self, measured: list[Inbound], started_at: float, send_seconds: float, elapsed: float,
+                db_before: dict, db_after: dict) -> dict:
+        accepted = [message for message in measured if message.status == 200]
+        replied = [message for message in accepted if message.replied_at]
+        by_scenario = defaultdict(list)
+        for message in replied:
+            by_scenario[message.scenario].append(message.replied_at - message.posted_at)
+        depths = [depth for depth, _ in self.queue_samples if depth is not None]
+        return {
+            'version': REPORT_VERSION,
+            'started_at': datetime.fromtimestamp(started_at).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'params': {key: getattr(self.args, key) for key in ('rate', 'duration', 'users', 'mix', 'seed', 'concurrency')},
+            'throughput': {
+                'sent': len(measured),
+                'accepted': len(accepted),
+                'replied': len(replied),
+                'offered_per_second': round(len(measured) / send_seconds, 2) if send_seconds else None,
+                'replied_per_second': round(len(replied) / elapsed, 2) if elapsed else None,
+            },
+            'latency_ms': {
+                'received_to_replied': {
+                    'all': _distribution([message.replied_at - message.posted_at for message in replied]),
+                    **{scenario: _distribution(values) for scenario, values in sorted(by_scenario.items())},
+                },
+                'webhook_accept': _distribution([message.accept_seconds for message in measured if message.accept_seconds is not None]),
+            },
+            'errors': {
+                'http_errors': len(measured) - len(accepted),
+                'unreplied': len(accepted) - len(replied),
+                'unmatched_sends': self.unmatched_sends,
+            },
+            'queue': {
+                'max_depth': max(depths, default=None),
+                'mean_depth': round(sum(depths) / len(depths), 1) if depths else None,
+                'max_deferred': max((deferred for _, deferred in self.queue_samples), default=None),
+            },
+            'db': {key: db_after[key] - db_before[key] for key in db_after},
+        }
+
+
+# ==============================================================================
+# AUXILIARES
+# ==============================================================================
+def _parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in ('new_user', 'expense', 'edit', 'summary', 'help'):
+            raise SystemExit(f"Cenário desconhecido no --mix: {name!r}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def _webhook_payload(message: Inbound, text: str) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "LOADTEST",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "contacts": [{"profile": {"name": f"Carga {message.wa_id[-6:]}"}, "wa_id": message.wa_id}],
+                    "messages": [{
+                        "from": message.wa_id, "id": message.wamid, "timestamp": str(int(time.time())),
+                        "type": "text", "text": {"body": text},
+                    }],
+                },
+            }],
+        }],
+    }
+
+
+def _distribution(seconds: list[float]) -> dict:
+    if not seconds:
+        return {'count': 0}
+    values = sorted(seconds)
+
+    def percentile(fraction: float) -> float:
+        return round(values[min(int(fraction * len(values)), len(values) - 1)] * 1000, 1)
+
+    return {
+        'count': len(values), 'mean': round(sum(values) / len(values) * 1000, 1),
+        'p50': percentile(0.50), 'p90': percentile(0.90), 'p95': percentile(0.95), 'p99': percentile(0.99),
+        'max': round(values[-1] * 1000, 1),
+    }
+
+
+def _db_snapshot() -> dict:
+    snapshot = {
+        'inbound_messages': Message.objects.filter(direction='INBOUND').count(),
+        'outbound_messages': Message.objects.filter(direction='OUTBOUND').count(),
+        'expenses': Expense.objects.count(),
+        'ai_logs': AILog.objects.count(),
+        'failed_webhooks': FailedWebhook.objects.count(),
+    }
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT xact_commit, xact_rollback, blks_read, blks_hit, tup_inserted, tup_updated, deadlocks "
+                "FROM pg_stat_database WHERE datname = current_database()"
+            )
+            row = cursor.fetchone()
+        snapshot.update(zip(('xact_commit', 'xact_rollback', 'blks_read', 'blks_hit', 'tup_inserted', 'tup_updated', 'deadlocks'), row))
+    return snapshot
+
+
+def _metric(report: dict, path: tuple) -> Optional[float]:
+    for key in path:
+        report = report.get(key) if isinstance(report, dict) else None
+    return report
+
+
+def _print_report(report: dict, baseline: Optional[dict]):
+    throughput, errors, queue = report['throughput'], report['errors'], report['queue']
+    print(f"Enviadas: {throughput['sent']} ({throughput['offered_per_second']}/s), aceitas: {throughput['accepted']}, "
+          f"respondidas: {throughput['replied']} ({throughput['replied_per_second']}/s)")
+    print(f"Sem resposta: {errors['unreplied']}, erros HTTP: {errors['http_errors']}, fila máx.: {queue['max_depth']}, "
+          f"adiados máx.: {queue['max_deferred']}")
+    print(f"\n{'webhook -> resposta (ms)':<26} {'n':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'máx':>8}")
+    for scenario, dist in report['latency_ms']['received_to_replied'].items():
+        if dist['count']:
+            print(f"{scenario:<26} {dist['count']:>6} {dist['p50']:>8} {dist['p90']:>8} {dist['p95']:>8} {dist['p99']:>8} {dist['max']:>8}")
+    if baseline is None:
+        return
+    print(f"\n{'comparação com a referência':<50} {'antes':>10} {'agora':>10} {'var.':>8}")
+    for path, higher_is_better in COMPARED_METRICS:
+        before, after = _metric(baseline, path), _metric(report, path)
+        change = "-"
+        if before and after is not None:
+            change = f"{(after - before) / before:+.0%}"
+            if after != before and (after > before) != higher_is_better:
+                change += " pior"
+        print(f"{'.'.join(path):<50} {before if before is not None else '-':>10} {after if after is not None else '-':>10} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000/api/meta/webhook/', help="Endpoint do webhook.")
+    parser.add_argument('--graph-url', default='http://fake-graph:8090', help="Servidor falso da Graph API.")
+    parser.add_argument('--rate', type=float, default=10.0, help="Mensagens por segundo na fase medida.")
+    parser.add_argument('--duration', type=float, default=60.0, help="Duração da fase medida, em segundos.")
+    parser.add_argument('--users', type=int, default=50, help="Usuários criados no aquecimento.")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Pesos dos cenários (new_user, expense, edit, summary, help).")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do gerador, para execuções comparáveis.")
+    parser.add_argument('--concurrency', type=int, default=32, help="Requisições simultâneas ao webhook.")
+    parser.add_argument('--drain-timeout', type=float, default=60.0, help="Espera máxima pelas respostas pendentes.")
+    parser.add_argument('--app-secret', default=os.environ.get('META_APP_SECRET', 'loadtest'),
+                        help="Segredo usado na assinatura X-Hub-Signature-256.")
+    parser.add_argument('--output', help="Arquivo do relatório (padrão: loadtest_reports/loadtest-<data>.json).")
+    parser.add_argument('--baseline', help="Relatório anterior para comparação.")
+    args = parser.parse_args()
+
+    report = LoadTest(args).run()
+    output = write_report(report, 'loadtest', args.output, directory='loadtest_reports')
+    _print_report(report, read_report(args.baseline))
+    print(f"\nRelatório gravado em {output}")
+
+
+if __name__ == '__main__':
+    main()
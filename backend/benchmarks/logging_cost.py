@@ -0,0 +1,135 @@
+"""
+Benchmark do custo de log por mensagem processada.
+
+Simula os registros que o pipeline do webhook gera para uma mensagem (recebimento, usuário, prompt e resposta
+bruta da IA, chamada à IA, envio e gravação) em duas configurações:
+
+- antes: f-strings formatadas na chamada, nível DEBUG e um StreamHandler síncrono com o formato texto;
+- depois: formatação preguiçosa, nível INFO, payloads grandes amostrados/truncados (log_payload) e o
+  BackgroundQueueHandler com saída JSON.
+
+Mede o tempo gasto na thread de quem loga (o que soma à latência da mensagem) e o tempo total até a saída
+ser escrita. A saída vai para /dev/null, para medir o logging e não o terminal; `--write-latency-us` simula
+um destino lento (ex: o stdout de um container sob pressão), onde o handler síncrono bloqueia quem loga.
+
+Uso (a partir de `backend/`):
+    python -m benchmarks.logging_cost --messages 20000 --write-latency-us 50
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from core.logs import VERBOSE_FORMAT, BackgroundQueueHandler, log_payload  # noqa: E402
+from core.tracing import TraceIdLogFilter  # noqa: E402
+
+PROMPT = "Você é um assistente financeiro. " * 120
+RAW_RESPONSE = '{"intent": "registrar_despesa", "amount": 35.9, "description": "mercado", "category": "Alimentação"}' * 20
+
+
+def _log_message_before(logger: logging.Logger, index: int):
+    user_id, wamid = f"user-{index}", f"wamid.{index}"
+    logger.info(f"Webhook payload received and tasked to Celery worker with ID: task-{index}")
+    logger.info(f"Task task-{index}: Starting webhook payload processing.")
+    logger.info(f"Found existing user {user_id} for phone number 5511999999999.")
+    logger.info(f"Inbound message from user {user_id} saved (WAMID: {wamid}).")
+    logger.debug(f"Prompt sent to Gemini for user {user_id}: {PROMPT}")
+    logger.info(f"Main AI call for user {user_id} successful. Duration: 850ms.")
+    logger.info(f"--- RESPOSTA BRUTA DA IA ---\n{RAW_RESPONSE}\n-----------------------------")
+    logger.info(f"Message sent to user {user_id} via Meta API. WAMID: {wamid}.out")
+    logger.info(f"Outbound message for user {user_id} saved to database.")
+
+
+def _log_message_after(logger: logging.Logger, index: int):
+    user_id, wamid = f"user-{index}", f"wamid.{index}"
+    logger.info("Webhook payload received and tasked to Celery worker with ID: %s", f"task-{index}")
+    logger.info("Task %s: Starting webhook payload processing.", f"task-{index}")
+    logger.info("Found existing user %s for phone number %s.", user_id, "5511999999999")
+    logger.info("Inbound message from user %s saved (WAMID: %s).", user_id, wamid)
+    log_payload(logger, logging.DEBUG, "Prompt sent to Gemini for user %s", PROMPT, user_id)
+    logger.info("Main AI call for user %s successful. Duration: %sms.", user_id, 850)
+    log_payload(logger, logging.DEBUG, "Raw AI response for user %s", RAW_RESPONSE, user_id)
+    logger.info("Message sent to user %s via Meta API. WAMID: %s", user_id, f"{wamid}.out")
+    logger.info("Outbound message for user %s saved to database.", user_id)
+
+
+class _SlowStream:
+    """
+    Stream que leva `latency` segundos em cada escrita.
+    """
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _configure(name: str, handler: logging.Handler, level: int) -> logging.Logger:
+    handler.addFilter(TraceIdLogFilter())
+    logger = logging.getLogger(f"benchmark.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def run(messages: int, write_latency_us: float = 0) -> list[dict]:
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        output = _SlowStream(devnull, write_latency_us / 1_000_000)
+        stderr, sys.stderr = sys.stderr, output
+        try:
+            sync_handler = logging.StreamHandler(output)
+            sync_handler.setFormatter(logging.Formatter(VERBOSE_FORMAT))
+            background_handler = BackgroundQueueHandler(output_format='json', queue_size=messages * 10)
+        finally:
+            sys.stderr = stderr
+
+        setups = [
+            ('antes', _configure('before', sync_handler, logging.DEBUG), _log_message_before, None),
+            ('depois', _configure('after', background_handler, logging.INFO), _log_message_after, background_handler),
+        ]
+        for label, logger, log_message, background in setups:
+            start_time = time.perf_counter()
+            for index in range(messages):
+                log_message(logger, index)
+            caller_seconds = time.perf_counter() - start_time
+            if background is not None:
+                background.stop()
+            total_seconds = time.perf_counter() - start_time
+            results.append({
+                'setup': label,
+                'messages': messages,
+                'caller_us_per_message': round(caller_seconds / messages * 1_000_000, 1),
+                'total_us_per_message': round(total_seconds / messages * 1_000_000, 1),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20_000, help="Quantidade de mensagens simuladas.")
+    parser.add_argument('--write-latency-us', type=float, default=0, help="Latência simulada de cada escrita na saída.")
+    args = parser.parse_args()
+
+    print(f"{'config':<8} {'mensagens':>10} {'µs/msg (quem loga)':>20} {'µs/msg (total)':>16}")
+    for result in run(args.messages, args.write_latency_us):
+        print(f"{result['setup']:<8} {result['messages']:>10,} {result['caller_us_per_message']:>20} "
+              f"{result['total_us_per_message']:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de inserção com chaves primárias uuid4 (aleatórias) e uuid7 (ordenadas pelo tempo).
+
+Cria duas tabelas temporárias com o mesmo formato de `Expense` (id UUID + colunas típicas), insere N linhas
+em lotes e mede a vazão e o tamanho final do índice da chave primária. Os números relevantes são os do
+PostgreSQL; no SQLite o benchmark roda, mas o tamanho do índice só é medido se a extensão dbstat existir.
+
+Uso (a partir de `backend/`):
+    python -m benchmarks.pk_inserts --rows 1000000 --rows 10000000
+"""
+import argparse
+import os
+import time
+import uuid
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from core.ids import uuid7  # noqa: E402
+
+BATCH_SIZE = 10_000
+GENERATORS = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+
+
+def _table_name(label: str) -> str:
+    return f"bench_pk_{label}"
+
+
+def _create_table(cursor, table: str):
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    id_type = 'uuid' if connection.vendor == 'postgresql' else 'char(32)'
+    cursor.execute(
+        f"CREATE TABLE {table} (id {id_type} PRIMARY KEY, amount numeric(10, 2) NOT NULL, "
+        f"description varchar(255) NOT NULL, transaction_date timestamp NOT NULL)"
+    )
+
+
+def _index_size(cursor, table: str):
+    """
+    Retorna o tamanho em bytes do índice da chave primária, ou None se o banco não permitir medir.
+    """
+    if connection.vendor == 'postgresql':
+        cursor.execute("SELECT pg_relation_size(%s)", [f"{table}_pkey"])
+        return cursor.fetchone()[0]
+    if connection.vendor == 'sqlite':
+        try:
+            cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE %s", [f"sqlite_autoindex_{table}%"])
+            return cursor.fetchone()[0]
+        except Exception:
+            return None
+    return None
+
+
+def run(rows: int, label: str) -> dict:
+    """
+    Insere `rows` linhas com o gerador de ids indicado e retorna vazão e tamanho do índice.
+    """
+    generate_id = GENERATORS[label]
+    to_db = (lambda value: str(value)) if connection.vendor == 'postgresql' else (lambda value: value.hex)
+    table = _table_name(label)
+    with connection.cursor() as cursor:
+        _create_table(cursor, table)
+        insert_sql = f"INSERT INTO {table} (id, amount, description, transaction_date) VALUES (%s, %s, %s, CURRENT_TIMESTAMP)"
+
+        start_time = time.monotonic()
+        for offset in range(0, rows, BATCH_SIZE):
+            batch = [(to_db(generate_id()), 10, "benchmark") for _ in range(min(BATCH_SIZE, rows - offset))]
+            with transaction.atomic():
+                cursor.executemany(insert_sql, batch)
+        elapsed = time.monotonic() - start_time
+
+        index_bytes = _index_size(cursor, table)
+        cursor.execute(f"DROP TABLE {table}")
+
+    return {
+        'ids': label,
+        'rows': rows,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(rows / elapsed) if elapsed else None,
+        'index_mb': round(index_bytes / 1024 / 1024, 1) if index_bytes else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, action='append', help="Quantidade de linhas (pode repetir). Padrão: 1M e 10M.")
+    args = parser.parse_args()
+
+    print(f"Banco: {connection.vendor}")
+    print(f"{'ids':<6} {'linhas':>12} {'segundos':>10} {'linhas/s':>10} {'índice (MB)':>12}")
+    for rows in args.rows or [1_000_000, 10_000_000]:
+        for label in GENERATORS:
+            result = run(rows, label)
+            print(f"{result['ids']:<6} {result['rows']:>12,} {result['seconds']:>10} "
+                  f"{result['rows_per_second'] or '-':>10} {result['index_mb'] or '-':>12}")
+
+
+if __name__ == '__main__':
+    main()
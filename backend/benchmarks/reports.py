@@ -0,0 +1,29 @@
+"""
+Auxiliares dos relatórios em JSON dos benchmarks e testes de carga, para comparar execuções.
+"""
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report: dict, name: str, output: Optional[str] = None, directory: str = 'benchmark_reports') -> Path:
+    """
+    Grava o relatório em `output` ou, sem ele, em `<directory>/<name>-<data>.json`. Retorna o caminho gravado.
+    """
+    path = Path(output or f"{directory}/{name}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def read_report(path: Optional[str]) -> Optional[dict]:
+    return json.loads(Path(path).read_text(encoding='utf-8')) if path else None
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        # Registra as consultas ao banco como spans quando há um trace ativo.
+        from django.db.backends.signals import connection_created
+        from .tracing import install_db_tracing
+        connection_created.connect(install_db_tracing, dispatch_uid='core-install-db-tracing')
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_ready
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -10,4 +11,76 @@ app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+def apply_worker_profile(profile_name):
+    """
+    Aplica a configuração do perfil de worker (concorrência, prefetch, acks_late) de CELERY_WORKER_PROFILES.
+    """
+    from django.conf import settings
+
+    if profile_name not in settings.CELERY_WORKER_PROFILES:
+        raise ValueError(f"Perfil de worker desconhecido: {profile_name}")
+    app.conf.update(settings.CELERY_WORKER_PROFILES[profile_name])
+
+
+# Cada worker roda com um perfil (interactive, outbound ou batch), escolhido pela variável de ambiente.
+if os.environ.get('CELERY_WORKER_PROFILE'):
+    apply_worker_profile(os.environ['CELERY_WORKER_PROFILE'])
+
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    """
+    Expõe as métricas do worker (fila e etapas do processamento das mensagens) em uma porta HTTP própria.
+    Com o pool prefork, PROMETHEUS_MULTIPROC_DIR precisa estar definido para somar as métricas dos processos filhos.
+    """
+    from django.conf import settings
+    from prometheus_client import start_http_server
+    from core.metrics import get_registry
+
+    if settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=get_registry())
+
+
+# Spans e contadores de consultas das tarefas em execução neste processo, por id da tarefa.
+_task_contexts = {}
+
+
+@before_task_publish.connect
+def inject_trace_context(headers=None, **kwargs):
+    """
+    Propaga o trace atual (ex: o do webhook) para a tarefa enfileirada, no cabeçalho `traceparent`.
+    """
+    from core.tracing import current_span
+
+    active_span = current_span()
+    if active_span is not None and headers is not None:
+        headers['traceparent'] = active_span.traceparent
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    """
+    Abre o span da tarefa no worker, continuando o trace recebido no cabeçalho (se houver),
+    e passa a contar as consultas ao banco feitas pela tarefa.
+    """
+    from core.instrumentation import track_queries
+    from core.tracing import span
+
+    task_span = span(f"celery.{task.name}", traceparent=task.request.get('traceparent'), **{'celery.task_id': task_id})
+    query_tracker = track_queries('task', task.name)
+    _task_contexts[task_id] = (task_span, task_span.__enter__(), query_tracker)
+    query_tracker.__enter__()
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, state=None, **kwargs):
+    entry = _task_contexts.pop(task_id, None)
+    if entry is not None:
+        task_span, span_data, query_tracker = entry
+        query_tracker.__exit__(None, None, None)
+        span_data.attributes['celery.state'] = state
+        task_span.__exit__(None, None, None)
+
@@ -0,0 +1,36 @@
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from users.services import get_data_version
+
+
+class DataVersionConditionalMixin:
+    """
+    Mixin para viewsets de leitura que responde 304 (Not Modified) quando os dados do usuário não mudaram.
+
+    O ETag e o Last-Modified vêm da versão dos dados do usuário, que fica no cache. Assim, uma requisição
+    condicional que ainda está atual é respondida sem nenhuma consulta ao banco.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        version = get_data_version(request.user.id)
+        etag = f'W/"{version}"'
+        # A versão é um timestamp em nanossegundos, então também serve de data da última alteração.
+        last_modified = version // 1_000_000_000
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+
+        # A resposta depende do token do usuário e deve ser revalidada a cada uso.
+        patch_vary_headers(response, ['Authorization'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_DATABASE = 'replica'
+
+# Indica se as leituras do contexto atual (requisição, tarefa ou gerador) podem ir para a réplica.
+_reads_from_replica: ContextVar[bool] = ContextVar('reads_from_replica', default=False)
+
+
+@contextmanager
+def use_replica():
+    """
+    Envia para a réplica as leituras feitas dentro do bloco. Escritas continuam no banco principal.
+
+    Deve envolver apenas caminhos de relatório, que toleram alguns segundos de atraso da réplica.
+    Sem réplica configurada, não tem efeito.
+    """
+    token = _reads_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _reads_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Roteador de banco: leituras marcadas com `use_replica()` vão para a réplica; todo o resto, para o principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _reads_from_replica.get() and REPLICA_DATABASE in settings.DATABASES:
+            return REPLICA_DATABASE
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e principal têm os mesmos dados, então objetos de ambos podem se relacionar.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema por replicação, nunca por migrações.
+        return db != REPLICA_DATABASE
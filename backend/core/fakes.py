@@ -0,0 +1,41 @@
+import math
+import random
+import time
+
+
+class LatencyModel:
+    """
+    Latência simulada das dependências externas falsas (Graph API, Gemini), em distribuição log-normal
+    definida pela mediana e pelo p99, que é o formato típico da latência de APIs reais (cauda longa à direita).
+    Com o p99 igual à mediana, a latência é fixa.
+    """
+
+    # Quantil 0,99 da normal padrão.
+    Z_99 = 2.326
+
+    def __init__(self, median_ms: float, p99_ms: float, error_rate: float = 0.0):
+        if median_ms < 0 or p99_ms < median_ms:
+            raise ValueError("A latência precisa de 0 <= mediana <= p99.")
+        if not 0 <= error_rate <= 1:
+            raise ValueError("A taxa de erros precisa estar entre 0 e 1.")
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms
+        self.error_rate = error_rate
+        self.sigma = (math.log(p99_ms) - math.log(median_ms)) / self.Z_99 if median_ms > 0 else 0.0
+
+    def sample_seconds(self) -> float:
+        if self.median_ms == 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+    def wait(self) -> float:
+        """
+        Dorme por uma latência sorteada e retorna quanto dormiu.
+        """
+        seconds = self.sample_seconds()
+        if seconds:
+            time.sleep(seconds)
+        return seconds
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
@@ -0,0 +1,26 @@
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Gera um UUID versão 7 (RFC 9562): os 48 bits iniciais são o timestamp Unix em milissegundos,
+    seguidos de 12 bits com a fração do milissegundo e 62 bits aleatórios.
+
+    Como o valor cresce com o tempo, novas linhas entram sempre no fim do índice B-tree da chave primária,
+    em vez de espalhadas como no uuid4, o que reduz divisões de página e o inchaço do índice.
+    O formato continua sendo um UUID comum, então convive com os ids uuid4 já existentes.
+    """
+    timestamp_ns = time.time_ns()
+    timestamp_ms, remainder_ns = divmod(timestamp_ns, 1_000_000)
+    # Fração do milissegundo em 12 bits: mantém a ordem também entre ids gerados no mesmo milissegundo.
+    sub_ms = (remainder_ns << 12) // 1_000_000
+    random_bits = int.from_bytes(os.urandom(8), 'big') & 0x3FFF_FFFF_FFFF_FFFF
+
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= sub_ms << 64
+    value |= 0b10 << 62
+    value |= random_bits
+    return uuid.UUID(int=value)
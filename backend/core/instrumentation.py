@@ -0,0 +1,91 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES = Histogram(
+    'db_queries_per_unit', "Consultas ao banco por tarefa do Celery ou por intenção atendida.",
+    ['scope', 'name'], buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_seconds_per_unit', "Tempo total em consultas ao banco por tarefa do Celery ou por intenção atendida.",
+    ['scope', 'name'], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class QueryTracker:
+    """
+    Conta as consultas ao banco (e o tempo gasto nelas) feitas enquanto está ativo, em todas as conexões.
+    O `name` pode ser definido depois de aberto, como a intenção, que só é conhecida após a IA responder.
+    """
+
+    def __init__(self, scope: str, name: str = 'desconhecido'):
+        self.scope = scope
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+    @property
+    def budget(self) -> int:
+        return get_query_budget(self.scope, self.name)
+
+    def record(self):
+        """
+        Publica a contagem nas métricas e avisa no log quando o orçamento de consultas foi estourado.
+        """
+        DB_QUERIES.labels(scope=self.scope, name=self.name).observe(self.count)
+        DB_QUERY_SECONDS.labels(scope=self.scope, name=self.name).observe(self.seconds)
+        if self.count > self.budget:
+            logger.warning(
+                f"Query budget exceeded for {self.scope} '{self.name}': {self.count} queries "
+                f"({self.seconds * 1000:.1f}ms) for a budget of {self.budget}."
+            )
+
+
+def get_query_budget(scope: str, name: str) -> int:
+    """
+    Orçamento de consultas de uma tarefa ou intenção: o específico de QUERY_BUDGETS, se houver, senão o padrão do escopo.
+    """
+    return settings.QUERY_BUDGETS.get(f"{scope}:{name}", settings.QUERY_BUDGETS[scope])
+
+
+@contextmanager
+def track_queries(scope: str, name: str = 'desconhecido', record: bool = True):
+    """
+    Conta as consultas feitas dentro do bloco. Ao sair, registra as métricas e verifica o orçamento.
+    """
+    tracker = QueryTracker(scope, name)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(tracker))
+        yield tracker
+    if record:
+        tracker.record()
+
+
+@contextmanager
+def assert_query_budget(testcase, scope: str, name: str, budget: Optional[int] = None):
+    """
+    Auxiliar de testes: falha se o bloco fizer mais consultas que o orçamento (o configurado, por padrão).
+    Diferente do `assertNumQueries`, aceita qualquer quantidade até o limite.
+    """
+    budget = budget if budget is not None else get_query_budget(scope, name)
+    with track_queries(scope, name, record=False) as tracker:
+        yield tracker
+    testcase.assertLessEqual(
+        tracker.count, budget, f"{scope} '{name}' fez {tracker.count} consultas; o orçamento é {budget}."
+    )
@@ -0,0 +1,105 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+VERBOSE_FORMAT = "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] [trace=%(trace_id)s] %(message)s"
+
+# Atributos padrão de um LogRecord; o que não estiver aqui veio do `extra` e vai como campo no JSON.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formata cada registro como uma linha JSON (nível, logger, mensagem, trace id e campos do `extra`).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'line': record.lineno,
+            'trace_id': getattr(record, 'trace_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Entrega os registros a uma fila em memória; uma thread de fundo (QueueListener) os formata e escreve.
+    Quem loga só paga o enfileiramento: a formatação da mensagem e a escrita no stream saem do caminho da requisição.
+
+    Os filtros deste handler (ex: o do trace id) rodam na thread de quem loga, antes de enfileirar.
+    Com a fila cheia o registro é descartado, em vez de bloquear. O listener é recriado nos processos
+    filhos do Celery (prefork), já que threads não sobrevivem ao fork.
+    """
+
+    def __init__(self, output_format: str = 'json', queue_size: int = 10000):
+        self.output_format = output_format
+        self.queue_size = queue_size
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        self._start_listener()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._restart_after_fork)
+
+    def _start_listener(self):
+        target = logging.StreamHandler()
+        if self.output_format == 'json':
+            target.setFormatter(JsonFormatter())
+        else:
+            target.setFormatter(logging.Formatter(VERBOSE_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+
+    def _restart_after_fork(self):
+        self.queue = queue.Queue(self.queue_size)
+        self._start_listener()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A fila não sai do processo, então o registro vai como está: a mensagem é montada só no listener.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """
+        Esvazia a fila e para a thread de fundo (chamado na saída do processo).
+        """
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+def log_payload(logger: logging.Logger, level: int, message: str, payload: str, *args, **extra):
+    """
+    Loga um conteúdo grande (resposta bruta da IA, prompt) com amostragem e truncamento por nível,
+    conforme LOG_PAYLOAD_SAMPLE_RATE e LOG_PAYLOAD_MAX_CHARS. Nada é montado se o nível estiver desligado
+    ou o registro ficar fora da amostra. `message` usa a formatação preguiçosa do logging, com `args`.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    level_name = logging.getLevelName(level)
+    if random.random() >= settings.LOG_PAYLOAD_SAMPLE_RATE.get(level_name, 1.0):
+        return
+    max_chars = settings.LOG_PAYLOAD_MAX_CHARS.get(level_name, 1000)
+    payload = payload or ''
+    shown = payload if len(payload) <= max_chars else f"{payload[:max_chars]}... [truncado]"
+    logger.log(level, f"{message} (%s caracteres): %s", *args, len(payload), shown,
+               extra={'payload_chars': len(payload), **extra}, stacklevel=2)
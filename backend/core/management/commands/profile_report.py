@@ -0,0 +1,35 @@
+import io
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import load_profiles
+
+
+class Command(BaseCommand):
+    """
+    Soma os perfis amostrados das tarefas (PROFILING_SAMPLE_RATE) e mostra as funções com maior tempo acumulado,
+    para investigar picos de latência sem precisar reproduzi-los.
+    """
+    help = "Agrega os perfis gravados em PROFILING_DIR e lista as funções com maior tempo acumulado."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILING_DIR, help="Diretório dos perfis.")
+        parser.add_argument('--kind', help="Tipo de tarefa: 'webhook' ou 'summaries'.")
+        parser.add_argument('--intent', help="Apenas perfis desta intenção (tarefas de webhook).")
+        parser.add_argument('--limit', type=int, default=30, help="Quantidade de funções listadas.")
+        parser.add_argument('--sort', default='cumulative', help="Critério do pstats (ex: cumulative, tottime, ncalls).")
+
+    def handle(self, *args, **options):
+        pattern = f"{options['kind'] or '*'}-{options['intent'] or '*'}-*.prof.gz"
+        paths = sorted(Path(options['dir']).glob(pattern))
+        if not paths:
+            raise CommandError(f"Nenhum perfil encontrado em {options['dir']} ({pattern}).")
+
+        self.stdout.write(f"{len(paths)} perfis agregados.")
+        report = io.StringIO()
+        stats = load_profiles(paths)
+        stats.stream = report
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(report.getvalue())
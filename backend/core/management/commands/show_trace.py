@@ -0,0 +1,52 @@
+import json
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tracing import trace_id_for_wamid
+
+
+class Command(BaseCommand):
+    """
+    Mostra a árvore de spans de uma mensagem a partir do arquivo de traces (TRACING_EXPORTER='file'),
+    com a duração de cada etapa, para encontrar onde o tempo de uma conversa foi gasto.
+    """
+    help = "Mostra o trace de uma mensagem (por WAMID ou trace id) gravado em TRACING_FILE."
+
+    def add_arguments(self, parser):
+        parser.add_argument('identifier', help="WAMID da mensagem recebida ou trace id (32 caracteres hexadecimais).")
+        parser.add_argument('--file', default=settings.TRACING_FILE, help="Arquivo NDJSON de traces.")
+        parser.add_argument('--hide-db', action='store_true', help="Oculta os spans de consultas ao banco.")
+
+    def handle(self, *args, **options):
+        identifier = options['identifier']
+        trace_id = identifier if re.fullmatch(r'[0-9a-f]{32}', identifier) else trace_id_for_wamid(identifier)
+
+        try:
+            with open(options['file'], encoding='utf-8') as trace_file:
+                spans = [span for span in map(json.loads, trace_file) if span['trace_id'] == trace_id]
+        except FileNotFoundError:
+            raise CommandError(f"Arquivo de traces não encontrado: {options['file']}")
+        if not spans:
+            raise CommandError(f"Nenhum span encontrado para o trace {trace_id}.")
+
+        span_ids = {span['span_id'] for span in spans}
+        children: dict = {}
+        for span in sorted(spans, key=lambda item: item['start_ns']):
+            # Spans cujo pai não está no arquivo (ex: pai em outro serviço) são mostrados na raiz.
+            parent_id = span['parent_id'] if span['parent_id'] in span_ids else None
+            children.setdefault(parent_id, []).append(span)
+
+        self.stdout.write(f"Trace {trace_id}")
+        trace_start = min(span['start_ns'] for span in spans)
+        self._write_tree(children, None, trace_start, 0, options['hide_db'])
+
+    def _write_tree(self, children: dict, parent_id, trace_start: int, depth: int, hide_db: bool):
+        for span in children.get(parent_id, []):
+            if hide_db and span['name'] == 'db.query':
+                continue
+            offset_ms = (span['start_ns'] - trace_start) / 1_000_000
+            details = span['attributes'].get('db.statement') or span['attributes'].get('error') or ''
+            self.stdout.write(f"{'  ' * depth}{span['name']:<40} +{offset_ms:>9.1f}ms {span['duration_ms']:>9.1f}ms  {details[:80]}")
+            self._write_tree(children, span['span_id'], trace_start, depth + 1, hide_db)
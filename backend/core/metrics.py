@@ -0,0 +1,84 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+
+from .tracing import span
+
+# Faixas dos histogramas, em segundos: do acesso ao cache (ms) até chamadas lentas à IA (dezenas de segundos).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Etapas do processamento de uma mensagem, na ordem em que acontecem.
+PIPELINE_STAGES = ('user_lookup', 'ai_interpretation', 'business_write', 'meta_send')
+
+WEBHOOK_ACCEPT_SECONDS = Histogram(
+    'webhook_accept_seconds', "Tempo para aceitar o webhook da Meta e enfileirá-lo.", buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_QUEUE_WAIT_SECONDS = Histogram(
+    'webhook_queue_wait_seconds', "Tempo entre o enfileiramento do webhook e o início da tarefa no worker.", buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_BACKPRESSURE_TOTAL = Counter(
+    'webhook_backpressure_total', "Webhooks desviados da fila pela contenção de carga, por ação (deferred ou shed).",
+    ['action'],
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    'message_pipeline_stage_seconds', "Duração de cada etapa do processamento de uma mensagem.",
+    ['stage', 'intent'], buckets=LATENCY_BUCKETS,
+)
+MESSAGE_TOTAL_SECONDS = Histogram(
+    'message_received_to_replied_seconds', "Tempo entre o recebimento do webhook e o envio da resposta.",
+    ['intent'], buckets=LATENCY_BUCKETS,
+)
+
+
+class PipelineTimer:
+    """
+    Cronometra as etapas do processamento de uma mensagem.
+
+    As durações ficam em um dicionário e só viram observações no final, quando a intenção já é conhecida,
+    para que todas as etapas (inclusive as anteriores à IA) sejam rotuladas com ela.
+    """
+
+    def __init__(self, received_at: Optional[float] = None):
+        # `received_at` é o horário (time.time) em que o webhook foi aceito pela view.
+        self.received_at = received_at
+        self.durations: dict[str, float] = {}
+        self.intent = 'desconhecido'
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{name}"):
+                yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def observe(self, intent: Optional[str] = None):
+        intent = intent or self.intent
+        for name, seconds in self.durations.items():
+            PIPELINE_STAGE_SECONDS.labels(stage=name, intent=intent).observe(seconds)
+        if self.received_at is not None:
+            MESSAGE_TOTAL_SECONDS.labels(intent=intent).observe(max(time.time() - self.received_at, 0.0))
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Retorna o registro a exportar. Com vários processos (gunicorn, workers prefork do Celery),
+    PROMETHEUS_MULTIPROC_DIR aponta para um diretório compartilhado e as métricas de todos são somadas.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Endpoint `/metrics` no formato texto do Prometheus.
+    """
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,101 @@
+import cProfile
+import gzip
+import logging
+import marshal
+import random
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileSession:
+    """
+    Perfil de uma execução amostrada. O `label` pode ser definido depois de aberto,
+    como a intenção da mensagem, que só é conhecida após a IA responder.
+    """
+
+    def __init__(self, kind: str, task_id: Optional[str], label: str = 'desconhecido'):
+        self.kind = kind
+        self.task_id = task_id or 'local'
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.path: Optional[Path] = None
+
+    @property
+    def filename(self) -> str:
+        safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.label)
+        return f"{self.kind}-{safe_label}-{self.task_id}.prof.gz"
+
+    def save(self, directory: Path) -> Path:
+        """
+        Grava as estatísticas no formato do `pstats`, comprimidas com gzip.
+        """
+        self.profiler.create_stats()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / self.filename
+        with gzip.open(self.path, 'wb') as profile_file:
+            marshal.dump(self.profiler.stats, profile_file)
+        return self.path
+
+
+@contextmanager
+def sampled_profile(kind: str, task_id: Optional[str] = None):
+    """
+    Perfila o bloco com o cProfile em uma fração PROFILING_SAMPLE_RATE das execuções.
+    Fora da amostra (ou com a taxa em 0, o padrão) devolve None e não tem custo.
+    """
+    if random.random() >= settings.PROFILING_SAMPLE_RATE:
+        yield None
+        return
+
+    session = ProfileSession(kind, task_id)
+    try:
+        session.profiler.enable()
+    except ValueError:
+        # Já existe outro profiler ativo neste processo (ex: uma execução aninhada).
+        yield None
+        return
+
+    try:
+        yield session
+    finally:
+        session.profiler.disable()
+        try:
+            path = session.save(Path(settings.PROFILING_DIR))
+            logger.info(f"Profile of {kind} task {session.task_id} saved to {path}.")
+        except OSError:
+            logger.warning(f"Não foi possível gravar o perfil da tarefa {session.task_id}.", exc_info=True)
+
+
+class _LoadedProfile:
+    """
+    Adapta estatísticas lidas do disco à interface que o `pstats.Stats` aceita (um objeto com `create_stats`).
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def load_profiles(paths: Iterable[Path]):
+    """
+    Soma os perfis gravados por `sampled_profile` em um único `pstats.Stats`.
+    """
+    import pstats
+
+    combined = None
+    for path in paths:
+        with gzip.open(path, 'rb') as profile_file:
+            loaded = _LoadedProfile(marshal.load(profile_file))
+        if combined is None:
+            combined = pstats.Stats(loaded)
+        else:
+            combined.add(loaded)
+    return combined
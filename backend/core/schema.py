@@ -0,0 +1,10 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTStatelessUserScheme
+
+
+class StatelessJWTScheme(SimpleJWTStatelessUserScheme):
+    """
+    Registra a autenticação JWT sem consulta ao banco com um nome próprio no schema OpenAPI,
+    evitando conflito com o esquema 'jwtAuth' da autenticação padrão.
+    """
+    name = 'jwtStatelessAuth'
+    priority = 1
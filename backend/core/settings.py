@@ -34,9 +34,18 @@ DEBUG = env('DEBUG')
 META_VERIFY_TOKEN = env('META_VERIFY_TOKEN')
 META_ACCESS_TOKEN = env('META_ACCESS_TOKEN')
 META_PHONE_NUMBER_ID = env('META_PHONE_NUMBER_ID')
+# Aponte para o servidor falso (`manage.py fake_graph_server`) em testes de carga.
+META_GRAPH_BASE_URL = env('META_GRAPH_BASE_URL', default='https://graph.facebook.com')
 
 # --- Gemini ---
 GEMINI_API_KEY = env('GEMINI_API_KEY')
+# 'gemini' ou 'fake' (substituto local de ai/fakes.py, para testes de carga sem rede).
+AI_BACKEND = env('AI_BACKEND', default='gemini')
+FAKE_AI_LATENCY_MEDIAN_MS = env.float('FAKE_AI_LATENCY_MEDIAN_MS', default=600.0)
+FAKE_AI_LATENCY_P99_MS = env.float('FAKE_AI_LATENCY_P99_MS', default=2500.0)
+FAKE_AI_ERROR_RATE = env.float('FAKE_AI_ERROR_RATE', default=0.0)
+# JSON com [{"match": "trecho do prompt", "response": ...}], consultado antes das regras do Gemini falso.
+FAKE_AI_RESPONSES_FILE = env('FAKE_AI_RESPONSES_FILE', default=None)
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '.ngrok-free.app']
 
@@ -50,6 +59,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Aplicativos de terceiros
     'rest_framework',
@@ -63,6 +73,7 @@ INSTALLED_APPS = [
     'health_check.storage',
 
     # Meus aplicativos
+    'core',
     'users',
     'meta',
     'ai',
@@ -70,6 +81,8 @@ INSTALLED_APPS = [
     'incomes',
     'summaries',
     'payments',
+    'recurring',
+    'imports',
 ]
 
 # Modelo de usuário
@@ -109,13 +122,39 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# O banco vem de DATABASE_URL (ex: postgres://usuario:senha@db:5432/financeiro); sem ela, usa o SQLite local.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': env.db('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
 }
 
+# Réplica de leitura opcional, usada pelos relatórios (resumos, exportações e análises). Ver core/db_routers.py.
+if env('DATABASE_REPLICA_URL', default=None):
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    # Nos testes, a réplica aponta para o banco de teste principal em vez de ter um banco próprio.
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+for database in DATABASES.values():
+    # Conexões persistentes: reaproveitadas entre requisições por até DB_CONN_MAX_AGE segundos.
+    database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+    # Testa a conexão reaproveitada antes de usá-la, descartando as que o servidor já fechou.
+    database['CONN_HEALTH_CHECKS'] = True
+    # Com um pooler no servidor (PgBouncer em modo transaction), cursores nomeados não sobrevivem entre
+    # transações, então o `.iterator()` passa a usar cursores do lado do cliente.
+    if database['ENGINE'] == 'django.db.backends.postgresql' and env.bool('DB_USE_PGBOUNCER', default=False):
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Em produção, CACHE_URL deve apontar para o Redis compartilhado (ex: redis://redis:6379/1): a versão dos dados
+# de cada usuário vive no cache e precisa ser a mesma para o web e os workers. Sem ela, usa a memória do processo.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+CACHES['default']['KEY_PREFIX'] = 'financeiro'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -191,27 +230,46 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Configurações de registro do Logger
+# Os registros passam por uma fila e são formatados e escritos por uma thread de fundo (core/logs.py).
+# LOG_FORMAT='json' gera uma linha JSON por registro; 'text' mantém o formato legível, útil no desenvolvimento.
+LOG_LEVEL = env('LOG_LEVEL', default='INFO')
+LOG_FORMAT = env('LOG_FORMAT', default='json')
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
+    "filters": {
+        "trace_id": {
+            "()": "core.tracing.TraceIdLogFilter",
         },
     },
     "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "verbose",
+        "background": {
+            "()": "core.logs.BackgroundQueueHandler",
+            "output_format": LOG_FORMAT,
+            "filters": ["trace_id"],
         },
     },
     "root": {
-        "handlers": ["console"],
-        "level": "DEBUG",
+        "handlers": ["background"],
+        "level": LOG_LEVEL,
     },
 }
 
+# Conteúdos grandes nos logs (respostas brutas da IA, prompts), por nível: fração registrada e tamanho máximo.
+LOG_PAYLOAD_SAMPLE_RATE = {
+    'DEBUG': env.float('LOG_PAYLOAD_DEBUG_SAMPLE_RATE', default=1.0),
+    'INFO': env.float('LOG_PAYLOAD_INFO_SAMPLE_RATE', default=0.01),
+    'WARNING': 1.0,
+    'ERROR': 1.0,
+}
+LOG_PAYLOAD_MAX_CHARS = {
+    'DEBUG': 8000,
+    'INFO': 500,
+    'WARNING': 2000,
+    'ERROR': 2000,
+}
+
 # --- CELERY SETTINGS ---
 # The URL pointing to the Redis message broker.
 # 'redis' is the service name from our docker-compose.yml
@@ -221,9 +279,140 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# --- FILAS ---
+# Cada tipo de trabalho tem a sua fila, consumida por workers próprios (ver CELERY_WORKER_PROFILES):
+# 'interactive' responde às mensagens dos usuários, 'outbound' faz os envios ativos e 'batch' roda as rotinas
+# periódicas. Tarefas sem rota caem em 'batch', para nunca disputarem espaço com as conversas.
+CELERY_TASK_DEFAULT_QUEUE = 'batch'
+CELERY_TASK_ROUTES = {
+    'meta.tasks.process_webhook_payload': {'queue': 'interactive'},
+    'meta.tasks.send_text_message': {'queue': 'outbound'},
+    'summaries.tasks.*': {'queue': 'batch'},
+    'recurring.tasks.*': {'queue': 'batch'},
+    'payments.tasks.*': {'queue': 'batch'},
+}
+# Nenhuma tarefa tem o resultado consultado; não gravá-los poupa uma escrita no Redis por tarefa.
+CELERY_TASK_IGNORE_RESULT = True
+# O worker mantém o LOGGING acima (JSON, fila em segundo plano, trace id) em vez de trocar os handlers da raiz pelos seus.
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+# Num worker que consome várias filas (ex: no desenvolvimento), o Redis esvazia as filas na ordem do `-Q`
+# em vez de alternar entre elas: com `-Q interactive,outbound,batch`, as conversas passam na frente.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+}
+
+# Configuração de cada perfil de worker, aplicada em core/celery.py conforme CELERY_WORKER_PROFILE
+# (ex: `CELERY_WORKER_PROFILE=interactive celery -A core worker -Q interactive`).
+# - interactive: muitas tarefas curtas e sensíveis à latência; sem prefetch, para nenhuma mensagem esperar atrás de
+#   outra já reservada pelo mesmo processo.
+# - outbound: envios ativos, limitados pelo rate_limit da Meta; acks_late reentrega o envio se o worker cair.
+# - batch: tarefas longas e idempotentes; acks_late e prefetch 1, para um worker perdido não levar vários lotes.
+CELERY_WORKER_PROFILES = {
+    'interactive': {
+        'worker_concurrency': env.int('CELERY_INTERACTIVE_CONCURRENCY', default=8),
+        'worker_prefetch_multiplier': 1,
+        'task_acks_late': False,
+    },
+    'outbound': {
+        'worker_concurrency': env.int('CELERY_OUTBOUND_CONCURRENCY', default=4),
+        'worker_prefetch_multiplier': 4,
+        'task_acks_late': True,
+        'task_reject_on_worker_lost': True,
+    },
+    'batch': {
+        'worker_concurrency': env.int('CELERY_BATCH_CONCURRENCY', default=2),
+        'worker_prefetch_multiplier': 1,
+        'task_acks_late': True,
+        'task_reject_on_worker_lost': True,
+    },
+}
+
+# Tempo máximo (em segundos) que uma tarefa em lote roda antes de devolver o restante do trabalho à fila.
+# Num worker compartilhado, é o atraso máximo que um lote impõe às respostas dos usuários.
+BATCH_TASK_TIME_SLICE_SECONDS = env.int('BATCH_TASK_TIME_SLICE_SECONDS', default=30)
+
 CELERY_BEAT_SCHEDULE = {
     'generate-monthly-summaries': {
         'task': 'summaries.tasks.generate_monthly_summaries_for_all_users',
         'schedule': crontab(day_of_month=1, hour=8, minute=0), # Roda no dia 1 de cada mês, às 8h
     },
-}
\ No newline at end of file
+    'materialize-recurring-transactions': {
+        'task': 'recurring.tasks.materialize_recurring_transactions',
+        'schedule': crontab(hour=6, minute=0), # Roda todos os dias, às 6h
+    },
+    'drain-deferred-webhooks': {
+        'task': 'meta.tasks.drain_deferred_webhooks',
+        'schedule': 30.0, # Roda a cada 30 segundos
+    },
+    'send-bill-reminders': {
+        'task': 'payments.tasks.send_bill_reminders',
+        'schedule': crontab(hour=9, minute=0), # Roda todos os dias, às 9h
+    },
+}
+
+# --- LEMBRETES DE FATURA ---
+BILL_REMINDER_DAYS_AHEAD = 3 # Avisa com esta antecedência (em dias) do vencimento
+BILL_REMINDER_BATCH_SIZE = 50 # Mensagens liberadas por lote
+BILL_REMINDER_BATCH_INTERVAL_SECONDS = 60 # Intervalo entre lotes
+
+# Limite de envios ativos por worker (formato do rate_limit do Celery)
+META_SEND_RATE_LIMIT = '20/s'
+
+# --- CONTENÇÃO DE CARGA NO WEBHOOK ---
+# Limites da fila 'interactive' (tarefas esperando) e do atraso das tarefas ao começar, em segundos.
+# Acima do limite suave, os webhooks são guardados no banco (DeferredWebhook) em vez de enfileirados;
+# acima do limite rígido, eventos que não são mensagens (ex: status de entrega) são descartados.
+WEBHOOK_QUEUE_SOFT_LIMIT = env.int('WEBHOOK_QUEUE_SOFT_LIMIT', default=500)
+WEBHOOK_QUEUE_HARD_LIMIT = env.int('WEBHOOK_QUEUE_HARD_LIMIT', default=5000)
+WEBHOOK_QUEUE_SOFT_LAG_SECONDS = env.float('WEBHOOK_QUEUE_SOFT_LAG_SECONDS', default=30)
+WEBHOOK_QUEUE_HARD_LAG_SECONDS = env.float('WEBHOOK_QUEUE_HARD_LAG_SECONDS', default=120)
+WEBHOOK_QUEUE_PRESSURE_CACHE_SECONDS = 2 # Por quanto tempo a medição da fila é reaproveitada
+WEBHOOK_QUEUE_LAG_TTL_SECONDS = 60 # Validade do último atraso informado pelo worker
+DEFERRED_WEBHOOK_DRAIN_BATCH_SIZE = 200 # Webhooks guardados devolvidos à fila por execução
+
+# --- DIÁRIO DE WEBHOOKS ---
+# Grava cada payload recebido da Meta em segmentos NDJSON comprimidos (meta/journal.py), para reproduzir
+# bugs e carga real com o comando replay_webhook_journal. Contém mensagens e telefones: os dias mais antigos
+# que HISTORY_RETENTION_DAYS são apagados pelo comando archive_history.
+WEBHOOK_JOURNAL_ENABLED = env.bool('WEBHOOK_JOURNAL_ENABLED', default=False)
+WEBHOOK_JOURNAL_DIR = env('WEBHOOK_JOURNAL_DIR', default=str(BASE_DIR / 'webhook_journal'))
+WEBHOOK_JOURNAL_SEGMENT_MAX_BYTES = 64 * 1024 * 1024 # Tamanho máximo de um segmento antes de trocar de arquivo
+WEBHOOK_JOURNAL_SEGMENT_MAX_SECONDS = 3600 # Idade máxima de um segmento
+WEBHOOK_JOURNAL_BLOCK_RECORDS = 500 # Payloads por bloco comprimido (a unidade do índice)
+WEBHOOK_JOURNAL_FLUSH_SECONDS = 1.0 # Um bloco incompleto é gravado depois deste tempo
+WEBHOOK_JOURNAL_QUEUE_SIZE = 10000 # Payloads aguardando gravação; acima disso, são descartados
+
+# --- MÉTRICAS ---
+# Porta do exportador de métricas do worker do Celery (0 desativa). O web expõe as suas em /metrics/.
+METRICS_WORKER_PORT = env.int('METRICS_WORKER_PORT', default=9808)
+
+# --- ORÇAMENTO DE CONSULTAS ---
+# Máximo de consultas ao banco por tarefa do Celery ('task') e por intenção atendida ('intent').
+# Acima disso, um aviso vai para o log. Chaves 'escopo:nome' definem orçamentos específicos.
+QUERY_BUDGETS = {
+    'task': env.int('QUERY_BUDGET_PER_TASK', default=100),
+    'intent': env.int('QUERY_BUDGET_PER_INTENT', default=25),
+    'intent:pedir_categorias': 2,
+    'intent:pedir_resumo': 4,
+    'intent:consultar_gastos': 6,
+    'intent:pedir_tendencia': 3,
+    'intent:registrar_despesa': 15,
+}
+
+# --- PROFILING ---
+# Fração (0 a 1) das tarefas de webhook e de resumos perfiladas com o cProfile. Os perfis vão comprimidos para
+# PROFILING_DIR, nomeados por tipo, intenção e id da tarefa; o comando profile_report soma as funções mais custosas.
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_DIR = env('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+
+# --- TRACING ---
+# Destino dos traces das mensagens: 'none', 'file' (NDJSON em TRACING_FILE) ou 'otlp' (coletor OpenTelemetry via HTTP).
+TRACING_EXPORTER = env('TRACING_EXPORTER', default='none')
+TRACING_FILE = env('TRACING_FILE', default=str(BASE_DIR / 'traces.ndjson'))
+TRACING_OTLP_ENDPOINT = env('TRACING_OTLP_ENDPOINT', default='http://localhost:4318/v1/traces')
+TRACING_SERVICE_NAME = env('TRACING_SERVICE_NAME', default='financeiro')
+
+# --- ARQUIVAMENTO DO HISTÓRICO ---
+# Mensagens e logs de IA mais antigos que isto saem do banco para arquivos NDJSON comprimidos (comando archive_history).
+HISTORY_RETENTION_DAYS = env.int('HISTORY_RETENTION_DAYS', default=180)
+HISTORY_ARCHIVE_DIR = env('HISTORY_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
\ No newline at end of file
@@ -0,0 +1,245 @@
+import json
+import logging
+import queue
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from prometheus_client import REGISTRY
+
+from users.models import User
+from expenses.models import Expense
+from .celery import app as celery_app, inject_trace_context
+from .db_routers import ReplicaRouter, use_replica
+from .ids import uuid7
+from .logs import BackgroundQueueHandler, JsonFormatter, log_payload
+from .metrics import PipelineTimer
+from .profiling import sampled_profile
+from . import tracing
+from .tracing import span, trace_id_for_wamid
+
+
+class UUID7Tests(SimpleTestCase):
+    """
+    Suite de testes para o gerador de chaves primárias ordenadas pelo tempo.
+    """
+
+    def test_uuid7_is_versioned_and_time_ordered(self):
+        """
+        Garante que os ids são UUIDs versão 7, únicos e crescentes na ordem de geração.
+        """
+        ids = [uuid7() for _ in range(1000)]
+
+        self.assertTrue(all(value.version == 7 for value in ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(sorted(ids), ids)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Suite de testes para o roteamento de leituras de relatório para a réplica.
+    """
+
+    def test_only_marked_reads_go_to_replica(self):
+        """
+        Garante que só as leituras dentro de `use_replica()` vão para a réplica, e só se ela existir.
+        """
+        router = ReplicaRouter()
+        without_replica = {'default': settings.DATABASES['default']}
+        with_replica = {**without_replica, 'replica': {}}
+
+        with mock.patch.dict(settings.DATABASES, without_replica, clear=True), use_replica():
+            self.assertEqual(router.db_for_read(Expense), 'default')
+
+        with mock.patch.dict(settings.DATABASES, with_replica, clear=True):
+            self.assertEqual(router.db_for_read(Expense), 'default')
+            with use_replica():
+                self.assertEqual(router.db_for_read(Expense), 'replica')
+                self.assertEqual(router.db_for_write(Expense), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'expenses'))
+
+
+class PipelineMetricsTests(SimpleTestCase):
+    """
+    Suite de testes para as métricas de latência do processamento das mensagens.
+    """
+
+    def test_stages_are_labelled_with_final_intent(self):
+        """
+        Garante que todas as etapas, inclusive as anteriores à IA, são rotuladas com a intenção final.
+        """
+        labels = {'stage': 'user_lookup', 'intent': 'pedir_resumo'}
+        before = REGISTRY.get_sample_value('message_pipeline_stage_seconds_count', labels) or 0
+
+        timer = PipelineTimer(received_at=time.time() - 2)
+        with timer.stage('user_lookup'):
+            pass
+        timer.intent = 'pedir_resumo'
+        timer.observe()
+
+        self.assertEqual(REGISTRY.get_sample_value('message_pipeline_stage_seconds_count', labels), before + 1)
+        self.assertGreaterEqual(
+            REGISTRY.get_sample_value('message_received_to_replied_seconds_sum', {'intent': 'pedir_resumo'}), 2
+        )
+
+    def test_metrics_endpoint(self):
+        """
+        Garante que o endpoint /metrics/ expõe os histogramas no formato do Prometheus.
+        """
+        response = self.client.get('/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'webhook_accept_seconds_bucket', response.content)
+
+
+class TracingTests(TestCase):
+    """
+    Suite de testes para o trace das mensagens entre processos.
+    """
+
+    def setUp(self):
+        trace_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(trace_dir.cleanup)
+        self.trace_file = Path(trace_dir.name) / 'traces.ndjson'
+        settings_override = override_settings(TRACING_EXPORTER='file', TRACING_FILE=str(self.trace_file))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_trace_continues_across_celery_headers(self):
+        """
+        Garante que o trace criado no webhook segue para a tarefa pelo cabeçalho e inclui as consultas ao banco.
+        """
+        trace_id = trace_id_for_wamid("wamid.trace")
+        headers = {}
+        with span('webhook.accept', trace_id=trace_id):
+            inject_trace_context(headers=headers)
+
+        with span('celery.process', traceparent=headers['traceparent']):
+            with span('stage.user_lookup'):
+                User.objects.filter(username='ninguem').exists()
+
+        spans = {item['name']: item for item in map(json.loads, self.trace_file.read_text().splitlines())}
+        self.assertEqual({item['trace_id'] for item in spans.values()}, {trace_id})
+        self.assertEqual(spans['celery.process']['parent_id'], spans['webhook.accept']['span_id'])
+        self.assertEqual(spans['db.query']['parent_id'], spans['stage.user_lookup']['span_id'])
+
+        output = StringIO()
+        call_command('show_trace', 'wamid.trace', stdout=output)
+        self.assertIn('stage.user_lookup', output.getvalue())
+
+    @override_settings(TRACING_EXPORTER='otlp')
+    def test_full_export_queue_drops_trace_without_blocking(self):
+        """
+        Garante que, com a fila do exportador OTLP cheia, o trace é descartado e contado em vez de travar a mensagem.
+        """
+        full_queue = queue.Queue(maxsize=1)
+        full_queue.put_nowait([])
+        dropped_before = tracing._dropped_traces
+
+        with mock.patch('core.tracing._get_export_queue', return_value=full_queue):
+            with span('webhook.accept', trace_id=trace_id_for_wamid("wamid.full")):
+                pass
+
+        self.assertEqual(tracing._dropped_traces, dropped_before + 1)
+        self.assertEqual(full_queue.qsize(), 1)
+
+
+def _busy_function():
+    return sum(index * index for index in range(20000))
+
+
+class ProfilingTests(SimpleTestCase):
+    """
+    Suite de testes para a amostragem de perfis das tarefas.
+    """
+
+    def test_sampled_profiles_are_saved_and_aggregated(self):
+        """
+        Garante que, amostrada, a execução grava um perfil nomeado por tipo, intenção e tarefa, e que o relatório o lê.
+        """
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_DIR=profile_dir):
+                with sampled_profile('webhook', 'task-0') as profile:
+                    self.assertIsNone(profile)
+
+            with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=profile_dir):
+                for task_id in ('task-1', 'task-2'):
+                    with sampled_profile('webhook', task_id) as profile:
+                        _busy_function()
+                        profile.label = 'pedir_resumo'
+
+            self.assertEqual(
+                sorted(path.name for path in Path(profile_dir).iterdir()),
+                ['webhook-pedir_resumo-task-1.prof.gz', 'webhook-pedir_resumo-task-2.prof.gz'],
+            )
+            output = StringIO()
+            call_command('profile_report', dir=profile_dir, intent='pedir_resumo', stdout=output)
+            self.assertIn("2 perfis agregados", output.getvalue())
+            self.assertIn("_busy_function", output.getvalue())
+
+
+class LoggingTests(SimpleTestCase):
+    """
+    Suite de testes para o logging estruturado e em segundo plano.
+    """
+
+    @override_settings(LOG_PAYLOAD_SAMPLE_RATE={'INFO': 0.0, 'ERROR': 1.0}, LOG_PAYLOAD_MAX_CHARS={'ERROR': 10})
+    def test_payloads_are_sampled_and_truncated_per_level(self):
+        """
+        Garante que conteúdos grandes respeitam a amostragem e o tamanho máximo do nível.
+        """
+        logger = logging.getLogger('core.tests.payload')
+        with self.assertLogs(logger, level='INFO') as captured:
+            log_payload(logger, logging.INFO, "Resposta da IA do usuário %s", "x" * 50, 'u1')
+            log_payload(logger, logging.ERROR, "Resposta da IA do usuário %s", "y" * 50, 'u1')
+
+        self.assertEqual(len(captured.records), 1)
+        record = captured.records[0]
+        self.assertEqual(record.getMessage(), f"Resposta da IA do usuário u1 (50 caracteres): {'y' * 10}... [truncado]")
+        self.assertEqual(record.payload_chars, 50)
+
+    def test_celery_worker_keeps_background_handler(self):
+        """
+        Garante que a configuração de logging do worker do Celery mantém o handler em segundo plano na raiz.
+        """
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        self.addCleanup(setattr, root, 'level', level)
+        self.addCleanup(setattr, root, 'handlers', handlers)
+        self.addCleanup(setattr, celery_app.log, 'already_setup', celery_app.log.already_setup)
+        celery_app.log.already_setup = False
+
+        celery_app.log.setup_logging_subsystem(loglevel='INFO')
+
+        self.assertTrue(any(isinstance(handler, BackgroundQueueHandler) for handler in root.handlers))
+        self.assertFalse(any(type(handler) is logging.StreamHandler for handler in root.handlers))
+
+    def test_background_handler_formats_json_off_the_caller(self):
+        """
+        Garante que o handler enfileira o registro sem formatá-lo, descarta quando a fila enche
+        e que a saída é uma linha JSON com os campos do `extra`.
+        """
+        handler = BackgroundQueueHandler(queue_size=1)
+        handler.stop()
+        record = logging.LogRecord('financeiro', logging.INFO, __file__, 1, "Mensagem de %s", ('u1',), None)
+        record.trace_id = 'abc'
+        record.intent = 'pedir_resumo'
+
+        handler.handle(record)
+        handler.handle(record)
+        queued = handler.queue.get_nowait()
+        self.assertIs(queued, record)
+        self.assertEqual(queued.args, ('u1',))
+        self.assertEqual(handler.dropped, 1)
+
+        entry = json.loads(JsonFormatter().format(queued))
+        self.assertEqual(
+            (entry['level'], entry['message'], entry['trace_id'], entry['intent']),
+            ('INFO', "Mensagem de u1", 'abc', 'pedir_resumo'),
+        )
+
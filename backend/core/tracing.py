@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo do SQL guardado em cada span de banco.
+DB_STATEMENT_MAX_LENGTH = 500
+# Limite de spans guardados por trace; tarefas em lote longas não acumulam spans sem fim na memória.
+MAX_SPANS_PER_TRACE = 2000
+
+
+class Span:
+    """
+    Um trecho cronometrado de um trace. Os spans de um mesmo processo ficam na lista do span raiz
+    e são exportados juntos quando ele termina.
+    """
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'root', 'finished')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], root: Optional['Span'], attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.root = root or self
+        self.finished: list[Span] = []
+
+    @property
+    def traceparent(self) -> str:
+        # Formato W3C Trace Context, usado para propagar o trace entre processos.
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1_000_000, 3),
+            'attributes': self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def trace_id_for_wamid(wamid: str) -> str:
+    """
+    Deriva o trace id (128 bits) do WAMID da mensagem recebida. Como é determinístico, o trace de uma
+    conversa pode ser encontrado a partir do id da mensagem do WhatsApp.
+    """
+    return hashlib.sha256(wamid.encode()).hexdigest()[:32]
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active_span = _current_span.get()
+    return active_span.trace_id if active_span else None
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, traceparent: Optional[str] = None, **attributes):
+    """
+    Abre um span filho do span atual. Sem span atual, abre um novo trace: com o `trace_id` informado,
+    com o contexto remoto de um `traceparent` (vindo de outro processo) ou com um id aleatório.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        new_span = Span(name, parent.trace_id, parent.span_id, parent.root, attributes)
+    else:
+        parent_id = None
+        if traceparent:
+            try:
+                _, trace_id, parent_id, _ = traceparent.split('-')
+            except ValueError:
+                logger.warning(f"Invalid traceparent header ignored: '{traceparent}'")
+        new_span = Span(name, trace_id or os.urandom(16).hex(), parent_id, None, attributes)
+
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except Exception as e:
+        new_span.attributes['error'] = repr(e)
+        raise
+    finally:
+        new_span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if new_span.root is new_span:
+            new_span.finished.append(new_span)
+            _export(new_span.finished)
+        elif len(new_span.root.finished) < MAX_SPANS_PER_TRACE:
+            new_span.root.finished.append(new_span)
+
+
+def trace_db_query(execute, sql, params, many, context):
+    """
+    Wrapper de execução do Django (`connection.execute_wrapper`) que registra cada consulta como um span,
+    apenas quando há um trace ativo e exportado; fora disso, o custo é uma leitura de ContextVar.
+    """
+    if _current_span.get() is None or settings.TRACING_EXPORTER == 'none':
+        return execute(sql, params, many, context)
+    with span('db.query', **{'db.statement': sql[:DB_STATEMENT_MAX_LENGTH], 'db.many': many}):
+        return execute(sql, params, many, context)
+
+
+def install_db_tracing(sender, connection, **kwargs):
+    """
+    Receptor do sinal `connection_created`: instala o wrapper de trace em cada nova conexão.
+    """
+    if trace_db_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_db_query)
+
+
+class TraceIdLogFilter(logging.Filter):
+    """
+    Adiciona o trace id atual aos registros de log, para correlacionar os logs de web e worker de uma mesma mensagem.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or '-'
+        return True
+
+
+# ==============================================================================
+# EXPORTAÇÃO
+# ==============================================================================
+_export_queue: Optional[queue.Queue] = None
+_export_lock = threading.Lock()
+_dropped_traces = 0
+
+
+def _export(spans: list[Span]):
+    """
+    Envia os spans de um trace para o destino configurado em TRACING_EXPORTER ('none', 'file' ou 'otlp').
+    """
+    exporter = settings.TRACING_EXPORTER
+    if exporter == 'file':
+        lines = "".join(json.dumps(finished_span.to_dict(), default=str) + "\n" for finished_span in spans)
+        with _export_lock, open(settings.TRACING_FILE, 'a', encoding='utf-8') as trace_file:
+            trace_file.write(lines)
+    elif exporter == 'otlp':
+        # O envio ao coletor acontece em uma thread de fundo, fora do caminho da mensagem.
+        # Com o coletor lento ou fora do ar a fila enche; o trace é descartado em vez de travar a mensagem.
+        try:
+            _get_export_queue().put_nowait([finished_span.to_dict() for finished_span in spans])
+        except queue.Full:
+            _count_dropped_trace()
+
+
+def _get_export_queue() -> queue.Queue:
+    global _export_queue
+    with _export_lock:
+        if _export_queue is None:
+            _export_queue = queue.Queue(maxsize=10_000)
+            threading.Thread(target=_otlp_worker, args=(_export_queue,), name='trace-exporter', daemon=True).start()
+    return _export_queue
+
+
+def _count_dropped_trace():
+    global _dropped_traces
+    _dropped_traces += 1
+    if _dropped_traces == 1 or _dropped_traces % 1000 == 0:
+        logger.warning("Trace export queue is full; %s traces dropped so far.", _dropped_traces)
+
+
+def _otlp_worker(export_queue: queue.Queue):
+    while True:
+        spans = export_queue.get()
+        try:
+            requests.post(settings.TRACING_OTLP_ENDPOINT, json=to_otlp_payload(spans), timeout=5)
+        except requests.exceptions.RequestException:
+            logger.warning("Failed to export spans to the OTLP collector.", exc_info=True)
+
+
+def to_otlp_payload(spans: list[dict]) -> dict:
+    """
+    Converte spans para o formato OTLP/HTTP em JSON, aceito por coletores OpenTelemetry, Jaeger e Tempo.
+    """
+    def to_attribute(key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    return {'resourceSpans': [{
+        'resource': {'attributes': [to_attribute('service.name', settings.TRACING_SERVICE_NAME)]},
+        'scopeSpans': [{
+            'scope': {'name': 'core.tracing'},
+            'spans': [{
+                'traceId': span_data['trace_id'],
+                'spanId': span_data['span_id'],
+                'parentSpanId': span_data['parent_id'] or '',
+                'name': span_data['name'],
+                'kind': 1,
+                'startTimeUnixNano': str(span_data['start_ns']),
+                'endTimeUnixNano': str(span_data['end_ns']),
+                'attributes': [to_attribute(key, value) for key, value in span_data['attributes'].items()],
+            } for span_data in spans],
+        }],
+    }]}
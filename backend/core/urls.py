@@ -3,6 +3,11 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from .metrics import metrics_view
+
+# Extensões do schema OpenAPI (registradas ao importar o módulo).
+from . import schema  # noqa: F401
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -13,6 +18,9 @@ urlpatterns = [
     # Endpoints de Health Check
     path('health/', include('health_check.urls')),
 
+    # Métricas no formato do Prometheus
+    path('metrics/', metrics_view, name='metrics'),
+
     # Endpoints da API
     path('api/login/', TokenObtainPairView.as_view(), name='login'),
     path('api/login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -20,6 +28,13 @@ urlpatterns = [
     # Endpoints da API de Usuários
     path('api/users/', include('users.urls')),
 
+    # Endpoints de leitura de despesas e rendas
+    path('api/expenses/', include('expenses.urls')),
+    path('api/incomes/', include('incomes.urls')),
+
     # Endpoints webhook da Meta
     path('api/meta/', include('meta.urls')),
+
+    # Endpoints de importação de extratos
+    path('api/imports/', include('imports.urls')),
 ]
\ No newline at end of file
@@ -12,4 +12,5 @@ class ExpenseAdmin(admin.ModelAdmin):
     list_display = ('transaction_date', 'user', 'amount', 'description', 'category')
     search_fields = ('description', 'user__username')
     list_filter = ('user', 'category', 'transaction_date')
-    raw_id_fields = ('user', 'category')
\ No newline at end of file
+    raw_id_fields = ('user', 'category')
+    list_select_related = ('user', 'category')
\ No newline at end of file
@@ -0,0 +1,31 @@
+from decimal import Decimal
+from typing import Optional
+
+from .models import Category
+
+# Frações do orçamento que disparam alerta quando ultrapassadas, da maior para a menor.
+BUDGET_ALERT_THRESHOLDS = (Decimal('1.00'), Decimal('0.80'))
+
+
+def get_budget_alert(category: Optional[Category], previous_total: Decimal, new_total: Decimal) -> Optional[str]:
+    """
+    Compara o total mensal da categoria antes e depois de uma escrita e retorna o alerta
+    do maior limite cruzado nesta escrita (80% ou 100% do orçamento), ou None.
+    Usa apenas os totais já mantidos pelos rollups, sem consultas adicionais.
+    """
+    if not category or not category.monthly_budget:
+        return None
+
+    budget = category.monthly_budget
+    for threshold in BUDGET_ALERT_THRESHOLDS:
+        limit = budget * threshold
+        if previous_total < limit <= new_total:
+            return _format_budget_alert(category.name, threshold, new_total, budget)
+    return None
+
+
+def _format_budget_alert(category_name: str, threshold: Decimal, total: Decimal, budget: Decimal) -> str:
+    percent_used = total / budget * 100
+    if threshold >= 1:
+        return f"🚨 Você ultrapassou o orçamento de *{category_name}* deste mês: R$ {total:.2f} de R$ {budget:.2f} ({percent_used:.0f}%)."
+    return f"⚠️ Atenção: você já usou {percent_used:.0f}% do orçamento de *{category_name}* deste mês (R$ {total:.2f} de R$ {budget:.2f})."
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:24
+
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def create_description_trigram_index(apps, schema_editor):
+    """
+    Cria o índice GIN trigram da descrição, usado pelas buscas por palavra-chave.
+    Só existe no PostgreSQL; no SQLite de desenvolvimento a busca usa `icontains`.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS expenses_expense_description_trgm "
+        "ON expenses_expense USING gin (description gin_trgm_ops)"
+    )
+
+
+def drop_description_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS expenses_expense_description_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_initial'),
+        ('payments', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'transaction_date'], name='expenses_user_date_idx'),
+        ),
+        # No-op fora do PostgreSQL.
+        TrigramExtension(),
+        migrations.RunPython(create_description_trigram_index, drop_description_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_expense_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='monthly_budget',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Orçamento mensal da categoria (opcional)', max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_category_monthly_budget'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='transaction_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_uuid7_primary_key'),
+        ('payments', '0003_paymentmethod_due_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identificador do lançamento no extrato importado (ex: FITID do OFX)', max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('user', 'external_id'), name='expenses_user_external_id_uniq'),
+        ),
+    ]
@@ -1,12 +1,16 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from core.ids import uuid7
 from payments.models import PaymentMethod
 
 class Category(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
+    monthly_budget = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Orçamento mensal da categoria (opcional)")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -18,16 +22,26 @@ class Category(models.Model):
         return self.name
 
 class Expense(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='expenses')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='expenses')
     amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Valor da despesa")
     description = models.CharField(max_length=255, help_text="Descrição da despesa")
-    transaction_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    transaction_date = models.DateTimeField(default=timezone.now, db_index=True)
     payment_method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, blank=True, related_name='expenses')
+    external_id = models.CharField(max_length=255, null=True, blank=True, help_text="Identificador do lançamento no extrato importado (ex: FITID do OFX)")
 
     def __str__(self):
         return f"R${self.amount} - {self.description}"
 
     class Meta:
-        ordering = ['-transaction_date']
\ No newline at end of file
+        ordering = ['-transaction_date']
+        indexes = [
+            # Consultas por período de um usuário (relatórios e `consultar_gastos`).
+            # O índice trigram da descrição só existe no PostgreSQL e é criado na migração 0003.
+            models.Index(fields=['user', 'transaction_date'], name='expenses_user_date_idx'),
+        ]
+        constraints = [
+            # Reimportar o mesmo extrato não duplica os lançamentos (ver imports/services.py).
+            models.UniqueConstraint(fields=['user', 'external_id'], name='expenses_user_external_id_uniq'),
+        ]
\ No newline at end of file
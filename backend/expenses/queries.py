@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, QuerySet, Sum
+from django.utils import timezone
+
+from users.models import User
+from users.services import get_data_version
+from .models import Expense
+
+logger = logging.getLogger(__name__)
+
+# Tempo máximo que o resultado de uma consulta fica em cache (a versão dos dados já o invalida antes disso).
+QUERY_CACHE_TIMEOUT = 60 * 60
+QUERY_CACHE_KEY = "expense-query:{user_id}:{version}:{digest}"
+
+# Quantidade de despesas individuais listadas na resposta.
+TOP_EXPENSES_LIMIT = 5
+
+
+def parse_expense_query(ai_plan: dict) -> dict:
+    """
+    Normaliza o plano estruturado da IA para a intenção `consultar_gastos`.
+    Datas ausentes ou inválidas caem no mês corrente; `end_date` é inclusiva.
+    """
+    today = timezone.localdate()
+    start_date = _parse_date(ai_plan.get("start_date")) or today.replace(day=1)
+    end_date = _parse_date(ai_plan.get("end_date")) or today
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "category": (ai_plan.get("category") or "").strip() or None,
+        "keyword": (ai_plan.get("keyword") or "").strip() or None,
+        "payment_method": (ai_plan.get("payment_method") or "").strip() or None,
+    }
+
+
+def query_expenses(user: User, ai_plan: dict) -> dict:
+    """
+    Executa uma consulta de gastos a partir do plano da IA e retorna total, quantidade e maiores despesas.
+    O resultado fica em cache até a próxima alteração nos dados do usuário.
+    """
+    filters = parse_expense_query(ai_plan)
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    cache_key = QUERY_CACHE_KEY.format(user_id=user.id, version=get_data_version(user.id), digest=digest)
+
+    result = cache.get(cache_key)
+    if result is not None:
+        logger.info(f"Expense query for user {user.id} served from cache.")
+        return result
+
+    expenses = _build_queryset(user, filters)
+    totals = expenses.aggregate(total=Sum('amount'), count=Count('id'))
+    top_expenses = list(
+        expenses.order_by('-amount').values('description', 'amount', 'transaction_date')[:TOP_EXPENSES_LIMIT]
+    )
+
+    result = {
+        "filters": filters,
+        "total": totals['total'] or Decimal('0.00'),
+        "count": totals['count'],
+        "top_expenses": top_expenses,
+    }
+    cache.set(cache_key, result, QUERY_CACHE_TIMEOUT)
+    logger.info(f"Expense query for user {user.id} executed: {totals['count']} expenses matched.")
+    return result
+
+
+def _build_queryset(user: User, filters: dict) -> QuerySet:
+    """
+    Monta o queryset filtrado. O intervalo de datas usa o índice (user, transaction_date).
+    """
+    start = _local_midnight(date.fromisoformat(filters["start_date"]))
+    end = _local_midnight(date.fromisoformat(filters["end_date"]) + timedelta(days=1))
+    expenses = Expense.objects.filter(user=user, transaction_date__gte=start, transaction_date__lt=end)
+
+    if filters["category"]:
+        expenses = expenses.filter(category__name__iexact=filters["category"])
+    if filters["payment_method"]:
+        expenses = expenses.filter(payment_method__name__iexact=filters["payment_method"])
+    if filters["keyword"]:
+        expenses = _filter_by_description(expenses, filters["keyword"])
+    return expenses
+
+
+def _filter_by_description(expenses: QuerySet, keyword: str) -> QuerySet:
+    """
+    Filtra pela descrição. No PostgreSQL usa o operador de similaridade por palavra do pg_trgm,
+    atendido pelo índice GIN `expenses_expense_description_trgm`; no SQLite de desenvolvimento, cai no `icontains`.
+    """
+    if connection.vendor == 'postgresql':
+        return expenses.filter(description__trigram_word_similar=keyword)
+    return expenses.filter(description__icontains=keyword)
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
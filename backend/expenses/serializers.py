@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from .models import Expense
+
+class ExpenseSerializer(serializers.ModelSerializer):
+    """
+    Serializer de leitura para despesas.
+    Expõe a categoria e a forma de pagamento pelo nome, como o usuário as vê no WhatsApp.
+    """
+    category = serializers.CharField(source='category.name', default=None, read_only=True)
+    payment_method = serializers.CharField(source='payment_method.name', default=None, read_only=True)
+
+    class Meta:
+        model = Expense
+        fields = ['id', 'amount', 'description', 'transaction_date', 'category', 'payment_method']
+        read_only_fields = fields
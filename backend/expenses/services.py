@@ -1,11 +1,15 @@
 # backend/expenses/services.py
 import logging
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from typing import Optional
 
+from django.db import transaction
+
 from users.models import User
 from .models import Expense, Category
 from payments.models import PaymentMethod
+from summaries.rollups import apply_expense_delta, move_expense_between_categories, merge_category_rollups
+from .budgets import get_budget_alert
 
 logger = logging.getLogger(__name__)
 
@@ -28,11 +32,12 @@ def create_default_categories_for_user(user: User):
     for category_name in DEFAULT_CATEGORY_NAMES:
         Category.objects.get_or_create(user=user, name=category_name)
 
-    logger.info(f"Standard categories created for user {user.id}")
+    logger.info("Standard categories created for user %s", user.id)
 
-def create_expense_from_ai_plan(user: User, ai_plan: dict) -> Expense | None:
+def create_expense_from_ai_plan(user: User, ai_plan: dict) -> tuple[Optional[Expense], Optional[str]]:
     """
     Cria e salva um novo registro de despesa a partir do plano da IA.
+    Retorna a despesa e, se a escrita cruzou 80% ou 100% do orçamento da categoria, o texto do alerta.
     """
     amount = ai_plan.get("amount")
     description = ai_plan.get("description")
@@ -41,7 +46,7 @@ def create_expense_from_ai_plan(user: User, ai_plan: dict) -> Expense | None:
     payment_method = None
 
     if not (amount and description and category_name):
-        return None
+        return None, None
 
     if payment_method_name:
         # Busca ou cria a forma de pagamento pelo nome extraído
@@ -53,15 +58,24 @@ def create_expense_from_ai_plan(user: User, ai_plan: dict) -> Expense | None:
     # Busca a categoria específica do usuário pelo nome retornado pela IA.
     category, _ = Category.objects.get_or_create(user=user, name=category_name)
     
-    expense = Expense.objects.create(
-        user=user,
-        amount=Decimal(amount),
-        description=description,
-        category=category,
-        payment_method=payment_method
-    )
-    logger.info(f"New expense registered for user {user.id}: R${amount} in '{description}' (Cat: {category.name})")
-    return expense
+    with transaction.atomic():
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal(amount),
+            description=description,
+            category=category,
+            payment_method=payment_method
+        )
+        new_total = apply_expense_delta(
+            user.id, category.id, expense.transaction_date, expense.amount,
+            return_total=category.monthly_budget is not None
+        )
+    logger.info("New expense registered for user %s: R$%s in '%s' (Cat: %s)", user.id, amount, description, category.name)
+
+    budget_alert = None
+    if new_total is not None:
+        budget_alert = get_budget_alert(category, new_total - expense.amount, new_total)
+    return expense, budget_alert
 
 def delete_last_expense(user: User) -> Optional[Expense]:
     """
@@ -71,33 +85,38 @@ def delete_last_expense(user: User) -> Optional[Expense]:
     last_expense = Expense.objects.filter(user=user).order_by('-transaction_date').first()
     
     if last_expense:
-        logger.info(f"Deleting the last expense (ID: {last_expense.id}) for user {user.id}.")
-        last_expense.delete()
+        logger.info("Deleting the last expense (ID: %s) for user %s.", last_expense.id, user.id)
+        with transaction.atomic():
+            last_expense.delete()
+            apply_expense_delta(user.id, last_expense.category_id, last_expense.transaction_date, -last_expense.amount, count=-1)
         return last_expense
 
-    logger.warning(f"Attempted to delete, but no expense was found for user {user.id}.")
+    logger.warning("Attempted to delete, but no expense was found for user %s.", user.id)
     return None
 
-def edit_last_expense(user: User, ai_plan: dict) -> Optional[Expense]:
+def edit_last_expense(user: User, ai_plan: dict) -> tuple[Optional[Expense], Optional[str]]:
     """
     Encontra e edita a última despesa registrada com os novos dados do plano da IA.
     Permite edições parciais (apenas valor, apenas descrição, ou ambos).
+    Retorna a despesa editada e o alerta de orçamento, se o novo valor cruzou algum limite.
     """
     try:
-        last_expense = Expense.objects.filter(user=user).latest('transaction_date')
+        last_expense = Expense.objects.select_related('category').filter(user=user).latest('transaction_date')
     except Expense.DoesNotExist:
-        logger.warning(f"Attempted to edit, but no expense was found for user {user.id}.")
-        return None
+        logger.warning("Attempted to edit, but no expense was found for user %s.", user.id)
+        return None, None
 
     new_amount = ai_plan.get("amount")
     new_description = ai_plan.get("description")
 
     if not new_amount and not new_description:
-        logger.warning(f"Attempted to edit expense {last_expense.id}, but no new data was provided.")
-        return None
+        logger.warning("Attempted to edit expense %s, but no new data was provided.", last_expense.id)
+        return None, None
 
     fields_to_update = []
+    amount_delta = Decimal('0.00')
     if new_amount:
+        amount_delta = Decimal(new_amount) - last_expense.amount
         last_expense.amount = Decimal(new_amount)
         fields_to_update.append('amount')
     
@@ -105,10 +124,22 @@ def edit_last_expense(user: User, ai_plan: dict) -> Optional[Expense]:
         last_expense.description = new_description
         fields_to_update.append('description')
     
-    last_expense.save(update_fields=fields_to_update)
+    new_total = None
+    with transaction.atomic():
+        last_expense.save(update_fields=fields_to_update)
+        if amount_delta:
+            has_budget = last_expense.category is not None and last_expense.category.monthly_budget is not None
+            new_total = apply_expense_delta(
+                user.id, last_expense.category_id, last_expense.transaction_date, amount_delta,
+                count=0, return_total=has_budget
+            )
 
-    logger.info(f"Expense (ID: {last_expense.id}) successfully edited for user {user.id}. Updated fields: {fields_to_update}")
-    return last_expense
+    logger.info("Expense (ID: %s) successfully edited for user %s. Updated fields: %s", last_expense.id, user.id, fields_to_update)
+
+    budget_alert = None
+    if new_total is not None:
+        budget_alert = get_budget_alert(last_expense.category, new_total - amount_delta, new_total)
+    return last_expense, budget_alert
 
 def change_last_expense_category(user: User, ai_plan: dict) -> Optional[Expense]:
     """
@@ -117,13 +148,13 @@ def change_last_expense_category(user: User, ai_plan: dict) -> Optional[Expense]
     """
     new_category_name = ai_plan.get("category")
     if not new_category_name:
-        logger.warning(f"Attempted to change category, but no new category name was provided.")
+        logger.warning("Attempted to change category, but no new category name was provided.")
         return None
 
     try:
         last_expense = Expense.objects.filter(user=user).latest('transaction_date')
     except Expense.DoesNotExist:
-        logger.warning(f"Attempted to change category, but no expense was found for user {user.id}.")
+        logger.warning("Attempted to change category, but no expense was found for user %s.", user.id)
         return None
     
     # Capitaliza o nome da categoria para manter um padrão (ex: "lazer" -> "Lazer")
@@ -135,13 +166,16 @@ def change_last_expense_category(user: User, ai_plan: dict) -> Optional[Expense]
         name=new_category_name
     )
     if created:
-        logger.info(f"New category '{new_category_name}' created for user {user.id}.")
+        logger.info("New category '%s' created for user %s.", new_category_name, user.id)
 
     # Atribui a nova categoria e salva a alteração.
+    old_category_id = last_expense.category_id
     last_expense.category = new_category
-    last_expense.save(update_fields=['category'])
+    with transaction.atomic():
+        last_expense.save(update_fields=['category'])
+        move_expense_between_categories(last_expense, old_category_id, new_category.id)
 
-    logger.info(f"Category of expense (ID: {last_expense.id}) changed to '{new_category_name}' for user {user.id}.")
+    logger.info("Category of expense (ID: %s) changed to '%s' for user %s.", last_expense.id, new_category_name, user.id)
     return last_expense
 
 def create_new_category(user: User, ai_plan: dict) -> tuple[Optional[Category], bool]:
@@ -163,9 +197,9 @@ def create_new_category(user: User, ai_plan: dict) -> tuple[Optional[Category],
     )
     
     if created:
-        logger.info(f"Nova categoria '{category_name}' criada para o usuário {user.id}.")
+        logger.info("Nova categoria '%s' criada para o usuário %s.", category_name, user.id)
     else:
-        logger.info(f"Categoria '{category_name}' já existia para o usuário {user.id}.")
+        logger.info("Categoria '%s' já existia para o usuário %s.", category_name, user.id)
 
     return category, created
 
@@ -186,14 +220,48 @@ def delete_category_by_name(user: User, ai_plan: dict) -> bool:
         # Garante que a categoria "Outros" exista antes de mover as despesas
         other_category, _ = Category.objects.get_or_create(user=user, name="Outros")
 
-        # Move todas as despesas da categoria antiga para "Outros"
-        Expense.objects.filter(category=category_to_delete).update(category=other_category)
-        
-        # Deleta a categoria
-        category_to_delete.delete()
-        logger.info(f"Categoria '{category_name}' deletada para o usuário {user.id}. Despesas movidas para 'Outros'.")
+        with transaction.atomic():
+            # Move todas as despesas da categoria antiga para "Outros"
+            Expense.objects.filter(category=category_to_delete).update(category=other_category)
+            # Se a própria "Outros" está sendo apagada, suas despesas ficam sem categoria.
+            target_category_id = other_category.id if other_category.id != category_to_delete.id else None
+            merge_category_rollups(user.id, category_to_delete.id, target_category_id)
+
+            # Deleta a categoria
+            category_to_delete.delete()
+        logger.info("Categoria '%s' deletada para o usuário %s. Despesas movidas para 'Outros'.", category_name, user.id)
         return True
 
     except Category.DoesNotExist:
-        logger.warning(f"Tentativa de deletar categoria '{category_name}' que não existe para o usuário {user.id}.")
-        return False
\ No newline at end of file
+        logger.warning("Tentativa de deletar categoria '%s' que não existe para o usuário %s.", category_name, user.id)
+        return False
+
+def set_category_budget(user: User, ai_plan: dict) -> Optional[Category]:
+    """
+    Define (ou remove, com valor zero) o orçamento mensal de uma categoria do usuário.
+    Se a categoria não existir, ela é criada. Valores inválidos ou negativos são recusados.
+    """
+    category_name = ai_plan.get("category")
+    if not category_name or ai_plan.get("amount") is None:
+        return None
+    try:
+        amount = Decimal(str(ai_plan.get("amount")))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    if not amount.is_finite() or amount < 0:
+        return None
+
+    category_name = category_name.capitalize()
+    category, created = Category.objects.get_or_create(
+        user=user,
+        name__iexact=category_name,
+        defaults={'name': category_name}
+    )
+    if created:
+        logger.info("New category '%s' created for user %s while setting a budget.", category_name, user.id)
+
+    category.monthly_budget = amount or None
+    category.save(update_fields=['monthly_budget'])
+
+    logger.info("Monthly budget of category '%s' set to %s for user %s.", category.name, category.monthly_budget, user.id)
+    return category
@@ -1,3 +1,188 @@
+import base64
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from .models import Category, Expense
+from .queries import query_expenses
+from .services import create_expense_from_ai_plan, edit_last_expense, set_category_budget
+
+
+class ExpenseQueryTests(TestCase):
+    """
+    Suite de testes para as consultas de gastos em linguagem natural (`consultar_gastos`).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='queryuser', phone_number='5511900000002')
+        self.transport = Category.objects.create(user=self.user, name="Transporte")
+        self.food = Category.objects.create(user=self.user, name="Alimentação")
+        self.today = timezone.localdate()
+
+        Expense.objects.create(user=self.user, category=self.transport, amount=Decimal('25.00'), description="Uber para o trabalho")
+        Expense.objects.create(user=self.user, category=self.transport, amount=Decimal('18.50'), description="uber volta")
+        Expense.objects.create(user=self.user, category=self.food, amount=Decimal('40.00'), description="almoço")
+
+    def _plan(self, **filters):
+        plan = {"intent": "consultar_gastos", "start_date": (self.today - timedelta(days=1)).isoformat(), "end_date": self.today.isoformat()}
+        plan.update(filters)
+        return plan
+
+    def test_filters_by_keyword_and_category(self):
+        """
+        Garante que a palavra-chave e a categoria restringem as despesas somadas.
+        """
+        by_keyword = query_expenses(self.user, self._plan(keyword="uber"))
+        self.assertEqual(by_keyword["count"], 2)
+        self.assertEqual(by_keyword["total"], Decimal('43.50'))
+
+        by_category = query_expenses(self.user, self._plan(category="alimentação"))
+        self.assertEqual(by_category["count"], 1)
+        self.assertEqual(by_category["top_expenses"][0]["description"], "almoço")
+
+    def test_date_range_excludes_other_periods(self):
+        """
+        Garante que despesas fora do período pedido não entram no total.
+        """
+        past_range = self._plan(start_date="2001-01-01", end_date="2001-01-31")
+        self.assertEqual(query_expenses(self.user, past_range)["count"], 0)
+
+    def test_result_is_cached_until_data_changes(self):
+        """
+        Garante que a mesma consulta não vai ao banco até que o usuário altere seus dados.
+        """
+        plan = self._plan(keyword="uber")
+        query_expenses(self.user, plan)
+        with self.assertNumQueries(0):
+            query_expenses(self.user, plan)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, category=self.transport, amount=Decimal('10.00'), description="uber noite")
+
+        self.assertEqual(query_expenses(self.user, plan)["count"], 3)
+
+
+class CategoryBudgetTests(TestCase):
+    """
+    Suite de testes para os alertas de orçamento mensal por categoria.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='budgetuser', phone_number='5511900000003')
+        Category.objects.create(user=self.user, name="Lazer", monthly_budget=Decimal('100.00'))
+
+    def _register(self, amount):
+        return create_expense_from_ai_plan(self.user, {"amount": amount, "description": "cinema", "category": "Lazer"})
+
+    def test_alerts_only_when_threshold_is_crossed(self):
+        """
+        Garante que o alerta aparece apenas na escrita que cruza 80% ou 100% do orçamento.
+        """
+        _, alert = self._register(50)
+        self.assertIsNone(alert)
+
+        _, alert = self._register(35)
+        self.assertIn("85%", alert)
+
+        _, alert = self._register(5)
+        self.assertIsNone(alert)
+
+        _, alert = edit_last_expense(self.user, {"amount": 20})
+        self.assertIn("ultrapassou", alert)
+
+    def test_category_without_budget_has_no_alert(self):
+        """
+        Garante que categorias sem orçamento não geram alerta.
+        """
+        _, alert = create_expense_from_ai_plan(self.user, {"amount": 1000, "description": "mercado", "category": "Alimentação"})
+        self.assertIsNone(alert)
+
+    def test_invalid_budget_amount_is_rejected(self):
+        """
+        Garante que valores inválidos ou negativos não alteram o orçamento nem criam a categoria.
+        """
+        for amount in ("cem reais", -50, [100]):
+            with self.subTest(amount=amount):
+                self.assertIsNone(set_category_budget(self.user, {"category": "viagem", "amount": amount}))
+        self.assertFalse(Category.objects.filter(user=self.user, name="Viagem").exists())
+
+        category = set_category_budget(self.user, {"category": "lazer", "amount": 0})
+        self.assertIsNone(category.monthly_budget)
+
+
+class ExpenseAPITests(APITestCase):
+    """
+    Suite de testes para a API de leitura de despesas (paginação por cursor e GET condicional).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='apiuser', phone_number='5511900000008')
+        other_user = User.objects.create_user(username='otheruser', phone_number='5511900000009')
+        food = Category.objects.create(user=self.user, name="Alimentação")
+        now = timezone.now()
+        for day in range(5):
+            expense = Expense.objects.create(user=self.user, category=food, amount=Decimal('10.00') + day, description=f"gasto {day}")
+            Expense.objects.filter(pk=expense.pk).update(transaction_date=now - timedelta(days=day))
+        # Duas despesas no mesmo instante: o desempate pelo id não pode repetir nem pular itens.
+        Expense.objects.filter(description="gasto 4").update(transaction_date=now - timedelta(days=3))
+        Expense.objects.create(user=other_user, amount=Decimal('99.00'), description="de outro usuário")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_keyset_pagination_walks_all_pages(self):
+        """
+        Garante que as páginas seguem do mais recente ao mais antigo, sem repetir itens nem mostrar dados de outros usuários.
+        """
+        url, seen = '/api/expenses/?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [item['description'] for item in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), {f"gasto {day}" for day in range(5)})
+        self.assertEqual(seen[:3], ["gasto 0", "gasto 1", "gasto 2"])
+
+    def test_malformed_cursor_returns_404(self):
+        """
+        Garante que cursores com id ou data inválidos voltam 404 em vez de erro 500.
+        """
+        for raw in ("2025-03-05T10:00:00+00:00|nao-e-uuid", "ontem|0190a1b2-0000-7000-8000-000000000000", "sem-separador"):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                self.assertEqual(self.client.get(f'/api/expenses/?cursor={cursor}').status_code, 404)
+
+    def test_cursor_without_timezone_is_accepted(self):
+        """
+        Garante que um cursor com data sem fuso é interpretado no fuso local, sem aviso de data ingênua.
+        """
+        cursor = base64.urlsafe_b64encode(b"2999-01-01T00:00:00|ffffffff-ffff-7fff-bfff-ffffffffffff").decode()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.client.get(f'/api/expenses/?cursor={cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_unchanged_data_returns_304_without_queries(self):
+        """
+        Garante que um GET condicional com ETag atual volta 304 sem consultar o banco, e que uma escrita o invalida.
+        """
+        response = self.client.get('/api/expenses/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, amount=Decimal('5.00'), description="novo gasto")
+        response = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
 
-# Create your tests here.
@@ -0,0 +1,9 @@
+from rest_framework.routers import DefaultRouter
+from .views import ExpenseViewSet
+
+app_name = 'expenses'
+
+router = DefaultRouter()
+router.register(r'', ExpenseViewSet, basename='expense')
+
+urlpatterns = router.urls
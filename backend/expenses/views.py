@@ -1,3 +1,27 @@
-from django.shortcuts import render
+from rest_framework import viewsets, permissions
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 
-# Create your views here.
+from core.conditional import DataVersionConditionalMixin
+from core.pagination import KeysetPagination
+from .models import Expense
+from .serializers import ExpenseSerializer
+
+class ExpenseViewSet(DataVersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet de leitura das despesas do usuário logado, paginadas por cursor.
+
+    A autenticação usa apenas o token (sem buscar o usuário no banco), e respostas condicionais
+    ainda atuais voltam como 304 sem nenhuma consulta.
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ExpenseSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return (
+            Expense.objects
+            .filter(user_id=self.request.user.id)
+            .select_related('category', 'payment_method')
+            .only('id', 'amount', 'description', 'transaction_date', 'category__name', 'payment_method__name')
+        )
@@ -0,0 +1,102 @@
+import logging
+import re
+import unicodedata
+from typing import Optional
+
+from users.models import User
+from expenses.models import Expense
+from ai.services import AIService
+
+logger = logging.getLogger(__name__)
+
+# Palavras-chave frequentes em extratos e a categoria padrão correspondente.
+CATEGORY_RULES = {
+    "Transporte": ("uber", "99app", "99 pop", "cabify", "posto", "combustivel", "gasolina", "estacionamento", "pedagio", "metro", "onibus"),
+    "Alimentação": ("ifood", "rappi", "mercado", "supermercado", "padaria", "restaurante", "lanchonete", "acougue", "hortifruti"),
+    "Moradia": ("aluguel", "condominio", "energia", "enel", "sabesp", "copasa", "cemig", "light", "gas natural", "internet"),
+    "Lazer": ("netflix", "spotify", "cinema", "ingresso", "steam", "disney", "hbo", "prime video"),
+    "Saúde": ("farmacia", "drogaria", "drogasil", "raia", "hospital", "clinica", "laboratorio", "unimed"),
+    "Educação": ("escola", "faculdade", "curso", "udemy", "alura", "livraria"),
+    "Compras": ("amazon", "mercado livre", "mercadolivre", "shopee", "magalu", "americanas", "shein"),
+}
+
+# Quantidade de despesas recentes do usuário usadas para aprender suas categorias.
+HISTORY_SAMPLE_SIZE = 5000
+FALLBACK_CATEGORY = "Outros"
+
+
+def normalize_description(description: str) -> str:
+    """
+    Normaliza uma descrição de extrato para comparação: sem acentos, minúscula,
+    sem pontuação nem números soltos (datas, parcelas, códigos) e limitada às três primeiras palavras.
+    """
+    words = [word for word in _normalized_words(description) if not word.isdigit()]
+    return " ".join(words[:3])
+
+
+def _normalized_words(description: str) -> list[str]:
+    text = unicodedata.normalize('NFKD', description).encode('ascii', 'ignore').decode().lower()
+    return re.sub(r'[^a-z0-9 ]+', ' ', text).split()
+
+
+class StatementCategorizer:
+    """
+    Categoriza descrições de extrato localmente: primeiro pelo histórico do próprio usuário,
+    depois por regras de palavras-chave. O que sobrar pode ser enviado à IA em lote.
+    """
+
+    def __init__(self, user: User, use_ai: bool = False):
+        self.user = user
+        self.use_ai = use_ai
+        self.history = self._load_history()
+
+    def _load_history(self) -> dict[str, str]:
+        """
+        Mapeia descrições normalizadas para a categoria que o usuário usou mais recentemente.
+        """
+        recent_expenses = (
+            Expense.objects
+            .filter(user=self.user, category__isnull=False)
+            .order_by('-transaction_date')
+            .values_list('description', 'category__name')[:HISTORY_SAMPLE_SIZE]
+        )
+        history: dict[str, str] = {}
+        for description, category_name in recent_expenses:
+            history.setdefault(normalize_description(description), category_name)
+        return history
+
+    def categorize_locally(self, description: str) -> Optional[str]:
+        normalized = normalize_description(description)
+        if normalized in self.history:
+            return self.history[normalized]
+        # As regras comparam palavras inteiras da descrição completa (ex: "raia" não casa com "praia").
+        padded_text = f" {' '.join(_normalized_words(description))} "
+        for category_name, keywords in CATEGORY_RULES.items():
+            if any(f" {keyword} " in padded_text for keyword in keywords):
+                return category_name
+        return None
+
+    def categorize_batch(self, descriptions: list[str]) -> dict[str, str]:
+        """
+        Categoriza um lote de descrições. Apenas as que as regras locais não resolvem vão para a IA,
+        em uma única chamada por lote; sem IA (ou se ela falhar), caem em "Outros".
+        """
+        categories: dict[str, str] = {}
+        unresolved = []
+        for description in descriptions:
+            category_name = self.categorize_locally(description)
+            if category_name:
+                categories[description] = category_name
+            else:
+                unresolved.append(description)
+
+        if unresolved and self.use_ai:
+            ai_categories = AIService(user=self.user).categorize_descriptions(list(dict.fromkeys(unresolved)))
+            for description, category_name in ai_categories.items():
+                categories[description] = category_name
+                # Aprende a resposta para as próximas linhas com a mesma descrição.
+                self.history[normalize_description(description)] = category_name
+
+        for description in unresolved:
+            categories.setdefault(description, FALLBACK_CATEGORY)
+        return categories
@@ -0,0 +1,48 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from users.models import User
+from imports.parsers import StatementParseError
+from imports.services import IMPORT_CHUNK_SIZE, import_statement
+
+
+class Command(BaseCommand):
+    """
+    Importa um extrato bancário (CSV ou OFX) do disco para um usuário e informa a vazão obtida.
+    """
+    help = "Importa um extrato CSV/OFX para o usuário informado (ID ou telefone)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help="ID ou número de telefone do usuário.")
+        parser.add_argument('path', help="Caminho do arquivo de extrato.")
+        parser.add_argument('--format', choices=['csv', 'ofx'], help="Formato do arquivo (padrão: pela extensão).")
+        parser.add_argument('--use-ai', action='store_true', help="Usa a IA, em lote, para as descrições que as regras não resolvem.")
+        parser.add_argument('--payment-method', help="Forma de pagamento atribuída às despesas importadas.")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Linhas gravadas por transação.")
+
+    def handle(self, *args, **options):
+        user_filter = Q(phone_number=options['user'])
+        try:
+            user_filter |= Q(pk=uuid.UUID(options['user']))
+        except ValueError:
+            pass
+        user = User.objects.filter(user_filter).first()
+        if user is None:
+            raise CommandError(f"Usuário não encontrado: {options['user']}")
+
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1]
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = import_statement(
+                    user, stream, file_format, use_ai=options['use_ai'],
+                    payment_method_name=options['payment_method'], chunk_size=options['chunk_size'],
+                )
+        except (OSError, StatementParseError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows_read']} linhas lidas ({report['expenses_created']} despesas, {report['incomes_created']} rendas, "
+            f"{report['rows_skipped']} ignoradas) em {report['seconds']:.1f}s — {report['rows_per_second']:.0f} linhas/s."
+        ))
@@ -0,0 +1,220 @@
+import codecs
+import csv
+import io
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterator, NamedTuple, Optional
+
+# Tamanho dos blocos lidos do arquivo OFX; o parser nunca carrega o arquivo inteiro na memória.
+OFX_READ_SIZE = 64 * 1024
+# Bytes lidos, no máximo, para encontrar o cabeçalho do OFX e a sua codificação.
+OFX_HEADER_MAX_BYTES = 4096
+# Valores do campo CHARSET do cabeçalho OFX 1.x e as codificações correspondentes.
+OFX_CHARSETS = {'1252': 'cp1252', 'UTF-8': 'utf-8', 'ISO-8859-1': 'latin-1', '8859-1': 'latin-1', 'NONE': 'latin-1'}
+
+# Nomes de coluna aceitos nos CSVs exportados pelos bancos (comparados em minúsculas e sem acentos).
+CSV_DATE_COLUMNS = ('data', 'date', 'data lancamento', 'data da transacao', 'dt')
+CSV_DESCRIPTION_COLUMNS = ('descricao', 'description', 'historico', 'lancamento', 'memo', 'estabelecimento')
+CSV_AMOUNT_COLUMNS = ('valor', 'amount', 'valor (r$)', 'quantia')
+CSV_ID_COLUMNS = ('id', 'identificador', 'documento', 'fitid')
+# Limite dos campos de valor (DecimalField com 10 dígitos e 2 casas decimais).
+AMOUNT_LIMIT = Decimal('1e8')
+CENTS = Decimal('0.01')
+
+
+class StatementParseError(ValueError):
+    """
+    Erro de formato em um extrato que impede a leitura do arquivo.
+    """
+
+
+class StatementRow(NamedTuple):
+    """
+    Uma linha de extrato já normalizada. Valores negativos são saídas (despesas).
+    """
+    date: date
+    amount: Decimal
+    description: str
+    external_id: Optional[str] = None
+
+
+def iter_statement_rows(stream: IO[bytes], file_format: str) -> Iterator[StatementRow]:
+    """
+    Lê um extrato em streaming, linha a linha, no formato informado ('csv' ou 'ofx').
+    """
+    file_format = file_format.lower()
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    if file_format == 'ofx':
+        return iter_ofx_rows(stream)
+    raise StatementParseError(f"Formato de extrato não suportado: {file_format}")
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[StatementRow]:
+    """
+    Lê um CSV de extrato em streaming. O delimitador (vírgula ou ponto e vírgula) é detectado pelo cabeçalho.
+    Linhas com data ou valor inválidos são ignoradas.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    header_line = text_stream.readline()
+    if not header_line:
+        return
+
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    header = [_normalize_column(column) for column in next(csv.reader([header_line], delimiter=delimiter))]
+    date_index = _find_column(header, CSV_DATE_COLUMNS)
+    description_index = _find_column(header, CSV_DESCRIPTION_COLUMNS)
+    amount_index = _find_column(header, CSV_AMOUNT_COLUMNS)
+    id_index = _find_column(header, CSV_ID_COLUMNS, required=False)
+
+    for record in csv.reader(text_stream, delimiter=delimiter):
+        if len(record) <= max(date_index, description_index, amount_index):
+            continue
+        row_date = _parse_date(record[date_index])
+        amount = _parse_amount(record[amount_index])
+        if row_date is None or amount is None:
+            continue
+        external_id = record[id_index].strip() if id_index is not None and id_index < len(record) else None
+        yield StatementRow(row_date, amount, record[description_index].strip(), external_id or None)
+
+
+def iter_ofx_rows(stream: IO[bytes]) -> Iterator[StatementRow]:
+    """
+    Lê as transações (<STMTTRN>) de um arquivo OFX em streaming.
+    Aceita tanto o OFX 1.x (SGML, sem tags de fechamento) quanto o 2.x (XML), com ou sem quebras de linha.
+    """
+    transaction: Optional[dict] = None
+    for tag, value in _iter_ofx_tokens(stream):
+        if tag == 'STMTTRN':
+            transaction = {}
+        elif tag == '/STMTTRN':
+            if transaction is not None:
+                row = _ofx_transaction_to_row(transaction)
+                if row:
+                    yield row
+            transaction = None
+        elif transaction is not None and not tag.startswith('/'):
+            transaction[tag] = value
+
+
+def _iter_ofx_tokens(stream: IO[bytes]) -> Iterator[tuple[str, str]]:
+    """
+    Quebra o OFX em pares (tag, valor) lendo blocos de tamanho fixo.
+    Os bytes são decodificados de forma incremental, na codificação declarada no cabeçalho (ver `_ofx_charset`),
+    para que um caractere de vários bytes dividido entre dois blocos continue correto.
+    """
+    token_pattern = re.compile(r'<(/?[A-Za-z0-9.]+)>([^<]*)')
+    buffer = ''
+    decoder = None
+    head = b''
+    while True:
+        raw = stream.read(OFX_READ_SIZE)
+        if isinstance(raw, bytes):
+            if decoder is None:
+                # O cabeçalho precisa estar inteiro no buffer antes de decidir a codificação.
+                head += raw
+                if raw and b'<OFX' not in head.upper() and len(head) < OFX_HEADER_MAX_BYTES:
+                    continue
+                decoder = codecs.getincrementaldecoder(_ofx_charset(head))(errors='replace')
+                raw, head = head, b''
+            chunk = decoder.decode(raw, final=not raw)
+        else:
+            chunk = raw
+        if raw:
+            buffer += chunk
+            # Mantém no buffer o que vem depois do último '<', que pode ser uma tag incompleta.
+            cut = buffer.rfind('<')
+            complete, buffer = (buffer[:cut], buffer[cut:]) if cut > 0 else ('', buffer)
+        else:
+            complete, buffer = buffer + chunk, ''
+
+        for match in token_pattern.finditer(complete):
+            yield match.group(1).upper(), match.group(2).strip()
+        if not raw:
+            return
+
+
+def _ofx_charset(head: bytes) -> str:
+    """
+    Descobre a codificação do OFX pelo cabeçalho: no 2.x, pela declaração `<?xml encoding=...?>` (UTF-8 quando
+    ausente); no 1.x, pelos campos ENCODING e CHARSET. Codificações desconhecidas caem no latin-1, que aceita qualquer byte.
+    """
+    header = head.decode('ascii', errors='ignore')
+    xml_declaration = re.search(r'<\?xml([^>]*)\?>', header, re.IGNORECASE)
+    if xml_declaration:
+        encoding = re.search(r'encoding\s*=\s*["\']([\w.:-]+)["\']', xml_declaration.group(1), re.IGNORECASE)
+        charset = encoding.group(1) if encoding else 'utf-8'
+    else:
+        encoding = re.search(r'ENCODING:\s*([\w-]+)', header, re.IGNORECASE)
+        declared_charset = re.search(r'CHARSET:\s*([\w-]+)', header, re.IGNORECASE)
+        if encoding and encoding.group(1).upper().replace('-', '') == 'UTF8':
+            charset = 'utf-8'
+        else:
+            charset = OFX_CHARSETS.get(declared_charset.group(1).upper() if declared_charset else 'NONE', 'latin-1')
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return 'latin-1'
+
+
+def _ofx_transaction_to_row(transaction: dict) -> Optional[StatementRow]:
+    row_date = _parse_date(transaction.get('DTPOSTED', '')[:8])
+    amount = _parse_amount(transaction.get('TRNAMT', ''))
+    if row_date is None or amount is None:
+        return None
+    description = transaction.get('MEMO') or transaction.get('NAME') or ''
+    return StatementRow(row_date, amount, description, transaction.get('FITID') or None)
+
+
+def _normalize_column(column: str) -> str:
+    replacements = str.maketrans('áàãâéêíóõôúç', 'aaaaeeiooouc')
+    return column.strip().lower().translate(replacements)
+
+
+def _find_column(header: list[str], candidates: tuple, required: bool = True) -> Optional[int]:
+    for index, column in enumerate(header):
+        if column in candidates:
+            return index
+    if required:
+        raise StatementParseError(f"Coluna obrigatória não encontrada no CSV (esperado uma de: {', '.join(candidates)}).")
+    return None
+
+
+def _parse_date(value: str) -> Optional[date]:
+    value = value.strip()
+    for date_format in ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%Y%m%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value: str) -> Optional[Decimal]:
+    """
+    Converte valores nos formatos brasileiro ("-1.234,56") e internacional ("-1,234.56" ou "-1234.56").
+    Com os dois separadores, o último é o decimal; com só um deles, ele é o decimal, a não ser que se repita.
+    Valores não finitos (NaN, Infinity) ou grandes demais para os campos de valor são recusados.
+    """
+    value = value.strip().replace('R$', '').replace(' ', '')
+    if ',' in value and '.' in value:
+        decimal_separator = ',' if value.rfind(',') > value.rfind('.') else '.'
+    elif value.count(',') == 1:
+        decimal_separator = ','
+    else:
+        decimal_separator = '.'
+    thousands_separator = '.' if decimal_separator == ',' else ','
+    if value.count(decimal_separator) > 1:
+        thousands_separator, decimal_separator = decimal_separator, None
+    value = value.replace(thousands_separator, '')
+    if decimal_separator == ',':
+        value = value.replace(',', '.')
+    try:
+        amount = Decimal(value)
+        if not amount.is_finite():
+            return None
+        amount = amount.quantize(CENTS)
+    except InvalidOperation:
+        return None
+    return amount if abs(amount) < AMOUNT_LIMIT else None
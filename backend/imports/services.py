@@ -0,0 +1,148 @@
+import logging
+import time
+from datetime import datetime, time as dt_time
+from itertools import islice
+from typing import IO, Iterator, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import User
+from users.services import bump_data_version
+from expenses.models import Category, Expense
+from incomes.models import Income
+from payments.models import PaymentMethod
+from summaries.rollups import apply_bulk_expense_deltas
+from summaries.services import invalidate_monthly_summaries
+from .categorizer import StatementCategorizer
+from .parsers import StatementRow, iter_statement_rows
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de linhas do extrato gravadas por transação (e enviadas juntas à IA, quando habilitada).
+IMPORT_CHUNK_SIZE = 1000
+
+
+def import_statement(
+    user: User,
+    stream: IO[bytes],
+    file_format: str,
+    use_ai: bool = False,
+    payment_method_name: Optional[str] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> dict:
+    """
+    Importa um extrato bancário (CSV ou OFX) para o histórico do usuário.
+
+    O arquivo é lido em streaming e processado em lotes de `chunk_size` linhas: cada lote é
+    categorizado (histórico e regras locais, IA opcional em uma chamada por lote) e gravado com
+    `bulk_create` dentro de uma transação. A memória usada depende do tamanho do lote, não do arquivo.
+    Valores negativos viram despesas e positivos viram rendas.
+    Cada lote confirmado já invalida os resumos e as respostas em cache do usuário, então uma falha no meio
+    da importação não deixa os lotes gravados fora dos resumos. Linhas com identificador (id do CSV ou FITID
+    do OFX) já importado são ignoradas, então reenviar o mesmo arquivo depois de uma falha não duplica nada.
+    """
+    start_time = time.monotonic()
+    categorizer = StatementCategorizer(user, use_ai=use_ai)
+    payment_method = None
+    if payment_method_name:
+        payment_method, _ = PaymentMethod.objects.get_or_create(user=user, name=payment_method_name.capitalize())
+
+    report = {"rows_read": 0, "expenses_created": 0, "incomes_created": 0, "rows_skipped": 0}
+    category_cache: dict[str, Category] = {}
+
+    rows = iter_statement_rows(stream, file_format)
+    for chunk in _chunked(rows, chunk_size):
+        report["rows_read"] += len(chunk)
+        expenses_created, incomes_created = _import_chunk(user, chunk, categorizer, category_cache, payment_method)
+        report["expenses_created"] += expenses_created
+        report["incomes_created"] += incomes_created
+        report["rows_skipped"] += len(chunk) - expenses_created - incomes_created
+
+    elapsed = time.monotonic() - start_time
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows_read"] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Statement import for user {user.id} finished: {report}")
+    return report
+
+
+def _import_chunk(user: User, chunk: list[StatementRow], categorizer: StatementCategorizer,
+                  category_cache: dict, payment_method: Optional[PaymentMethod]) -> tuple[int, int]:
+    """
+    Categoriza e grava um lote de linhas em uma única transação.
+    Retorna a quantidade de despesas e rendas criadas.
+    """
+    chunk = _without_imported_rows(user, chunk)
+    expense_rows = [row for row in chunk if row.amount < 0 and row.description]
+    categories = categorizer.categorize_batch([row.description for row in expense_rows])
+
+    expenses, incomes, periods = [], [], set()
+    for row in chunk:
+        if not row.amount or not row.description:
+            continue
+        transaction_date = timezone.make_aware(datetime.combine(row.date, dt_time(hour=12)))
+        periods.add((row.date.year, row.date.month))
+        if row.amount < 0:
+            category = _get_category(user, categories[row.description], category_cache)
+            expenses.append(Expense(
+                user=user, amount=-row.amount, description=row.description[:255], category=category,
+                payment_method=payment_method, transaction_date=transaction_date, external_id=row.external_id,
+            ))
+        else:
+            incomes.append(Income(
+                user=user, amount=row.amount, description=row.description[:255],
+                income_type='VARIAVEL', transaction_date=transaction_date, external_id=row.external_id,
+            ))
+
+    with transaction.atomic():
+        Expense.objects.bulk_create(expenses)
+        Income.objects.bulk_create(incomes)
+        apply_bulk_expense_deltas(expenses)
+        if periods:
+            transaction.on_commit(lambda: _invalidate_cached_summaries(user, periods))
+
+    return len(expenses), len(incomes)
+
+
+def _without_imported_rows(user: User, chunk: list[StatementRow]) -> list[StatementRow]:
+    """
+    Remove do lote as linhas cujo identificador já foi importado (em um envio anterior ou antes no mesmo arquivo).
+    Linhas sem identificador não têm como ser reconhecidas e seguem sempre.
+    """
+    external_ids = {row.external_id[:255] for row in chunk if row.external_id}
+    if not external_ids:
+        return chunk
+    seen = set(Expense.objects.filter(user=user, external_id__in=external_ids).values_list('external_id', flat=True))
+    seen |= set(Income.objects.filter(user=user, external_id__in=external_ids).values_list('external_id', flat=True))
+
+    new_rows = []
+    for row in chunk:
+        if row.external_id:
+            row = row._replace(external_id=row.external_id[:255])
+            if row.external_id in seen:
+                continue
+            seen.add(row.external_id)
+        new_rows.append(row)
+    return new_rows
+
+
+def _invalidate_cached_summaries(user: User, periods: set[tuple[int, int]]):
+    for year, month in periods:
+        invalidate_monthly_summaries([user.id], year, month)
+    bump_data_version(user.id)
+
+
+def _get_category(user: User, category_name: str, category_cache: dict) -> Category:
+    if category_name not in category_cache:
+        category_cache[category_name], _ = Category.objects.get_or_create(
+            user=user, name__iexact=category_name, defaults={'name': category_name}
+        )
+    return category_cache[category_name]
+
+
+def _chunked(rows: Iterator[StatementRow], size: int) -> Iterator[list[StatementRow]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
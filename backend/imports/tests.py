@@ -0,0 +1,218 @@
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from users.models import User
+from expenses.models import Category, Expense
+from incomes.models import Income
+from summaries.models import CategoryMonthlyRollup, MonthlySummary
+from .categorizer import StatementCategorizer, normalize_description
+from .parsers import StatementParseError, _parse_amount, iter_statement_rows
+from .services import import_statement
+
+CSV_STATEMENT = (
+    "Data;Descrição;Valor\n"
+    "05/03/2025;UBER *TRIP 1234;-23,90\n"
+    "06/03/2025;PIX RECEBIDO JOAO;150,00\n"
+    "07/03/2025;LOJA DESCONHECIDA;-1.234,56\n"
+    "data inválida;IGNORADA;-10,00\n"
+)
+
+OFX_STATEMENT = (
+    "OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+    "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250310120000[-3:BRT]<TRNAMT>-45.00<FITID>A1<MEMO>IFOOD *RESTAURANTE</STMTTRN>"
+    "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250311<TRNAMT>300.00<FITID>A2<NAME>SALARIO</STMTTRN>"
+    "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+)
+
+OFX_XML_STATEMENT = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+    '<?OFX OFXHEADER="200" VERSION="220" SECURITY="NONE" OLDFILEUID="NONE" NEWFILEUID="NONE"?>\n'
+    "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+    "<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20250312</DTPOSTED><TRNAMT>-18.50</TRNAMT>"
+    "<FITID>B1</FITID><MEMO>PADARIA SÃO JOÃO</MEMO></STMTTRN>\n"
+    "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+)
+
+
+class StatementParserTests(TestCase):
+    """
+    Suite de testes para a leitura em streaming dos extratos.
+    """
+
+    def test_csv_with_brazilian_format(self):
+        """
+        Garante que o CSV com ponto e vírgula e valores no formato brasileiro é lido, ignorando linhas inválidas.
+        """
+        rows = list(iter_statement_rows(io.BytesIO(CSV_STATEMENT.encode()), 'csv'))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0].date, date(2025, 3, 5))
+        self.assertEqual(rows[2].amount, Decimal('-1234.56'))
+
+    def test_ofx_split_across_read_blocks(self):
+        """
+        Garante que o OFX é lido corretamente mesmo quando as tags ficam divididas entre blocos.
+        """
+        with mock.patch('imports.parsers.OFX_READ_SIZE', 7):
+            rows = list(iter_statement_rows(io.BytesIO(OFX_STATEMENT.encode()), 'ofx'))
+
+        self.assertEqual([(row.date, row.amount, row.external_id) for row in rows], [
+            (date(2025, 3, 10), Decimal('-45.00'), 'A1'),
+            (date(2025, 3, 11), Decimal('300.00'), 'A2'),
+        ])
+        self.assertEqual(rows[0].description, "IFOOD *RESTAURANTE")
+
+    def test_ofx_charset_from_header(self):
+        """
+        Garante que o OFX é decodificado na codificação do cabeçalho: UTF-8 no 2.x (com caracteres divididos
+        entre blocos) e o CHARSET:1252 no 1.x.
+        """
+        with mock.patch('imports.parsers.OFX_READ_SIZE', 7):
+            rows = list(iter_statement_rows(io.BytesIO(OFX_XML_STATEMENT.encode('utf-8')), 'ofx'))
+        self.assertEqual([(row.description, row.amount) for row in rows], [("PADARIA SÃO JOÃO", Decimal('-18.50'))])
+
+        sgml_statement = OFX_STATEMENT.replace("DATA:OFXSGML\n", "DATA:OFXSGML\nENCODING:USASCII\nCHARSET:1252\n")
+        sgml_statement = sgml_statement.replace("IFOOD *RESTAURANTE", "AÇAÍ DA ESQUINA")
+        rows = list(iter_statement_rows(io.BytesIO(sgml_statement.encode('cp1252')), 'ofx'))
+        self.assertEqual(rows[0].description, "AÇAÍ DA ESQUINA")
+
+    def test_amounts_in_brazilian_and_international_formats(self):
+        """
+        Garante que os separadores de milhar e decimal são detectados pela posição em cada formato.
+        """
+        cases = {
+            "-1.234,56": Decimal('-1234.56'), "1,234.56": Decimal('1234.56'), "R$ 1.234.567,89": Decimal('1234567.89'),
+            "1,234,567.89": Decimal('1234567.89'), "23,90": Decimal('23.90'), "-45.00": Decimal('-45.00'),
+            "1.234.567": Decimal('1234567'),
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(_parse_amount(value), expected)
+
+    def test_non_finite_and_oversized_amounts_are_skipped(self):
+        """
+        Garante que NaN, infinitos e valores maiores que os campos de valor são ignorados, sem quebrar a importação.
+        """
+        for value in ("NaN", "sNaN", "-Infinity", "Infinity", "1e30", "100000000,00", "-99.999.999,999"):
+            with self.subTest(value=value):
+                self.assertIsNone(_parse_amount(value))
+        self.assertEqual(_parse_amount("99.999.999,99"), Decimal('99999999.99'))
+
+        statement = b"data,descricao,valor\n01/02/2026,mercado,NaN\n02/02/2026,feira,-Infinity\n03/02/2026,padaria,-12.50\n"
+        rows = list(iter_statement_rows(io.BytesIO(statement), 'csv'))
+        self.assertEqual([(row.description, row.amount) for row in rows], [("padaria", Decimal('-12.50'))])
+
+    def test_unknown_format_and_missing_columns(self):
+        """
+        Garante que formatos e cabeçalhos inválidos geram StatementParseError.
+        """
+        with self.assertRaises(StatementParseError):
+            iter_statement_rows(io.BytesIO(b""), 'xls')
+        with self.assertRaises(StatementParseError):
+            list(iter_statement_rows(io.BytesIO(b"foo,bar\n1,2\n"), 'csv'))
+
+
+class StatementImportTests(TestCase):
+    """
+    Suite de testes para a importação em lote dos extratos.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importuser', phone_number='5511900000006')
+
+    def test_categorizer_prefers_user_history(self):
+        """
+        Garante que a categoria já usada pelo usuário para a mesma descrição tem prioridade sobre as regras.
+        """
+        trips = Category.objects.create(user=self.user, name="Trabalho")
+        Expense.objects.create(user=self.user, amount=Decimal('10.00'), description="UBER *TRIP 999", category=trips)
+
+        categorizer = StatementCategorizer(self.user)
+
+        self.assertEqual(normalize_description("UBER *TRIP 1234"), "uber trip")
+        self.assertEqual(categorizer.categorize_locally("UBER *TRIP 1234"), "Trabalho")
+        self.assertEqual(categorizer.categorize_locally("DROGA RAIA 0042"), "Saúde")
+        self.assertIsNone(categorizer.categorize_locally("Hotel na praia"))
+
+    def test_import_creates_rows_in_chunks(self):
+        """
+        Garante que despesas, rendas e rollups são gravados em lotes e que o restante cai em "Outros".
+        """
+        report = import_statement(self.user, io.BytesIO(CSV_STATEMENT.encode()), 'csv', chunk_size=2)
+
+        self.assertEqual((report['rows_read'], report['expenses_created'], report['incomes_created']), (3, 2, 1))
+        self.assertEqual(Income.objects.get(user=self.user).amount, Decimal('150.00'))
+        self.assertEqual(
+            set(Expense.objects.filter(user=self.user).values_list('category__name', flat=True)),
+            {"Transporte", "Outros"}
+        )
+        rollup_total = sum(rollup.total for rollup in CategoryMonthlyRollup.objects.filter(user=self.user, year=2025, month=3))
+        self.assertEqual(rollup_total, Decimal('1258.46'))
+
+    def test_failed_import_invalidates_committed_chunks(self):
+        """
+        Garante que os lotes já gravados invalidam os resumos em cache mesmo se um lote seguinte falhar.
+        """
+        MonthlySummary.objects.create(user=self.user, month=3, year=2025, summary_text="antigo")
+        failing_rollups = mock.patch('imports.services.apply_bulk_expense_deltas', side_effect=[None, RuntimeError])
+
+        with failing_rollups, self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            import_statement(self.user, io.BytesIO(CSV_STATEMENT.encode()), 'csv', chunk_size=2)
+
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(MonthlySummary.objects.filter(user=self.user).exists())
+
+    def test_reimporting_statement_skips_rows_already_imported(self):
+        """
+        Garante que reenviar um extrato (ex: após uma falha no meio) não duplica lançamentos nem os rollups.
+        """
+        import_statement(self.user, io.BytesIO(OFX_STATEMENT.encode()), 'ofx', chunk_size=1)
+        repeated = OFX_STATEMENT.replace("</BANKTRANLIST>", "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250310<TRNAMT>-45.00<FITID>A1<MEMO>IFOOD *RESTAURANTE</STMTTRN></BANKTRANLIST>")
+
+        report = import_statement(self.user, io.BytesIO(repeated.encode()), 'ofx')
+
+        self.assertEqual((report['rows_read'], report['expenses_created'], report['incomes_created'], report['rows_skipped']), (3, 0, 0, 3))
+        self.assertEqual(list(Expense.objects.filter(user=self.user).values_list('external_id', flat=True)), ["A1"])
+        self.assertEqual(list(Income.objects.filter(user=self.user).values_list('external_id', flat=True)), ["A2"])
+        rollup = CategoryMonthlyRollup.objects.get(user=self.user, year=2025, month=3)
+        self.assertEqual((rollup.total, rollup.expense_count), (Decimal('45.00'), 1))
+
+    def test_ai_is_called_once_per_chunk(self):
+        """
+        Garante que apenas as descrições não resolvidas localmente vão para a IA, em uma chamada por lote.
+        """
+        with mock.patch('imports.categorizer.AIService') as ai_service:
+            ai_service.return_value.categorize_descriptions.return_value = {"LOJA DESCONHECIDA": "Compras"}
+            import_statement(self.user, io.BytesIO(CSV_STATEMENT.encode()), 'csv', use_ai=True)
+
+        ai_service.return_value.categorize_descriptions.assert_called_once_with(["LOJA DESCONHECIDA"])
+        self.assertTrue(Expense.objects.filter(user=self.user, category__name="Compras").exists())
+
+
+class StatementImportViewTests(APITestCase):
+    """
+    Suite de testes para o endpoint de upload de extratos.
+    """
+
+    def test_upload_requires_authentication_and_imports(self):
+        """
+        Garante que o upload exige login e importa o arquivo enviado.
+        """
+        user = User.objects.create_user(username='uploaduser', phone_number='5511900000007')
+        upload = io.BytesIO(OFX_STATEMENT.encode())
+        upload.name = 'extrato.ofx'
+
+        response = self.client.post('/api/imports/statements/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 401)
+
+        upload.seek(0)
+        self.client.force_authenticate(user=user)
+        response = self.client.post('/api/imports/statements/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['expenses_created'], response.data['incomes_created']), (1, 1))
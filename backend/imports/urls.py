@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import StatementImportView
+
+urlpatterns = [
+    # Upload de extratos bancários (multipart, campo 'file').
+    path('statements/', StatementImportView.as_view(), name='statement-import'),
+]
@@ -0,0 +1,50 @@
+import logging
+from drf_spectacular.utils import OpenApiTypes, extend_schema
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework import status, permissions
+
+from .parsers import StatementParseError
+from .services import import_statement
+
+logger = logging.getLogger(__name__)
+
+class StatementImportView(APIView):
+    """
+    Endpoint para importar um extrato bancário (CSV ou OFX) do usuário logado.
+
+    O arquivo enviado em `file` é lido em streaming e gravado em lotes, sem ser carregado inteiro na memória.
+    O formato é informado em `format` ou deduzido pela extensão do arquivo.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request={'multipart/form-data': {
+            'type': 'object',
+            'properties': {
+                'file': {'type': 'string', 'format': 'binary'},
+                'format': {'type': 'string', 'enum': ['csv', 'ofx']},
+                'use_ai': {'type': 'boolean'},
+                'payment_method': {'type': 'string'},
+            },
+            'required': ['file'],
+        }},
+        responses={201: OpenApiTypes.OBJECT},
+    )
+    def post(self, request):
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            return Response({"detail": "Envie o extrato no campo 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('format') or uploaded_file.name.rsplit('.', 1)[-1]
+        use_ai = str(request.data.get('use_ai', '')).lower() in ('1', 'true', 'sim')
+        try:
+            report = import_statement(
+                request.user, uploaded_file, file_format, use_ai=use_ai,
+                payment_method_name=request.data.get('payment_method') or None,
+            )
+        except StatementParseError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
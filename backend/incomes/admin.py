@@ -4,6 +4,7 @@ from .models import Income
 @admin.register(Income)
 class IncomeAdmin(admin.ModelAdmin):
     list_display = ('transaction_date', 'user', 'amount', 'description', 'income_type')
+    list_select_related = ('user',)
     search_fields = ('description', 'user__username')
     list_filter = ('user', 'income_type', 'transaction_date')
     raw_id_fields = ('user',)
\ No newline at end of file
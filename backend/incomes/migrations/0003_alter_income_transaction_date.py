@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='income',
+            name='transaction_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0003_alter_income_transaction_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', 'transaction_date', 'id'], name='incomes_user_date_idx'),
+        ),
+    ]
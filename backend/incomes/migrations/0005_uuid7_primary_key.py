@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:38
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0004_income_user_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='income',
+            name='id',
+            field=models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
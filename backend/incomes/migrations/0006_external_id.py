@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomes', '0005_uuid7_primary_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='income',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identificador do lançamento no extrato importado (ex: FITID do OFX)', max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='income',
+            constraint=models.UniqueConstraint(fields=('user', 'external_id'), name='incomes_user_external_id_uniq'),
+        ),
+    ]
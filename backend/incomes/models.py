@@ -1,21 +1,32 @@
-import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from core.ids import uuid7
 
 class Income(models.Model):
     INCOME_TYPE_CHOICES = [
         ('FIXA', 'Fixa'),
         ('VARIAVEL', 'Variável'),
     ]
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='incomes')
     amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Valor da entrada")
     description = models.CharField(max_length=255, help_text="Descrição da entrada (ex: Salário, Freelance)")
     income_type = models.CharField(max_length=10, choices=INCOME_TYPE_CHOICES, default='VARIAVEL')
-    transaction_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    transaction_date = models.DateTimeField(default=timezone.now, db_index=True)
+    external_id = models.CharField(max_length=255, null=True, blank=True, help_text="Identificador do lançamento no extrato importado (ex: FITID do OFX)")
 
     def __str__(self):
         return f"R${self.amount} - {self.description} ({self.get_income_type_display()})"
 
     class Meta:
-        ordering = ['-transaction_date']
\ No newline at end of file
+        ordering = ['-transaction_date']
+        indexes = [
+            # Listagem paginada por cursor (transaction_date, id) das rendas de um usuário.
+            models.Index(fields=['user', 'transaction_date', 'id'], name='incomes_user_date_idx'),
+        ]
+        constraints = [
+            # Reimportar o mesmo extrato não duplica os lançamentos (ver imports/services.py).
+            models.UniqueConstraint(fields=['user', 'external_id'], name='incomes_user_external_id_uniq'),
+        ]
\ No newline at end of file
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from .models import Income
+
+class IncomeSerializer(serializers.ModelSerializer):
+    """
+    Serializer de leitura para rendas.
+    """
+    class Meta:
+        model = Income
+        fields = ['id', 'amount', 'description', 'income_type', 'transaction_date']
+        read_only_fields = fields
@@ -0,0 +1,9 @@
+from rest_framework.routers import DefaultRouter
+from .views import IncomeViewSet
+
+app_name = 'incomes'
+
+router = DefaultRouter()
+router.register(r'', IncomeViewSet, basename='income')
+
+urlpatterns = router.urls
@@ -1,3 +1,24 @@
-from django.shortcuts import render
+from rest_framework import viewsets, permissions
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 
-# Create your views here.
+from core.conditional import DataVersionConditionalMixin
+from core.pagination import KeysetPagination
+from .models import Income
+from .serializers import IncomeSerializer
+
+class IncomeViewSet(DataVersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet de leitura das rendas do usuário logado, paginadas por cursor.
+    Segue as mesmas regras de autenticação e cache condicional das despesas.
+    """
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = IncomeSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return (
+            Income.objects
+            .filter(user_id=self.request.user.id)
+            .only('id', 'amount', 'description', 'income_type', 'transaction_date')
+        )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message
+from .models import FailedWebhook, Message
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -10,4 +10,16 @@ class MessageAdmin(admin.ModelAdmin):
     search_fields = ('body', 'sender__username', 'sender__phone_number')
     list_filter = ('timestamp', 'sender')
     readonly_fields = ('id', 'whatsapp_message_id', 'created_at', 'timestamp')
-    raw_id_fields = ('sender',)
\ No newline at end of file
+    raw_id_fields = ('sender',)
+    # O __str__ e a coluna 'sender' leem o usuário; sem isto, cada linha da lista faria uma consulta.
+    list_select_related = ('sender',)
+
+@admin.register(FailedWebhook)
+class FailedWebhookAdmin(admin.ModelAdmin):
+    """
+    Lista os webhooks que falharam, para investigar os erros antes de reprocessá-los (`replay_failed_webhooks`).
+    """
+    list_display = ('failed_at', 'error_class', 'stack_hash', 'sender_wa_id', 'attempts')
+    search_fields = ('sender_wa_id', 'error_message', 'stack_hash')
+    list_filter = ('error_class', 'failed_at')
+    readonly_fields = ('id', 'payload', 'received_at', 'task_id', 'traceback', 'failed_at')
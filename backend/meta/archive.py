@@ -0,0 +1,126 @@
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from ai.models import AILog
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+# Linhas movidas por vez: cada lote vira um arquivo e uma única transação de exclusão.
+ARCHIVE_BATCH_SIZE = 5000
+
+
+class ArchiveSpec(NamedTuple):
+    """
+    Descreve uma tabela arquivável: o modelo e o campo de data que define o mês de cada linha.
+    """
+    model: type
+    date_field: str
+    user_field: str
+
+
+# Ordem importa: as mensagens saem antes dos logs de IA que as geraram.
+ARCHIVE_SPECS = {
+    'messages': ArchiveSpec(Message, 'created_at', 'sender_id'),
+    'ai_logs': ArchiveSpec(AILog, 'timestamp', 'user_id'),
+}
+
+
+def archive_old_rows(name: str, retention_days: Optional[int] = None, batch_size: int = ARCHIVE_BATCH_SIZE,
+                     max_batches: Optional[int] = None) -> int:
+    """
+    Move para arquivos NDJSON comprimidos as linhas com mais de `retention_days` dias de uma tabela de histórico.
+
+    Cada lote é gravado em um arquivo novo (escrito em um temporário e renomeado) e só então apagado do banco,
+    então uma falha no meio nunca perde dados: no pior caso o lote é arquivado de novo, e o leitor descarta duplicatas.
+    Retorna a quantidade de linhas arquivadas.
+    """
+    spec = ARCHIVE_SPECS[name]
+    retention_days = retention_days if retention_days is not None else settings.HISTORY_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    queryset = spec.model.objects.filter(**{f'{spec.date_field}__lt': cutoff}).order_by(spec.date_field, 'pk')
+
+    archived, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        rows = list(queryset.values()[:batch_size])
+        if not rows:
+            break
+        for month_key, month_rows in _group_by_month(rows, spec.date_field).items():
+            _write_part(name, month_key, month_rows)
+        with transaction.atomic():
+            spec.model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+        batches += 1
+        logger.info(f"Archived {archived} rows from '{name}' older than {cutoff.date()}.")
+    return archived
+
+
+def iter_archived_rows(name: str, start: Optional[date] = None, end: Optional[date] = None,
+                       user_id=None) -> Iterator[dict]:
+    """
+    Lê (somente leitura) as linhas arquivadas de uma tabela, opcionalmente filtradas por período e usuário.
+    Só abre os arquivos dos meses do período. Os valores voltam como no JSON (datas em ISO 8601, ids como texto).
+    """
+    spec = ARCHIVE_SPECS[name]
+    base_dir = _archive_dir(name)
+    if not base_dir.exists():
+        return
+
+    seen_ids = set()
+    for month_dir in sorted(path for path in base_dir.glob('*/*') if path.is_dir()):
+        year, month = int(month_dir.parent.name), int(month_dir.name)
+        if (start and (year, month) < (start.year, start.month)) or (end and (year, month) > (end.year, end.month)):
+            continue
+        for part in sorted(month_dir.glob('*.ndjson.gz')):
+            with gzip.open(part, 'rt', encoding='utf-8') as archive_file:
+                for line in archive_file:
+                    row = json.loads(line)
+                    if row['id'] in seen_ids:
+                        continue
+                    if user_id is not None and row.get(spec.user_field) != str(user_id):
+                        continue
+                    row_date = datetime.fromisoformat(row[spec.date_field]).date()
+                    if (start and row_date < start) or (end and row_date > end):
+                        continue
+                    seen_ids.add(row['id'])
+                    yield row
+
+
+def _group_by_month(rows: list[dict], date_field: str) -> dict[tuple[int, int], list[dict]]:
+    groups: dict[tuple[int, int], list[dict]] = {}
+    for row in rows:
+        row_date = row[date_field]
+        groups.setdefault((row_date.year, row_date.month), []).append(row)
+    return groups
+
+
+def _archive_dir(name: str) -> Path:
+    return Path(settings.HISTORY_ARCHIVE_DIR) / name
+
+
+def _write_part(name: str, month_key: tuple[int, int], rows: list[dict]) -> Path:
+    """
+    Grava um lote em `<arquivo>/<tabela>/<ano>/<mês>/<uuid>.ndjson.gz` de forma atômica.
+    """
+    year, month = month_key
+    month_dir = _archive_dir(name) / f"{year:04d}" / f"{month:02d}"
+    month_dir.mkdir(parents=True, exist_ok=True)
+    part_path = month_dir / f"{uuid.uuid4().hex}.ndjson.gz"
+    temp_path = part_path.with_suffix('.tmp')
+
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as archive_file:
+        for row in rows:
+            archive_file.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+    os.replace(temp_path, part_path)
+    return part_path
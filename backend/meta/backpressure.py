@@ -0,0 +1,89 @@
+import logging
+from typing import NamedTuple, Optional
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import DeferredWebhook
+
+logger = logging.getLogger(__name__)
+
+NORMAL, SOFT, HARD = 'normal', 'soft', 'hard'
+
+QUEUE_PRESSURE_CACHE_KEY = 'meta:queue_pressure'
+QUEUE_LAG_CACHE_KEY = 'meta:queue_lag_seconds'
+
+_broker_client: Optional[redis.Redis] = None
+
+
+class QueuePressure(NamedTuple):
+    """
+    Situação da fila 'interactive': quantas tarefas esperam e quanto a última tarefa esperou para começar.
+    Valores None significam que a medição não estava disponível.
+    """
+    depth: Optional[int]
+    lag_seconds: Optional[float]
+
+    @property
+    def level(self) -> str:
+        depth, lag = self.depth or 0, self.lag_seconds or 0.0
+        if depth >= settings.WEBHOOK_QUEUE_HARD_LIMIT or lag >= settings.WEBHOOK_QUEUE_HARD_LAG_SECONDS:
+            return HARD
+        if depth >= settings.WEBHOOK_QUEUE_SOFT_LIMIT or lag >= settings.WEBHOOK_QUEUE_SOFT_LAG_SECONDS:
+            return SOFT
+        return NORMAL
+
+
+def get_queue_pressure() -> QueuePressure:
+    """
+    Retorna a pressão atual da fila. A medição fica em cache por WEBHOOK_QUEUE_PRESSURE_CACHE_SECONDS,
+    então a maioria dos webhooks paga só uma leitura de cache, e nunca mais que o timeout curto do broker.
+    Com o cache fora do ar (no docker-compose, o mesmo Redis do broker), a pressão fica desconhecida e a view
+    segue para o enfileiramento, que por sua vez cai no banco se o broker também estiver fora.
+    """
+    try:
+        pressure = cache.get(QUEUE_PRESSURE_CACHE_KEY)
+        if pressure is None:
+            pressure = (measure_queue_depth(), cache.get(QUEUE_LAG_CACHE_KEY))
+            cache.set(QUEUE_PRESSURE_CACHE_KEY, pressure, timeout=settings.WEBHOOK_QUEUE_PRESSURE_CACHE_SECONDS)
+    except redis.RedisError:
+        logger.warning("Could not read the webhook queue pressure from the cache.", exc_info=True)
+        return QueuePressure(None, None)
+    return QueuePressure(*pressure)
+
+
+def defer_webhook(payload: dict, received_at: float) -> DeferredWebhook:
+    """
+    Caminho barato para a sobrecarga: guarda o payload no banco, sem tocar na fila.
+    A tarefa `drain_deferred_webhooks` o enfileira quando a fila se recuperar.
+    """
+    return DeferredWebhook.objects.create(payload=payload, received_at=received_at)
+
+
+def record_queue_lag(lag_seconds: float):
+    """
+    Chamado pelo worker ao iniciar cada tarefa de webhook, com o tempo que ela esperou na fila.
+    Expira sozinho: sem tarefas começando, a profundidade da fila é o que resta para medir a pressão.
+    Falhas do cache são só registradas: a tarefa não pode falhar por causa de uma métrica.
+    """
+    try:
+        cache.set(QUEUE_LAG_CACHE_KEY, lag_seconds, timeout=settings.WEBHOOK_QUEUE_LAG_TTL_SECONDS)
+    except redis.RedisError:
+        logger.warning("Could not record the webhook queue lag in the cache.", exc_info=True)
+
+
+def measure_queue_depth() -> Optional[int]:
+    """
+    Tamanho da fila 'interactive' no Redis do Celery (a lista com o nome da fila).
+    """
+    global _broker_client
+    if _broker_client is None:
+        _broker_client = redis.Redis.from_url(
+            settings.CELERY_BROKER_URL, socket_timeout=0.2, socket_connect_timeout=0.2,
+        )
+    try:
+        return _broker_client.llen(settings.CELERY_TASK_ROUTES['meta.tasks.process_webhook_payload']['queue'])
+    except redis.RedisError:
+        logger.warning("Could not measure the webhook queue depth.", exc_info=True)
+        return None
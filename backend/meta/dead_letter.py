@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.db import connection
+from django.db.models import F, QuerySet
+
+from expenses.models import Expense
+from incomes.models import Income
+from .models import FailedWebhook, Message
+from .services import WebhookService
+
+logger = logging.getLogger(__name__)
+
+# Falhas lidas do banco por lote no reprocessamento.
+REPLAY_BATCH_SIZE = 500
+
+
+def stack_hash(exc: BaseException) -> str:
+    """
+    Identifica o ponto de falha pela classe do erro e pela pilha (arquivo e função de cada frame, sem números de linha),
+    para que a mesma falha tenha o mesmo hash entre versões do código.
+    """
+    frames = traceback.extract_tb(exc.__traceback__)
+    signature = "|".join([type(exc).__qualname__] + [f"{os.path.basename(frame.filename)}:{frame.name}" for frame in frames])
+    return hashlib.sha1(signature.encode()).hexdigest()[:16]
+
+
+def capture_failed_webhook(payload: dict, exc: BaseException, received_at: Optional[float] = None,
+                           task_id: str = '') -> Optional[FailedWebhook]:
+    """
+    Guarda o payload que falhou no dead-letter. Nunca levanta: uma falha aqui não pode esconder o erro original.
+    """
+    try:
+        return FailedWebhook.objects.create(
+            payload=payload,
+            received_at=received_at,
+            sender_wa_id=_get_sender_wa_id(payload) or '',
+            task_id=task_id or '',
+            **_error_fields(exc),
+        )
+    except Exception:
+        logger.critical("Could not store failed webhook payload in the dead-letter table.", exc_info=True)
+        return None
+
+
+def replay_failed_webhooks(failures: QuerySet, workers: int = 4, batch_size: int = REPLAY_BATCH_SIZE) -> dict:
+    """
+    Reprocessa as falhas selecionadas em lotes, com `workers` threads em paralelo.
+
+    As falhas de um mesmo remetente vão para a mesma thread, na ordem em que aconteceram; se uma delas falhar de novo,
+    as seguintes desse remetente ficam para a próxima execução, para nunca processar uma mensagem antes da anterior.
+    Reprocessadas com sucesso, saem da tabela; as que falharem de novo têm o erro e as tentativas atualizados.
+
+    Mensagens que já foram respondidas saem da tabela sem reprocessar. As que ficaram sem resposta, mas já
+    registraram uma despesa ou renda, ficam marcadas para revisão manual (e seguram o remetente), pois
+    reprocessá-las duplicaria o lançamento.
+    """
+    report = {"replayed": 0, "failed": 0, "skipped": 0, "duplicates": 0, "flagged": 0}
+    blocked_senders: set[str] = set()
+    last_id = None
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    replay = executor.map if executor else map
+    try:
+        while True:
+            batch_query = failures.order_by('id')
+            if last_id is not None:
+                batch_query = batch_query.filter(id__gt=last_id)
+            batch = list(batch_query[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            by_sender: dict[str, list[FailedWebhook]] = {}
+            for failure in batch:
+                # Eventos sem remetente (ex: status) não têm ordem a respeitar e podem ir em paralelo.
+                by_sender.setdefault(failure.sender_wa_id or f"sem-remetente:{failure.id}", []).append(failure)
+
+            replay_function = _replay_sender_in_thread if executor else _replay_sender
+            blocked = [sender in blocked_senders for sender in by_sender]
+            for sender, counts in zip(by_sender, replay(replay_function, by_sender.values(), blocked)):
+                for key, count in counts.items():
+                    report[key] += count
+                if counts["failed"] or counts["skipped"] or counts["flagged"]:
+                    blocked_senders.add(sender)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    logger.info("Failed webhook replay finished: %s", report)
+    return report
+
+
+def _replay_sender_in_thread(failures: list[FailedWebhook], blocked: bool) -> dict:
+    # Cada thread do pool abre a sua própria conexão com o banco; ela é fechada ao fim de cada remetente.
+    try:
+        return _replay_sender(failures, blocked)
+    finally:
+        connection.close()
+
+
+def _replay_sender(failures: list[FailedWebhook], blocked: bool) -> dict:
+    """
+    Reprocessa, em ordem, as falhas de um remetente. Devolve as quantidades reprocessadas, que falharam, adiadas,
+    já respondidas e marcadas para revisão.
+    """
+    counts = {"replayed": 0, "failed": 0, "skipped": 0, "duplicates": 0, "flagged": 0}
+    if blocked:
+        counts["skipped"] = len(failures)
+        return counts
+    for index, failure in enumerate(failures):
+        state = _processing_state(failure)
+        if state == 'replied':
+            logger.info("Failed webhook %s was already answered; removing it without replaying.", failure.pk)
+            failure.delete()
+            counts["duplicates"] += 1
+            continue
+        if state == 'written':
+            logger.warning("Failed webhook %s already recorded a transaction without replying; left for manual review.", failure.pk)
+            counts["flagged"] += 1
+            counts["skipped"] += len(failures) - index - 1
+            return counts
+        try:
+            WebhookService(received_at=failure.received_at).process_payload(failure.payload)
+        except Exception as exc:
+            FailedWebhook.objects.filter(pk=failure.pk).update(attempts=F('attempts') + 1, **_error_fields(exc))
+            logger.warning("Replay of failed webhook %s failed again.", failure.pk, exc_info=True)
+            counts["failed"] += 1
+            counts["skipped"] += len(failures) - index - 1
+            return counts
+        failure.delete()
+        counts["replayed"] += 1
+    return counts
+
+
+def _processing_state(failure: FailedWebhook) -> Optional[str]:
+    """
+    Verifica até onde a mensagem da falha chegou antes do erro: 'replied' se já tem resposta enviada,
+    'written' se ficou sem resposta mas uma despesa ou renda do remetente foi registrada entre o recebimento
+    e a falha, ou None se ainda pode ser reprocessada com segurança.
+    """
+    wamid = _get_inbound_wamid(failure.payload)
+    inbound = Message.objects.filter(whatsapp_message_id=wamid, direction='INBOUND').first() if wamid else None
+    if inbound is None:
+        return None
+    if Message.objects.filter(replied_to=inbound, direction='OUTBOUND').exists():
+        return 'replied'
+    window = (inbound.created_at, failure.failed_at)
+    if (Expense.objects.filter(user_id=inbound.sender_id, transaction_date__range=window).exists()
+            or Income.objects.filter(user_id=inbound.sender_id, transaction_date__range=window).exists()):
+        return 'written'
+    return None
+
+
+def _error_fields(exc: BaseException) -> dict:
+    return {
+        'error_class': f"{type(exc).__module__}.{type(exc).__qualname__}",
+        'error_message': str(exc)[:2000],
+        'stack_hash': stack_hash(exc),
+        'traceback': "".join(traceback.format_exception(exc)),
+    }
+
+
+def _get_sender_wa_id(payload) -> Optional[str]:
+    return _get_message_field(payload, 'from')
+
+
+def _get_inbound_wamid(payload) -> Optional[str]:
+    return _get_message_field(payload, 'id')
+
+
+def _get_message_field(payload, field: str) -> Optional[str]:
+    try:
+        return payload['entry'][0]['changes'][0]['value']['messages'][0][field]
+    except (KeyError, IndexError, TypeError):
+        return None
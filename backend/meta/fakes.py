@@ -0,0 +1,111 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+from core.fakes import LatencyModel
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_PATH = re.compile(r'^/v[\d.]+/(?P<phone_number_id>[^/]+)/messages/?$')
+SENDS_PATH = '/_fake/sends'
+# Envios guardados para consulta em `GET /_fake/sends` (os mais antigos são descartados).
+SENDS_KEPT = 200_000
+
+
+class FakeGraphServer(ThreadingHTTPServer):
+    """
+    Substituto local da Graph API da Meta para testes de carga: responde ao envio de mensagens
+    (`POST /{versão}/{phone_number_id}/messages`) como a API real, com um WAMID novo, depois de uma latência sorteada.
+
+    Numa fração `error_rate` dos envios responde 500 e numa fração `throttle_rate` responde 429, com o corpo de erro
+    da Graph API, para exercitar os retries e o rate limit do `send_text_message`.
+    Aponte META_GRAPH_BASE_URL para ele (ex: http://localhost:8090).
+
+    Cada envio aceito fica registrado (destinatário, mensagem respondida, WAMID e horário) e pode ser lido em
+    `GET /_fake/sends?after=<seq>`, para que o teste de carga (benchmarks/loadtest.py) ligue as respostas às mensagens.
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, latency: LatencyModel, throttle_rate: float = 0.0):
+        super().__init__(address, FakeGraphHandler)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.sent = 0
+        self.sends: deque = deque(maxlen=SENDS_KEPT)
+        self._sent_lock = threading.Lock()
+
+    def record_send(self, payload: dict, wamid: str):
+        with self._sent_lock:
+            self.sent += 1
+            self.sends.append({
+                'seq': self.sent, 'to': payload['to'], 'context_id': (payload.get('context') or {}).get('message_id'),
+                'wamid': wamid, 'sent_at': time.time(),
+            })
+
+    def sends_after(self, seq: int) -> list[dict]:
+        with self._sent_lock:
+            if not self.sends:
+                return []
+            # Os seqs são consecutivos: a posição do primeiro envio pedido sai da diferença para o mais antigo guardado.
+            return list(islice(self.sends, max(seq - self.sends[0]['seq'] + 1, 0), None))
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    server: FakeGraphServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != SENDS_PATH:
+            return self._send_error(404, 803, "Unknown path components: %s" % url.path)
+        after = int(parse_qs(url.query).get('after', ['0'])[0])
+        self._send_json(200, {"data": self.server.sends_after(after), "last_seq": self.server.sent})
+
+    def do_POST(self):
+        match = MESSAGES_PATH.match(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if match is None:
+            return self._send_error(404, 803, "Unknown path components: %s" % self.path)
+        try:
+            payload = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            return self._send_error(400, 100, "Invalid parameter")
+        if not payload.get('to'):
+            return self._send_error(400, 100, "The parameter to is required.")
+
+        self.server.latency.wait()
+        draw = random.random()
+        if draw < self.server.throttle_rate:
+            return self._send_error(429, 130429, "Rate limit hit")
+        if draw < self.server.throttle_rate + self.server.latency.error_rate:
+            return self._send_error(500, 2, "Service temporarily unavailable")
+
+        wamid = f"wamid.FAKE{uuid.uuid4().hex.upper()}"
+        self.server.record_send(payload, wamid)
+        self._send_json(200, {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": payload['to'], "wa_id": payload['to']}],
+            "messages": [{"id": wamid}],
+        })
+
+    def _send_error(self, status: int, code: int, message: str):
+        self._send_json(status, {"error": {"message": message, "type": "OAuthException", "code": code,
+                                           "fbtrace_id": uuid.uuid4().hex[:12]}})
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Fake Graph API: " + format, *args)
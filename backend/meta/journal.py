@@ -0,0 +1,203 @@
+import atexit
+import gzip
+import heapq
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JournalRecord(NamedTuple):
+    received_at: float
+    payload: dict
+
+
+# ==============================================================================
+# ESCRITA
+# ==============================================================================
+_writer: Optional['JournalWriter'] = None
+_writer_lock = threading.Lock()
+
+
+def record_webhook_payload(payload: dict, received_at: float):
+    """
+    Registra um payload recebido no diário, sem bloquear: com a fila cheia, o registro é descartado.
+    """
+    if not settings.WEBHOOK_JOURNAL_ENABLED:
+        return
+    try:
+        _get_writer().queue.put_nowait(JournalRecord(received_at, payload))
+    except queue.Full:
+        logger.warning("Webhook journal queue is full; payload not recorded.")
+
+
+def _get_writer() -> 'JournalWriter':
+    global _writer
+    # A thread não sobrevive a um fork (ex: workers do gunicorn): cada processo inicia a sua.
+    if _writer is None or _writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = JournalWriter(Path(settings.WEBHOOK_JOURNAL_DIR))
+                _writer.start()
+    return _writer
+
+
+class JournalWriter(threading.Thread):
+    """
+    Thread que grava o diário de payloads de um processo, fora do caminho da requisição.
+
+    Os registros viram segmentos NDJSON comprimidos em `<WEBHOOK_JOURNAL_DIR>/<AAAAMMDD>/<início>-<pid>.ndjson.gz`.
+    Cada segmento é uma sequência de blocos gzip independentes (um membro gzip por bloco) e tem ao lado um índice
+    (`.idx`, NDJSON) com o offset e o intervalo de horários de cada bloco, para que a leitura de um período só
+    descomprima os blocos dele. O segmento é trocado ao passar de WEBHOOK_JOURNAL_SEGMENT_MAX_BYTES ou
+    WEBHOOK_JOURNAL_SEGMENT_MAX_SECONDS, e na virada do dia.
+    """
+
+    def __init__(self, base_dir: Path):
+        super().__init__(name='webhook-journal', daemon=True)
+        self.base_dir = base_dir
+        self.pid = os.getpid()
+        self.queue: queue.Queue = queue.Queue(maxsize=settings.WEBHOOK_JOURNAL_QUEUE_SIZE)
+        self.segment_path: Optional[Path] = None
+        self.segment_started = 0.0
+        self._stop_event = threading.Event()
+        atexit.register(self.stop)
+
+    def run(self):
+        block: list[JournalRecord] = []
+        block_started = time.monotonic()
+        while not (self._stop_event.is_set() and self.queue.empty()):
+            try:
+                block.append(self.queue.get(timeout=settings.WEBHOOK_JOURNAL_FLUSH_SECONDS))
+            except queue.Empty:
+                pass
+            block_age = time.monotonic() - block_started
+            if block and (len(block) >= settings.WEBHOOK_JOURNAL_BLOCK_RECORDS or block_age >= settings.WEBHOOK_JOURNAL_FLUSH_SECONDS):
+                self._write_block(block)
+                block = []
+            if not block:
+                block_started = time.monotonic()
+        if block:
+            self._write_block(block)
+
+    def stop(self):
+        """
+        Grava o que estiver na fila e encerra a thread (chamado na saída do processo).
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=5)
+
+    def _write_block(self, block: list[JournalRecord]):
+        try:
+            segment_path = self._current_segment(block[0].received_at)
+            data = gzip.compress(
+                "".join(json.dumps({'received_at': record.received_at, 'payload': record.payload}, ensure_ascii=False) + "\n"
+                        for record in block).encode('utf-8'),
+                compresslevel=6,
+            )
+            with open(segment_path, 'ab') as segment_file:
+                offset = segment_file.tell()
+                segment_file.write(data)
+            index_entry = {
+                'offset': offset, 'length': len(data), 'records': len(block),
+                'first_received_at': min(record.received_at for record in block),
+                'last_received_at': max(record.received_at for record in block),
+            }
+            # O índice é gravado depois do bloco: um bloco sem entrada no índice é ignorado na leitura.
+            with open(_index_path(segment_path), 'a', encoding='utf-8') as index_file:
+                index_file.write(json.dumps(index_entry) + "\n")
+        except OSError:
+            logger.error("Could not write %s payloads to the webhook journal.", len(block), exc_info=True)
+
+    def _current_segment(self, received_at: float) -> Path:
+        if self.segment_path is not None:
+            too_big = self.segment_path.exists() and self.segment_path.stat().st_size >= settings.WEBHOOK_JOURNAL_SEGMENT_MAX_BYTES
+            too_old = time.time() - self.segment_started >= settings.WEBHOOK_JOURNAL_SEGMENT_MAX_SECONDS
+            same_day = _day_dir_name(received_at) == self.segment_path.parent.name
+            if not (too_big or too_old) and same_day:
+                return self.segment_path
+
+        day_dir = self.base_dir / _day_dir_name(received_at)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_started = time.time()
+        self.segment_path = day_dir / f"{int(received_at * 1000)}-{self.pid}.ndjson.gz"
+        return self.segment_path
+
+
+def _index_path(segment_path: Path) -> Path:
+    return segment_path.with_name(segment_path.name.replace('.ndjson.gz', '.idx'))
+
+
+def _day_dir_name(received_at: float) -> str:
+    return datetime.fromtimestamp(received_at, tz=timezone.utc).strftime('%Y%m%d')
+
+
+# ==============================================================================
+# LEITURA
+# ==============================================================================
+def iter_journal(start: Optional[float] = None, end: Optional[float] = None,
+                 base_dir: Optional[Path] = None) -> Iterator[JournalRecord]:
+    """
+    Lê os payloads registrados entre `start` e `end` (epoch), em ordem de recebimento, juntando os segmentos
+    dos vários processos. Só os blocos que o índice indica dentro do período são lidos e descomprimidos.
+    """
+    base_dir = base_dir or Path(settings.WEBHOOK_JOURNAL_DIR)
+    if not base_dir.exists():
+        return iter(())
+    first_day = _day_dir_name(start) if start is not None else None
+    last_day = _day_dir_name(end) if end is not None else None
+
+    segments = []
+    for day_dir in sorted(path for path in base_dir.iterdir() if path.is_dir()):
+        if (first_day and day_dir.name < first_day) or (last_day and day_dir.name > last_day):
+            continue
+        segments.extend(sorted(day_dir.glob('*.ndjson.gz')))
+    return heapq.merge(*(_iter_segment(segment, start, end) for segment in segments), key=lambda record: record.received_at)
+
+
+def _iter_segment(segment_path: Path, start: Optional[float], end: Optional[float]) -> Iterator[JournalRecord]:
+    try:
+        with open(_index_path(segment_path), encoding='utf-8') as index_file:
+            blocks = [json.loads(line) for line in index_file if line.strip()]
+    except FileNotFoundError:
+        return
+
+    with open(segment_path, 'rb') as segment_file:
+        for block in blocks:
+            if (start is not None and block['last_received_at'] < start) or (end is not None and block['first_received_at'] > end):
+                continue
+            segment_file.seek(block['offset'])
+            records = []
+            for line in gzip.decompress(segment_file.read(block['length'])).splitlines():
+                entry = json.loads(line)
+                if (start is None or entry['received_at'] >= start) and (end is None or entry['received_at'] <= end):
+                    records.append(JournalRecord(entry['received_at'], entry['payload']))
+            # Os blocos chegam quase em ordem; ordenar cada um garante a ordem exigida pelo merge.
+            yield from sorted(records, key=lambda record: record.received_at)
+
+
+def prune_journal(retention_days: int, base_dir: Optional[Path] = None) -> int:
+    """
+    Apaga os dias do diário mais antigos que `retention_days`. Retorna a quantidade de dias apagados.
+    """
+    base_dir = base_dir or Path(settings.WEBHOOK_JOURNAL_DIR)
+    if not base_dir.exists():
+        return 0
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime('%Y%m%d')
+    pruned = 0
+    for day_dir in base_dir.iterdir():
+        if day_dir.is_dir() and day_dir.name < cutoff:
+            shutil.rmtree(day_dir)
+            pruned += 1
+    return pruned
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from meta.archive import ARCHIVE_BATCH_SIZE, ARCHIVE_SPECS, archive_old_rows
+from meta.journal import prune_journal
+
+
+class Command(BaseCommand):
+    """
+    Move mensagens e logs de IA antigos do banco para arquivos NDJSON comprimidos, mês a mês.
+    Pode ser interrompido e executado de novo a qualquer momento; deve rodar periodicamente (ex: cron semanal).
+    """
+    help = "Arquiva em NDJSON comprimido as mensagens e logs de IA mais antigos que a janela de retenção."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=list(ARCHIVE_SPECS), action='append', dest='tables', help="Tabela a arquivar (padrão: todas).")
+        parser.add_argument('--retention-days', type=int, default=settings.HISTORY_RETENTION_DAYS, help="Idade mínima, em dias, das linhas arquivadas.")
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help="Linhas movidas por lote.")
+        parser.add_argument('--max-batches', type=int, help="Limita a quantidade de lotes por tabela nesta execução.")
+
+    def handle(self, *args, **options):
+        for name in options['tables'] or list(ARCHIVE_SPECS):
+            start_time = time.monotonic()
+            archived = archive_old_rows(
+                name, retention_days=options['retention_days'],
+                batch_size=options['batch_size'], max_batches=options['max_batches'],
+            )
+            elapsed = time.monotonic() - start_time
+            self.stdout.write(self.style.SUCCESS(f"{name}: {archived} linhas arquivadas em {elapsed:.1f}s."))
+
+        pruned_days = prune_journal(options['retention_days'])
+        if pruned_days:
+            self.stdout.write(self.style.SUCCESS(f"webhook_journal: {pruned_days} dias apagados."))
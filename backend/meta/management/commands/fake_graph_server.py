@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.fakes import LatencyModel
+from meta.fakes import FakeGraphServer
+
+
+class Command(BaseCommand):
+    """
+    Sobe o servidor falso da Graph API (meta/fakes.py) para testes de carga sem enviar mensagens de verdade.
+    Use junto com META_GRAPH_BASE_URL=http://<host>:<porta> e AI_BACKEND=fake.
+    """
+    help = "Sobe um servidor local que imita o envio de mensagens da Graph API da Meta."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=8090)
+        parser.add_argument('--latency-median-ms', type=float, default=150.0, help="Mediana da latência simulada.")
+        parser.add_argument('--latency-p99-ms', type=float, default=800.0, help="p99 da latência simulada.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fração dos envios que responde 500.")
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fração dos envios que responde 429.")
+
+    def handle(self, *args, **options):
+        try:
+            latency = LatencyModel(options['latency_median_ms'], options['latency_p99_ms'], options['error_rate'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if not 0 <= options['throttle_rate'] <= 1 - options['error_rate']:
+            raise CommandError("--throttle-rate somado a --error-rate não pode passar de 1.")
+
+        server = FakeGraphServer((options['host'], options['port']), latency, options['throttle_rate'])
+        self.stdout.write(f"Servidor falso da Graph API em http://{options['host']}:{options['port']} (Ctrl+C para parar).")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"{server.sent} mensagens aceitas.")
@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from meta.dead_letter import REPLAY_BATCH_SIZE, replay_failed_webhooks
+from meta.models import FailedWebhook
+
+
+class Command(BaseCommand):
+    """
+    Reprocessa os webhooks que falharam (dead-letter), em paralelo e mantendo a ordem das mensagens de cada usuário.
+    Use --dry-run para ver as falhas agrupadas por tipo de erro antes de reprocessar.
+    """
+    help = "Reprocessa os webhooks guardados em FailedWebhook, com filtros por tipo de erro e período."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--error-class', help="Apenas falhas com esta classe de erro (ex: KeyError ou requests.exceptions.Timeout).")
+        parser.add_argument('--stack-hash', help="Apenas falhas com este hash de pilha.")
+        parser.add_argument('--since', help="Apenas falhas a partir desta data/hora (ISO 8601).")
+        parser.add_argument('--until', help="Apenas falhas até esta data/hora (ISO 8601).")
+        parser.add_argument('--workers', type=int, default=4, help="Threads reprocessando em paralelo.")
+        parser.add_argument('--batch-size', type=int, default=REPLAY_BATCH_SIZE, help="Falhas lidas do banco por lote.")
+        parser.add_argument('--dry-run', action='store_true', help="Só lista as falhas selecionadas, agrupadas por erro.")
+
+    def handle(self, *args, **options):
+        failures = FailedWebhook.objects.all()
+        if options['error_class']:
+            # Aceita o nome completo ou só o nome da classe.
+            failures = failures.filter(error_class__endswith=options['error_class'])
+        if options['stack_hash']:
+            failures = failures.filter(stack_hash=options['stack_hash'])
+        if options['since']:
+            failures = failures.filter(failed_at__gte=self._parse_moment(options['since']))
+        if options['until']:
+            failures = failures.filter(failed_at__lte=self._parse_moment(options['until'], end_of_day=True))
+
+        if options['dry_run']:
+            groups = (
+                failures.values('error_class', 'stack_hash')
+                .annotate(total=Count('id'), first=Min('failed_at'), last=Max('failed_at'))
+                .order_by('-total')
+            )
+            for group in groups:
+                self.stdout.write(
+                    f"{group['total']:>7}  {group['stack_hash']}  {group['error_class']}  "
+                    f"({group['first']:%Y-%m-%d %H:%M} a {group['last']:%Y-%m-%d %H:%M})"
+                )
+            return
+
+        start_time = time.monotonic()
+        report = replay_failed_webhooks(failures, workers=options['workers'], batch_size=options['batch_size'])
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['replayed']} reprocessados, {report['failed']} falharam de novo, "
+            f"{report['skipped']} adiados (ordem do usuário), {report['duplicates']} já respondidos e "
+            f"{report['flagged']} marcados para revisão (lançamento já registrado) em {elapsed:.1f}s."
+        ))
+
+    def _parse_moment(self, value: str, end_of_day: bool = False) -> datetime:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Data inválida: {value}")
+            moment = datetime.combine(day, dt_time.max if end_of_day else dt_time.min)
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
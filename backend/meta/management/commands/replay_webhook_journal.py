@@ -0,0 +1,65 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from meta.journal import iter_journal
+from meta.services import WebhookService
+
+
+class Command(BaseCommand):
+    """
+    Reproduz os payloads do diário de webhooks de um período, passando-os pelo `WebhookService.process_payload`
+    com o mesmo espaçamento em que chegaram (ou acelerado). Serve para reproduzir bugs e medir o sistema com carga real.
+
+    Atenção: o processamento é o de produção (grava no banco, chama a IA e envia as respostas pela API da Meta).
+    Rode contra um ambiente de teste, com as APIs externas apontando para servidores falsos.
+    """
+    help = "Reproduz os webhooks gravados no diário (WEBHOOK_JOURNAL_DIR) em um período."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help="Início do período (data/hora ISO 8601).")
+        parser.add_argument('--until', required=True, help="Fim do período (data/hora ISO 8601).")
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help="Fator de velocidade em relação à original (2 = duas vezes mais rápido; 0 = sem pausas).")
+        parser.add_argument('--dry-run', action='store_true', help="Só conta os payloads do período.")
+
+    def handle(self, *args, **options):
+        start, end = self._parse_moment(options['since']), self._parse_moment(options['until'])
+        if options['speed'] < 0:
+            raise CommandError("--speed não pode ser negativo.")
+
+        replayed, late = 0, 0
+        replay_start = time.monotonic()
+        first_received_at = None
+        for record in iter_journal(start.timestamp(), end.timestamp()):
+            if options['dry_run']:
+                replayed += 1
+                continue
+            if first_received_at is None:
+                first_received_at = record.received_at
+            if options['speed']:
+                # Mantém o espaçamento original entre os payloads, dividido pelo fator de velocidade.
+                wait = (record.received_at - first_received_at) / options['speed'] - (time.monotonic() - replay_start)
+                if wait > 0:
+                    time.sleep(wait)
+                elif wait < -1:
+                    late += 1
+            WebhookService(received_at=time.time()).process_payload(record.payload)
+            replayed += 1
+
+        elapsed = time.monotonic() - replay_start
+        action = "encontrados" if options['dry_run'] else "reproduzidos"
+        self.stdout.write(self.style.SUCCESS(f"{replayed} payloads {action} em {elapsed:.1f}s."))
+        if late:
+            self.stdout.write(self.style.WARNING(
+                f"{late} payloads saíram mais de 1s atrasados: o processamento não acompanha esta velocidade."
+            ))
+
+    def _parse_moment(self, value: str) -> datetime:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"Data/hora inválida: {value}")
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
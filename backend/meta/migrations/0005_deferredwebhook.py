@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:58
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meta', '0004_message_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredWebhook',
+            fields=[
+                ('id', models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.JSONField()),
+                ('received_at', models.FloatField(help_text='Horário (epoch) em que a view aceitou o webhook.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:00
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meta', '0005_deferredwebhook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedWebhook',
+            fields=[
+                ('id', models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.JSONField()),
+                ('received_at', models.FloatField(blank=True, help_text='Horário (epoch) em que a view aceitou o webhook.', null=True)),
+                ('sender_wa_id', models.CharField(blank=True, db_index=True, help_text='Remetente da mensagem, para manter a ordem por usuário no reprocessamento.', max_length=32)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('error_class', models.CharField(db_index=True, max_length=255)),
+                ('error_message', models.TextField(blank=True)),
+                ('stack_hash', models.CharField(db_index=True, max_length=16)),
+                ('traceback', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('failed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -1,11 +1,11 @@
-import uuid
 from django.db import models
 from django.conf import settings
 
 from ai.models import AILog
+from core.ids import uuid7
 
 class Message(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     whatsapp_message_id = models.CharField(max_length=255, unique=True, db_index=True)
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='messages')
     replied_to = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='replies')
@@ -19,10 +19,52 @@ class Message(models.Model):
     body = models.TextField(null=True, blank=True)
     generated_by_log = models.OneToOneField(AILog, on_delete=models.SET_NULL, null=True, blank=True, related_name='generated_message')
     timestamp = models.DateTimeField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"Message ({self.direction}) from {self.sender.username} at {self.timestamp}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class DeferredWebhook(models.Model):
+    """
+    Payload de webhook guardado sem passar pela fila, enquanto ela está sobrecarregada (ver meta/backpressure.py).
+    A tarefa `drain_deferred_webhooks` os enfileira, em ordem de chegada, quando a fila volta ao normal.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    payload = models.JSONField()
+    received_at = models.FloatField(help_text="Horário (epoch) em que a view aceitou o webhook.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deferred webhook received at {self.received_at}"
+
+    class Meta:
+        # O uuid7 cresce com o tempo: ordenar pela chave primária é ordenar pela chegada, usando o índice da PK.
+        ordering = ['id']
+
+
+class FailedWebhook(models.Model):
+    """
+    Payload de webhook cujo processamento falhou (dead-letter), guardado com o erro para análise e reprocessamento
+    pelo comando `replay_failed_webhooks`. Falhas com o mesmo `stack_hash` vêm do mesmo ponto do código.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    payload = models.JSONField()
+    received_at = models.FloatField(null=True, blank=True, help_text="Horário (epoch) em que a view aceitou o webhook.")
+    sender_wa_id = models.CharField(max_length=32, blank=True, db_index=True, help_text="Remetente da mensagem, para manter a ordem por usuário no reprocessamento.")
+    task_id = models.CharField(max_length=255, blank=True)
+    error_class = models.CharField(max_length=255, db_index=True)
+    error_message = models.TextField(blank=True)
+    stack_hash = models.CharField(max_length=16, db_index=True)
+    traceback = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=1)
+    failed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.error_class} ({self.stack_hash}) at {self.failed_at}"
+
+    class Meta:
+        # O uuid7 cresce com o tempo: ordenar pela chave primária é ordenar pela primeira falha.
+        ordering = ['id']
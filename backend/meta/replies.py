@@ -1,12 +1,19 @@
 from typing import List
+from datetime import date
+from functools import lru_cache
 from django.utils import timezone
 from django.db.models import Sum
 from decimal import Decimal
 
 from expenses.models import Category, Expense 
+from expenses.queries import query_expenses
 from users.models import User 
+from users.services import get_or_set_user_cache
 from incomes.models import Income 
 
+# Tempo máximo que uma resposta formatada fica em cache (a versão dos dados do usuário já a invalida antes disso).
+REPLY_CACHE_TIMEOUT = 60 * 60 * 24
+
 # O dicionário com as respostas de texto fixas.
 TEXT_REPLIES = {
     "pedir_ajuda": (
@@ -23,14 +30,17 @@ TEXT_REPLIES = {
         "  - `mudar categoria do ultimo para Lazer`\n\n"
         "*📊 Para Ver seus Relatórios:*\n"
         "Quer saber como andam suas finanças?\n"
-        "  - `resumo do mês`\n\n"
+        "  - `resumo do mês`\n"
+        "  - `gastos dos últimos 6 meses`\n"
+        "  - `quanto gastei com uber em março?`\n\n"
         "Se quiser uma lista rápida de todos os comandos, é só me enviar a palavra `comandos`. 😉"
     ),
     "pedir_comandos": (
         "Aqui está a lista de comandos que eu entendo:\n\n"
         "*Registros:*\n"
         "• `[VALOR] [DESCRIÇÃO] [FORMA DE PAGAMENTO (opcional)]` - Registra uma despesa.\n"
-        "• `recebi [VALOR] de [DESCRIÇÃO] [fixo/variavel (opcional)]` - Registra uma renda.\n\n"
+        "• `recebi [VALOR] de [DESCRIÇÃO] [fixo/variavel (opcional)]` - Registra uma renda.\n"
+        "• `[DESCRIÇÃO] [VALOR] todo dia [DIA]` - Registra uma despesa ou renda que se repete todo mês.\n\n"
         "*Gerenciamento do Último Registro:*\n"
         "• `editar ultima [NOVO VALOR] [NOVA DESCRIÇÃO]`\n"
         "• `apagar ultima` ou `deletar ultima`\n"
@@ -38,11 +48,14 @@ TEXT_REPLIES = {
         "*Gerenciamento de Categorias:*\n"
         "• `criar categoria [NOME]`\n"
         "• `apagar categoria [NOME]`\n"
-        "• `minhas categorias`\n\n"
+        "• `minhas categorias`\n"
+        "• `orçamento de [VALOR] para [CATEGORIA]`\n\n"
         "*Relatórios:*\n"
         "• `resumo do mês`\n"
         "• `extrato`\n"
-        "• `saldo`"
+        "• `saldo`\n"
+        "• `gastos dos últimos [N] meses`\n"
+        "• `quanto gastei com [ALGO] em [PERÍODO]`"
     ),
     "indefinido": (
         "Desculpe, não entendi o que você quis dizer. 🤔\n\n"
@@ -60,18 +73,38 @@ TEXT_REPLIES = {
     "despedida": "Até mais! Se precisar de algo, estarei por aqui. 👋",
 }
 
+@lru_cache(maxsize=512)
+def render_text_reply(intent: str, user_name: str = "usuário") -> str:
+    """
+    Formata uma resposta fixa de TEXT_REPLIES, preenchendo o nome do usuário quando o texto pede.
+    As respostas não dependem do banco, então ficam em memória no próprio processo.
+    """
+    response_template = TEXT_REPLIES.get(intent, TEXT_REPLIES["indefinido"])
+    if "{}" in response_template:
+        return response_template.format(user_name)
+    return response_template
+
 def get_user_categories_reply(user) -> str:
+    """
+    Retorna a lista de categorias do usuário formatada, do cache enquanto os dados dele não mudarem.
+    """
+    return get_or_set_user_cache(user.id, "categories-reply", lambda: _build_user_categories_reply(user), REPLY_CACHE_TIMEOUT)
+
+def _build_user_categories_reply(user) -> str:
     """
     Busca as categorias de despesa de um usuário e formata uma resposta amigável.
     """
-    # Busca todas as categorias associadas ao usuário, ordenadas pelo nome.
-    categories = Category.objects.filter(user=user).order_by('name')
+    # Busca em uma única consulta apenas os campos usados na resposta, ordenados pelo nome.
+    categories = list(Category.objects.filter(user=user).order_by('name').values_list('name', 'monthly_budget'))
 
     if not categories:
         return "Você ainda não tem nenhuma categoria de despesa registrada."
 
-    # Formata a lista de categorias em uma string bonita
-    category_list_str = "\n".join([f"• {cat.name}" for cat in categories])
+    # Formata a lista de categorias em uma string bonita, mostrando o orçamento quando houver
+    category_list_str = "\n".join([
+        f"• {name} (orçamento: R$ {monthly_budget:.2f})" if monthly_budget else f"• {name}"
+        for name, monthly_budget in categories
+    ])
 
     response = (
         "Aqui estão suas categorias de despesa atuais:\n\n"
@@ -81,6 +114,15 @@ def get_user_categories_reply(user) -> str:
     return response
 
 def get_monthly_summary_reply(user: User) -> str:
+    """
+    Retorna o resumo do mês corrente, do cache enquanto os dados do usuário não mudarem.
+    """
+    now = timezone.now()
+    return get_or_set_user_cache(
+        user.id, f"monthly-summary-reply:{now.year}-{now.month}", lambda: _build_monthly_summary_reply(user), REPLY_CACHE_TIMEOUT
+    )
+
+def _build_monthly_summary_reply(user: User) -> str:
     """
     Busca todas as rendas e despesas do usuário no mês corrente e formata um resumo completo.
     """
@@ -117,4 +159,38 @@ def get_monthly_summary_reply(user: User) -> str:
             category_total = category_summary['total']
             response_lines.append(f"• {category_name}: R$ {category_total:.2f}")
 
-    return "\n".join(response_lines)
\ No newline at end of file
+    return "\n".join(response_lines)
+
+def get_expense_query_reply(user: User, ai_plan: dict) -> str:
+    """
+    Executa a consulta de gastos descrita pelo plano da IA e formata a resposta.
+    """
+    result = query_expenses(user, ai_plan)
+    filters = result["filters"]
+
+    start_date = date.fromisoformat(filters["start_date"]).strftime("%d/%m/%Y")
+    end_date = date.fromisoformat(filters["end_date"]).strftime("%d/%m/%Y")
+    description_parts = []
+    if filters["keyword"]:
+        description_parts.append(f"com '{filters['keyword']}'")
+    if filters["category"]:
+        description_parts.append(f"em {filters['category']}")
+    if filters["payment_method"]:
+        description_parts.append(f"no {filters['payment_method']}")
+    description = " ".join(description_parts) or "no total"
+
+    if not result["count"]:
+        return f"🔎 Não encontrei gastos {description} entre {start_date} e {end_date}."
+
+    response_lines = [
+        f"🔎 *Gastos {description}*",
+        f"_{start_date} a {end_date}_\n",
+        f"💸 *Total:* R$ {result['total']:.2f} em {result['count']} despesa(s)",
+    ]
+    if result["count"] > 1:
+        response_lines.append("\n➡️ *Maiores Gastos:*")
+        for expense in result["top_expenses"]:
+            expense_date = timezone.localtime(expense["transaction_date"]).strftime("%d/%m")
+            response_lines.append(f"• {expense_date} - {expense['description']}: R$ {expense['amount']:.2f}")
+
+    return "\n".join(response_lines)
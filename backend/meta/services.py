@@ -13,14 +13,26 @@ from phonenumbers import geocoder
 from users.models import User
 from .models import Message
 from ai.services import AIService
-from expenses.services import create_default_categories_for_user, create_expense_from_ai_plan, edit_last_expense, delete_last_expense, change_last_expense_category, create_new_category, delete_category_by_name
-from summaries.services import generate_or_get_monthly_summary
+from expenses.services import create_default_categories_for_user, create_expense_from_ai_plan, edit_last_expense, delete_last_expense, change_last_expense_category, create_new_category, delete_category_by_name, set_category_budget
+from summaries.services import generate_trend_report, get_monthly_summary_text
 from payments.services import create_default_payment_methods_for_user
 from incomes.services import create_income_from_ai_plan
+from recurring.services import create_recurring_from_ai_plan, get_next_occurrence
+from core.instrumentation import track_queries
+from core.metrics import PipelineTimer
+from core.tracing import span
 from . import replies
 
 logger = logging.getLogger(__name__)
 
+# Intenções usadas como rótulo nas métricas; qualquer outro valor vindo da IA vira "indefinido",
+# para que uma resposta inesperada não crie séries novas sem limite.
+KNOWN_INTENTS = frozenset({
+    "registrar_renda", "registrar_despesa", "criar_recorrencia", "deletar_despesa", "editar_despesa",
+    "mudar_categoria", "pedir_categorias", "criar_categoria", "definir_orcamento", "deletar_categoria",
+    "pedir_extrato", "pedir_saldo", "pedir_resumo", "consultar_gastos", "pedir_tendencia",
+}) | frozenset(replies.TEXT_REPLIES)
+
 # ==============================================================================
 # SERVIÇO DE PROCESSAMENTO DE WEBHOOKS
 # ==============================================================================
@@ -29,6 +41,11 @@ class WebhookService:
     Orquestra o processamento de um payload de webhook vindo da Meta.
     """
 
+    def __init__(self, received_at: Optional[float] = None):
+        # Horário em que o webhook foi aceito; base do tempo total de resposta nas métricas.
+        self.received_at = received_at
+        self.timer = PipelineTimer(received_at)
+
     def process_payload(self, payload: dict):
         """
         Ponto de entrada principal. Valida e delega o payload para processamento.
@@ -56,7 +73,10 @@ class WebhookService:
         contact_info = value.get('contacts', [{}])[0]
         contact_name = contact_info.get('profile', {}).get('name')
         
-        user, is_new_user = self._find_or_create_user(sender_wa_id, contact_name)
+        # Cada mensagem do payload tem o seu próprio cronômetro.
+        self.timer = PipelineTimer(self.received_at)
+        with self.timer.stage('user_lookup'):
+            user, is_new_user = self._find_or_create_user(sender_wa_id, contact_name)
 
         incoming_message = self._save_inbound_message(message_data, user)
         if not incoming_message:
@@ -64,6 +84,7 @@ class WebhookService:
         
         # Envia a resposta apropriada.
         self._send_appropriate_reply(user, is_new_user, incoming_message)
+        self.timer.observe()
 
     def _save_inbound_message(self, message_data: dict, user: User) -> Optional[Message]:
         """
@@ -91,13 +112,13 @@ class WebhookService:
                 }
             )
             if created:
-                logger.info(f"Inbound message from user {user.id} saved (WAMID: {whatsapp_id}).")
+                logger.info("Inbound message from user %s saved (WAMID: %s).", user.id, whatsapp_id)
             return message
         except IntegrityError:
-            logger.warning(f"Inbound message with WAMID {whatsapp_id} already exists. Skipping.")
+            logger.warning("Inbound message with WAMID %s already exists. Skipping.", whatsapp_id)
             return None
         except Exception:
-            logger.error(f"Error saving inbound message for user {user.id}.", exc_info=True)
+            logger.error("Error saving inbound message for user %s.", user.id, exc_info=True)
             return None
 
     def _send_appropriate_reply(self, user: User, is_new_user: bool, incoming_message: Message):
@@ -106,8 +127,10 @@ class WebhookService:
         """
         if is_new_user:
             # Se o usuário é novo, envia a saudação e encerra o fluxo.
-            response_text = replies.TEXT_REPLIES["saudacao_novo_usuario"].format(user.first_name)
-            MessageService().send_text_message(user, response_text)
+            self.timer.intent = "saudacao_novo_usuario"
+            response_text = replies.render_text_reply("saudacao_novo_usuario", user.first_name)
+            with self.timer.stage('meta_send'):
+                MessageService().send_text_message(user, response_text)
             return
 
         # Para usuários existentes, o fluxo completo de análise acontece.
@@ -119,10 +142,22 @@ class WebhookService:
         """
         text_body = incoming_message.body
 
-        ai_service = AIService(user=user)
-        ai_plan = ai_service.interpret_message(text_body)
+        with self.timer.stage('ai_interpretation'):
+            ai_service = AIService(user=user)
+            ai_plan = ai_service.interpret_message(text_body)
         intent = ai_plan.get("intent")
+        self.timer.intent = intent if intent in KNOWN_INTENTS else "indefinido"
+
+        with self.timer.stage('business_write'), track_queries('intent', self.timer.intent):
+            response_text = self._build_reply(intent, ai_plan, user)
+
+        with self.timer.stage('meta_send'):
+            MessageService().send_text_message(user, response_text, replied_to=incoming_message)
 
+    def _build_reply(self, intent: Optional[str], ai_plan: dict, user: User) -> str:
+        """
+        Executa a ação correspondente à intenção e monta o texto de resposta.
+        """
         if intent == "registrar_renda":
             income = create_income_from_ai_plan(user, ai_plan)
             if income:
@@ -131,13 +166,24 @@ class WebhookService:
                 response_text = replies.TEXT_REPLIES["indefinido"]
 
         elif intent == "registrar_despesa":
-            expense = create_expense_from_ai_plan(user, ai_plan)
+            expense, budget_alert = create_expense_from_ai_plan(user, ai_plan)
             if expense:
                 category_name = f"({expense.category.name})" if expense.category else ""
                 response_text = f"✅ Despesa de R${expense.amount:.2f} em '{expense.description}' {category_name} registrada com sucesso!"
+                if budget_alert:
+                    response_text += f"\n\n{budget_alert}"
             else:
                 response_text = replies.TEXT_REPLIES["indefinido"]
         
+        elif intent == "criar_recorrencia":
+            recurring = create_recurring_from_ai_plan(user, ai_plan)
+            if recurring:
+                kind_name = "renda" if recurring.kind == 'RENDA' else "despesa"
+                next_date = get_next_occurrence(recurring).strftime('%d/%m')
+                response_text = f"🔁 Pronto! Vou registrar a {kind_name} '{recurring.description}' de R${recurring.amount:.2f} todo dia {recurring.day_of_month}. Próximo lançamento: {next_date}."
+            else:
+                response_text = "Não entendi o lançamento recorrente. Tente algo como `aluguel 1500 todo dia 5`."
+
         elif intent == "deletar_despesa":
             deleted_expense = delete_last_expense(user)
             if deleted_expense:
@@ -146,9 +192,11 @@ class WebhookService:
                 response_text = "Você ainda não registrou nenhuma despesa para apagar."
 
         elif intent == "editar_despesa":
-            edited_expense = edit_last_expense(user, ai_plan)
+            edited_expense, budget_alert = edit_last_expense(user, ai_plan)
             if edited_expense:
                 response_text = f"✅ Despesa atualizada para: R${edited_expense.amount:.2f} - '{edited_expense.description}'."
+                if budget_alert:
+                    response_text += f"\n\n{budget_alert}"
             else:
                 response_text = "Não encontrei uma despesa para editar ou os dados fornecidos são inválidos."
 
@@ -171,6 +219,15 @@ class WebhookService:
             else:
                 response_text = "Não consegui entender o nome da categoria que você quer criar. Tente de novo, por favor."
 
+        elif intent == "definir_orcamento":
+            category = set_category_budget(user, ai_plan)
+            if category and category.monthly_budget:
+                response_text = f"✅ Orçamento mensal de *{category.name}* definido em R${category.monthly_budget:.2f}. Eu te aviso quando chegar em 80% e 100%!"
+            elif category:
+                response_text = f"✅ Orçamento da categoria *{category.name}* removido."
+            else:
+                response_text = "Não entendi o orçamento. Tente algo como `orçamento de 500 para alimentação`."
+
         elif intent == "deletar_categoria":
             category_name = ai_plan.get("category", "desconhecida").capitalize()
             was_deleted = delete_category_by_name(user, ai_plan)
@@ -180,30 +237,25 @@ class WebhookService:
                 response_text = f"Não encontrei a categoria '{category_name}' para apagar."
 
         elif intent in ["pedir_extrato", "pedir_saldo"]:
-            summary = generate_or_get_monthly_summary(user)
-            response_text = summary.summary_text
+            response_text = get_monthly_summary_text(user)
         
         elif intent == "pedir_resumo":
             response_text = replies.get_monthly_summary_reply(user)
 
+        elif intent == "consultar_gastos":
+            response_text = replies.get_expense_query_reply(user, ai_plan)
+
+        elif intent == "pedir_tendencia":
+            response_text = generate_trend_report(user, months=ai_plan.get("months"))
+
         elif intent in replies.TEXT_REPLIES:
-            # --- CORREÇÃO AQUI ---
-            # 1. Pega o "template" da resposta do arquivo replies.
-            response_template = replies.TEXT_REPLIES[intent]
-            
-            # 2. Verifica se o template precisa ser formatado com o nome do usuário.
-            if "{}" in response_template:
-                # Usa um nome padrão "usuário" caso o first_name seja vazio.
-                user_name = user.first_name or "usuário"
-                response_text = response_template.format(user_name)
-            else:
-                # Se não precisar de formatação, usa o texto como está.
-                response_text = response_template
+            # Usa um nome padrão "usuário" caso o first_name seja vazio.
+            response_text = replies.render_text_reply(intent, user.first_name or "usuário")
         
         else: # Fallback para 'indefinido'
             response_text = replies.TEXT_REPLIES["indefinido"]
 
-        MessageService().send_text_message(user, response_text, replied_to=incoming_message)
+        return response_text
 
     def _find_or_create_user(self, phone_number: str, full_name: Optional[str]) -> tuple[User, bool]:
         """
@@ -226,21 +278,21 @@ class WebhookService:
             parsed_number = phonenumbers.parse(f"+{phone_number}", None)
             defaults['country_code'] = geocoder.region_code_for_number(parsed_number)
         except phonenumbers.phonenumberutil.NumberParseException:
-            logger.warning(f"Could not parse phone number: {phone_number}")
+            logger.warning("Could not parse phone number: %s", phone_number)
 
         user, created = User.objects.update_or_create(phone_number=phone_number, defaults=defaults)
         if created:
             user.set_unusable_password()
             user.save()
-            logger.info(f"Created new user {user.id} for phone number {phone_number}.")
+            logger.info("Created new user %s for phone number %s.", user.id, phone_number)
             
             create_default_categories_for_user(user)
-            logger.info(f"Default categories created for new user {user.id}.")
+            logger.info("Default categories created for new user %s.", user.id)
 
             create_default_payment_methods_for_user(user)
-            logger.info(f"Default payment methods created for new user {user.id}.")
+            logger.info("Default payment methods created for new user %s.", user.id)
         else:
-            logger.info(f"Found existing user {user.id} for phone number {phone_number}.")
+            logger.info("Found existing user %s for phone number %s.", user.id, phone_number)
         
         return user, created
 
@@ -249,7 +301,6 @@ class WebhookService:
 # ==============================================================================
 class MessageService:
     API_VERSION = 'v20.0'
-    BASE_URL = 'https://graph.facebook.com'
 
     def send_text_message(self, recipient: User, text: str, replied_to: Optional[Message] = None) -> Optional[Message]:
         """
@@ -257,12 +308,12 @@ class MessageService:
         Retorna o objeto da mensagem salva.
         """
         if not recipient.phone_number:
-            logger.error(f"MessageService: Attempted to send message to user {recipient.id} without a phone number.")
+            logger.error("MessageService: Attempted to send message to user %s without a phone number.", recipient.id)
             return None
 
         phone_number_id = settings.META_PHONE_NUMBER_ID
         access_token = settings.META_ACCESS_TOKEN
-        url = f"{self.BASE_URL}/{self.API_VERSION}/{phone_number_id}/messages"
+        url = f"{settings.META_GRAPH_BASE_URL}/{self.API_VERSION}/{phone_number_id}/messages"
         
         headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
         payload = {
@@ -273,12 +324,14 @@ class MessageService:
             payload['context'] = {'message_id': replied_to.whatsapp_message_id}
 
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=15)
+            with span('meta.graph.send_message', **{'http.url': url}) as graph_span:
+                response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=15)
+                graph_span.attributes['http.status_code'] = response.status_code
             response.raise_for_status()
             
             response_data = response.json()
             sent_message_id = response_data['messages'][0]['id']
-            logger.info(f"Message sent to user {recipient.id} via Meta API. WAMID: {sent_message_id}")
+            logger.info("Message sent to user %s via Meta API. WAMID: %s", recipient.id, sent_message_id)
             
             outbound_message = Message.objects.create(
                 whatsapp_message_id=sent_message_id, 
@@ -288,11 +341,11 @@ class MessageService:
                 body=text, 
                 timestamp=timezone.now()
             )
-            logger.info(f"Outbound message for user {recipient.id} saved to database.")
+            logger.info("Outbound message for user %s saved to database.", recipient.id)
             return outbound_message
         except requests.exceptions.RequestException:
-            logger.error(f"MessageService: Failed to send message to {recipient.phone_number}.", exc_info=True)
+            logger.error("MessageService: Failed to send message to %s.", recipient.phone_number, exc_info=True)
             return None
         except (KeyError, IndexError):
-            logger.error(f"MessageService: Unexpected response format from Meta API for user {recipient.id}.", exc_info=True)
+            logger.error("MessageService: Unexpected response format from Meta API for user %s.", recipient.id, exc_info=True)
             return None
\ No newline at end of file
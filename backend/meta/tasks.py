@@ -1,35 +1,94 @@
 import logging
+import time
+from typing import Optional
+
 from celery import shared_task
-from .services import WebhookService
+from django.conf import settings
+from django.db import transaction
+
+from core.metrics import WEBHOOK_QUEUE_WAIT_SECONDS
+from core.profiling import sampled_profile
+from users.models import User
+from .backpressure import NORMAL, QueuePressure, measure_queue_depth, record_queue_lag
+from .dead_letter import capture_failed_webhook
+from .models import DeferredWebhook
+from .services import WebhookService, MessageService
 
 # Boa prática: inicializar o logger para este módulo.
 logger = logging.getLogger(__name__)
 
 @shared_task(bind=True)
-def process_webhook_payload(self, payload: dict):
+def process_webhook_payload(self, payload: dict, received_at: Optional[float] = None):
     """
     Tarefa assíncrona do Celery que recebe o payload completo do webhook da Meta e o delega para a camada de serviço para processamento em segundo plano.
 
     O `bind=True` nos dá acesso à instância da tarefa (`self`), permitindo obter informações como o ID da tarefa para logs mais detalhados.
+    `received_at` é o horário em que a view aceitou o webhook, usado nas métricas de fila e de tempo total.
     """
     task_id = self.request.id
-    logger.info(f"Task {task_id}: Starting webhook payload processing.")
+    logger.info("Task %s: Starting webhook payload processing.", task_id)
+    if received_at is not None:
+        queue_wait = max(time.time() - received_at, 0.0)
+        WEBHOOK_QUEUE_WAIT_SECONDS.observe(queue_wait)
+        # Webhooks que passaram pelo banco (DeferredWebhook) já saíram da sobrecarga; o atraso deles não conta.
+        if not self.request.get('deferred'):
+            record_queue_lag(queue_wait)
 
     try:
         # A lógica de negócio é delegada para a camada de serviço.
         # Isso mantém a tarefa simples e focada em sua responsabilidade: gerenciar a execução.
-        service_instance = WebhookService()
-        service_instance.process_payload(payload)
+        service_instance = WebhookService(received_at=received_at)
+        with sampled_profile('webhook', task_id) as profile:
+            service_instance.process_payload(payload)
+            if profile is not None:
+                profile.label = service_instance.timer.intent
         
-        logger.info(f"Task {task_id}: Successfully processed by the service layer.")
+        logger.info("Task %s: Successfully processed by the service layer.", task_id)
         return f"Task {task_id}: Payload processed successfully."
 
     except Exception as e:
         # Captura qualquer exceção inesperada que possa ocorrer na camada de serviço.
         logger.error(
-            f"Task {task_id}: An unexpected error occurred during processing.",
+            "Task %s: An unexpected error occurred during processing.", task_id,
             exc_info=True  # Inclui o traceback completo do erro no log para depuração.
         )
+        # Guarda o payload no dead-letter, para reprocessá-lo depois com `replay_failed_webhooks`.
+        capture_failed_webhook(payload, e, received_at=received_at, task_id=task_id)
         # Re-lança a exceção para que o Celery marque a tarefa como 'FAILURE'.
         # Isso é importante para monitoramento e possíveis novas tentativas (retries).
-        raise e
\ No newline at end of file
+        raise e
+
+@shared_task(rate_limit=settings.META_SEND_RATE_LIMIT)
+def send_text_message(user_id: str, text: str):
+    """
+    Tarefa assíncrona que envia uma mensagem de texto ativa (sem resposta a uma mensagem do usuário).
+    Usada pelos envios agendados, como os lembretes de fatura. O `rate_limit` limita o ritmo por worker.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if not user:
+        logger.warning("Outbound message skipped: user %s no longer exists.", user_id)
+        return
+    MessageService().send_text_message(user, text)
+
+@shared_task
+def drain_deferred_webhooks():
+    """
+    Tarefa periódica que devolve à fila os webhooks guardados durante uma sobrecarga, em ordem de chegada.
+    Só enfileira enquanto a fila estiver abaixo do limite suave, para não recriar a sobrecarga.
+    """
+    depth = measure_queue_depth()
+    if depth is None or QueuePressure(depth, None).level != NORMAL:
+        return 0
+
+    room = min(settings.WEBHOOK_QUEUE_SOFT_LIMIT - depth, settings.DEFERRED_WEBHOOK_DRAIN_BATCH_SIZE)
+    with transaction.atomic():
+        batch = list(DeferredWebhook.objects.select_for_update(skip_locked=True)[:room])
+        for deferred in batch:
+            process_webhook_payload.apply_async(
+                args=[deferred.payload], kwargs={'received_at': deferred.received_at}, headers={'deferred': True},
+            )
+        DeferredWebhook.objects.filter(pk__in=[deferred.pk for deferred in batch]).delete()
+    if batch:
+        logger.info("%s deferred webhooks queued for processing.", len(batch))
+    return len(batch)
+
@@ -1,12 +1,39 @@
 import json
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from decimal import Decimal
+import time
+from unittest import mock
+from datetime import date, timedelta
+
+import redis
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
 from django.conf import settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 # Importe os modelos que precisamos verificar
 from users.models import User
-from .models import Message
+from ai.models import AILog
+from core.fakes import LatencyModel
+from core.instrumentation import assert_query_budget
+from expenses.models import Category, Expense
+from .archive import archive_old_rows, iter_archived_rows
+from .replies import get_monthly_summary_reply, get_user_categories_reply, render_text_reply
+from .backpressure import QueuePressure, record_queue_lag
+from .dead_letter import replay_failed_webhooks
+from .fakes import FakeGraphServer
+from .journal import JournalRecord, JournalWriter, iter_journal
+from .models import DeferredWebhook, FailedWebhook, Message
+from .services import MessageService, WebhookService
+from .tasks import drain_deferred_webhooks, process_webhook_payload
 
 class MetaWebhookTests(APITestCase):
     """
@@ -103,4 +130,415 @@ class MetaWebhookTests(APITestCase):
         created_message = Message.objects.first()
         self.assertEqual(created_message.sender, created_user)
         self.assertEqual(created_message.body, "Hello from test!")
-        self.assertEqual(created_message.whatsapp_message_id, "wamid.HBjNSk_-FwAEl8-U8-A")
\ No newline at end of file
+        self.assertEqual(created_message.whatsapp_message_id, "wamid.HBjNSk_-FwAEl8-U8-A")
+
+
+class HistoryArchiveTests(TestCase):
+    """
+    Suite de testes para o arquivamento de mensagens e logs de IA antigos.
+    """
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(HISTORY_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='archiveuser', phone_number='5511900000010')
+        now = timezone.now()
+        for index in range(5):
+            message = Message.objects.create(
+                whatsapp_message_id=f"wamid.{index}", sender=self.user, body=f"mensagem {index}", timestamp=now
+            )
+            # Três mensagens antigas (uma por mês) e duas recentes.
+            age = timedelta(days=400 + 31 * index) if index < 3 else timedelta(days=1)
+            Message.objects.filter(pk=message.pk).update(created_at=now - age)
+        AILog.objects.create(user=self.user, prompt_sent="prompt", response_received="{}", duration_ms=10)
+
+    def test_old_rows_move_to_archive_in_batches(self):
+        """
+        Garante que só as linhas fora da retenção saem do banco, em lotes, e continuam legíveis no arquivo.
+        """
+        archived = archive_old_rows('messages', retention_days=180, batch_size=2)
+
+        self.assertEqual(archived, 3)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(archive_old_rows('ai_logs', retention_days=180), 0)
+
+        rows = list(iter_archived_rows('messages', user_id=self.user.id))
+        self.assertEqual(sorted(row['body'] for row in rows), ["mensagem 0", "mensagem 1", "mensagem 2"])
+
+    def test_loader_filters_by_period(self):
+        """
+        Garante que o leitor do arquivo respeita o período pedido.
+        """
+        archive_old_rows('messages', retention_days=180)
+        newest_archived = timezone.now() - timedelta(days=400)
+
+        rows = list(iter_archived_rows('messages', start=newest_archived.date() - timedelta(days=1), end=date.today()))
+        self.assertEqual([row['body'] for row in rows], ["mensagem 0"])
+
+
+class CachedReplyTests(TestCase):
+    """
+    Suite de testes para o cache das respostas formatadas.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='replyuser', phone_number='5511900000011', first_name="Ana")
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(user=self.user, name="Lazer")
+
+    def test_repeated_replies_cost_no_queries(self):
+        """
+        Garante que `minhas categorias` e `resumo do mês` repetidos são atendidos sem consultas ao banco.
+        """
+        categories_reply = get_user_categories_reply(self.user)
+        summary_reply = get_monthly_summary_reply(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_categories_reply(self.user), categories_reply)
+            self.assertEqual(get_monthly_summary_reply(self.user), summary_reply)
+            self.assertIn("Ana", render_text_reply("saudacao", "Ana"))
+
+    def test_writes_invalidate_cached_replies(self):
+        """
+        Garante que uma nova categoria aparece na resposta logo após ser criada.
+        """
+        self.assertNotIn("Viagem", get_user_categories_reply(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(user=self.user, name="Viagem")
+
+        self.assertIn("Viagem", get_user_categories_reply(self.user))
+
+
+class WebhookPipelineTests(TestCase):
+    """
+    Suite de testes para o processamento de uma mensagem de ponta a ponta no worker.
+    """
+
+    def test_reply_flow_records_stage_metrics(self):
+        """
+        Garante que a mensagem é respondida e que cada etapa é medida com a intenção interpretada.
+        """
+        user = User.objects.create_user(username='5511900000012', phone_number='5511900000012')
+        payload = {
+            'object': 'whatsapp_business_account',
+            'entry': [{'changes': [{'field': 'messages', 'value': {
+                'contacts': [{'profile': {'name': 'Teste'}, 'wa_id': '5511900000012'}],
+                'messages': [{'from': '5511900000012', 'id': 'wamid.pipeline', 'timestamp': str(int(time.time())),
+                              'text': {'body': 'minhas categorias'}, 'type': 'text'}],
+            }}]}],
+        }
+        labels = {'stage': 'ai_interpretation', 'intent': 'pedir_categorias'}
+        before = REGISTRY.get_sample_value('message_pipeline_stage_seconds_count', labels) or 0
+
+        with mock.patch('meta.services.AIService') as ai_service, \
+             mock.patch('meta.services.MessageService.send_text_message') as send_text_message, \
+             mock.patch.object(WebhookService, '_find_or_create_user', return_value=(user, False)):
+            ai_service.return_value.interpret_message.return_value = {'intent': 'pedir_categorias'}
+            WebhookService(received_at=time.time()).process_payload(payload)
+
+        send_text_message.assert_called_once()
+        self.assertIn("categoria", send_text_message.call_args.args[1])
+        self.assertEqual(REGISTRY.get_sample_value('message_pipeline_stage_seconds_count', labels), before + 1)
+
+
+class IntentQueryBudgetTests(TestCase):
+    """
+    Suite de testes que garante que cada intenção respeita o seu orçamento de consultas ao banco.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='budgetuser', phone_number='5511900000013')
+        food = Category.objects.create(user=self.user, name="Alimentação", monthly_budget=Decimal('500.00'))
+        Category.objects.create(user=self.user, name="Transporte")
+        for index in range(10):
+            Expense.objects.create(user=self.user, category=food, amount=Decimal('12.00'), description=f"mercado {index}")
+
+    def test_intents_stay_within_query_budget(self):
+        """
+        Garante que o número de consultas de cada intenção não cresce com o histórico do usuário.
+        """
+        today = timezone.localdate().isoformat()
+        plans = {
+            'pedir_categorias': {},
+            'pedir_resumo': {},
+            'pedir_tendencia': {'months': 6},
+            'consultar_gastos': {'start_date': today, 'end_date': today, 'keyword': 'mercado'},
+            'registrar_despesa': {'amount': 20, 'description': 'padaria', 'category': 'Alimentação', 'payment_method': 'Pix'},
+            'saudacao': {},
+        }
+        for intent, plan in plans.items():
+            with self.subTest(intent=intent), assert_query_budget(self, 'intent', intent):
+                WebhookService()._build_reply(intent, {'intent': intent, **plan}, self.user)
+
+
+@override_settings(WEBHOOK_QUEUE_SOFT_LIMIT=100, WEBHOOK_QUEUE_HARD_LIMIT=1000)
+class WebhookBackpressureTests(APITestCase):
+    """
+    Suite de testes para a contenção de carga na entrada do webhook.
+    """
+
+    message_payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"field": "messages", "value": {
+            "messages": [{"from": "5511999997777", "id": "wamid.pressure", "timestamp": "1664303417", "type": "text"}],
+        }}]}],
+    }
+    status_payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"field": "messages", "value": {
+            "statuses": [{"id": "wamid.out", "status": "delivered"}],
+        }}]}],
+    }
+
+    def _post(self, payload, depth):
+        with mock.patch('meta.views.get_queue_pressure', return_value=QueuePressure(depth, None)), \
+             mock.patch('meta.views.process_webhook_payload.delay') as delay:
+            response = self.client.post(reverse('meta-webhook'), data=payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return delay
+
+    def test_messages_are_deferred_above_soft_limit(self):
+        """
+        Garante que, acima do limite suave, o payload vai para o banco em vez da fila.
+        """
+        delay = self._post(self.message_payload, depth=150)
+
+        delay.assert_not_called()
+        self.assertEqual(DeferredWebhook.objects.get().payload, self.message_payload)
+
+    def test_statuses_are_shed_above_hard_limit(self):
+        """
+        Garante que, acima do limite rígido, eventos de status são descartados e mensagens ainda são guardadas.
+        """
+        self._post(self.status_payload, depth=5000).assert_not_called()
+        self.assertFalse(DeferredWebhook.objects.exists())
+
+        self._post(self.message_payload, depth=5000).assert_not_called()
+        self.assertEqual(DeferredWebhook.objects.count(), 1)
+
+    def test_queue_failure_falls_back_to_deferring(self):
+        """
+        Garante que uma falha ao enfileirar não perde a mensagem.
+        """
+        with mock.patch('meta.views.get_queue_pressure', return_value=QueuePressure(0, None)), \
+             mock.patch('meta.views.process_webhook_payload.delay', side_effect=ConnectionError):
+            response = self.client.post(reverse('meta-webhook'), data=self.message_payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(DeferredWebhook.objects.count(), 1)
+
+    def test_redis_outage_in_cache_still_defers_message(self):
+        """
+        Garante que, com o Redis fora do ar (cache e broker), a mensagem ainda é guardada no banco, e que o
+        registro do atraso da fila no worker não falha.
+        """
+        with mock.patch('meta.backpressure.cache.get', side_effect=redis.ConnectionError), \
+             mock.patch('meta.views.process_webhook_payload.delay', side_effect=redis.ConnectionError):
+            response = self.client.post(reverse('meta-webhook'), data=self.message_payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(DeferredWebhook.objects.count(), 1)
+        with mock.patch('meta.backpressure.cache.set', side_effect=redis.ConnectionError):
+            record_queue_lag(1.5)
+
+    def test_drain_requeues_in_arrival_order_when_queue_recovers(self):
+        """
+        Garante que os webhooks guardados voltam à fila, na ordem de chegada, só com a fila abaixo do limite suave.
+        """
+        for received_at in (1.0, 2.0, 3.0):
+            DeferredWebhook.objects.create(payload={"n": received_at}, received_at=received_at)
+
+        with mock.patch('meta.tasks.measure_queue_depth', return_value=150), \
+             mock.patch('meta.tasks.process_webhook_payload.apply_async') as apply_async:
+            self.assertEqual(drain_deferred_webhooks(), 0)
+        apply_async.assert_not_called()
+
+        with mock.patch('meta.tasks.measure_queue_depth', return_value=98), \
+             mock.patch('meta.tasks.process_webhook_payload.apply_async') as apply_async:
+            self.assertEqual(drain_deferred_webhooks(), 2)
+        self.assertEqual([call.kwargs['kwargs']['received_at'] for call in apply_async.call_args_list], [1.0, 2.0])
+        self.assertEqual(list(DeferredWebhook.objects.values_list('received_at', flat=True)), [3.0])
+
+
+class FailedWebhookTests(TestCase):
+    """
+    Suite de testes para o dead-letter dos webhooks e o seu reprocessamento.
+    """
+
+    @staticmethod
+    def _payload(sender: str, text: str) -> dict:
+        return {"object": "whatsapp_business_account", "entry": [{"changes": [{"field": "messages", "value": {
+            "messages": [{"from": sender, "id": f"wamid.{text}", "timestamp": "1664303417", "text": {"body": text}}],
+        }}]}]}
+
+    def test_failed_task_stores_payload_with_error(self):
+        """
+        Garante que uma falha na tarefa guarda o payload, a classe do erro e o hash da pilha.
+        """
+        payload = self._payload("5511911112222", "quebrado")
+        with mock.patch.object(WebhookService, 'process_payload', side_effect=KeyError('amount')):
+            result = process_webhook_payload.apply(args=[payload], kwargs={'received_at': 123.0})
+
+        self.assertTrue(result.failed())
+        failure = FailedWebhook.objects.get()
+        self.assertEqual(
+            (failure.payload, failure.sender_wa_id, failure.error_class, failure.received_at),
+            (payload, "5511911112222", "builtins.KeyError", 123.0),
+        )
+        self.assertEqual(len(failure.stack_hash), 16)
+
+    def test_replay_keeps_order_per_user(self):
+        """
+        Garante que o reprocessamento remove as falhas resolvidas e, se uma mensagem falhar de novo,
+        adia as seguintes do mesmo usuário sem bloquear os demais.
+        """
+        for sender, text in (("5511900000001", "a1"), ("5511900000002", "b1"), ("5511900000001", "a2")):
+            FailedWebhook.objects.create(
+                payload=self._payload(sender, text), sender_wa_id=sender, error_class="builtins.KeyError", stack_hash="0" * 16,
+            )
+        processed = []
+
+        def process_payload(service, payload):
+            text = payload['entry'][0]['changes'][0]['value']['messages'][0]['text']['body']
+            if text == "a1":
+                raise TimeoutError("IA fora do ar")
+            processed.append(text)
+
+        with mock.patch.object(WebhookService, 'process_payload', process_payload):
+            report = replay_failed_webhooks(FailedWebhook.objects.all(), workers=1, batch_size=2)
+
+        self.assertEqual(report, {"replayed": 1, "failed": 1, "skipped": 1, "duplicates": 0, "flagged": 0})
+        self.assertEqual(processed, ["b1"])
+        remaining = FailedWebhook.objects.order_by('id')
+        self.assertEqual([failure.payload['entry'][0]['changes'][0]['value']['messages'][0]['text']['body'] for failure in remaining], ["a1", "a2"])
+        self.assertEqual((remaining[0].attempts, remaining[0].error_class), (2, "builtins.TimeoutError"))
+
+    def test_replay_does_not_repeat_processed_messages(self):
+        """
+        Garante que o reprocessamento descarta mensagens já respondidas e segura, para revisão, as que já
+        registraram uma despesa sem responder, sem duplicar o lançamento.
+        """
+        user = User.objects.create_user(username='replayuser', phone_number='5511900000003')
+        now = timezone.now()
+        for text in ("respondida", "gravada", "seguinte"):
+            inbound = Message.objects.create(whatsapp_message_id=f"wamid.{text}", sender=user, body=text, timestamp=now)
+            if text == "respondida":
+                Message.objects.create(whatsapp_message_id="wamid.resposta", sender=user, direction='OUTBOUND', replied_to=inbound, timestamp=now)
+            if text == "gravada":
+                Expense.objects.create(user=user, amount=Decimal('10.00'), description="almoço")
+            FailedWebhook.objects.create(
+                payload=self._payload("5511900000003", text), sender_wa_id="5511900000003",
+                error_class="requests.exceptions.Timeout", stack_hash="0" * 16,
+            )
+
+        with mock.patch.object(WebhookService, 'process_payload') as process_payload:
+            report = replay_failed_webhooks(FailedWebhook.objects.all(), workers=1)
+
+        process_payload.assert_not_called()
+        self.assertEqual(report, {"replayed": 0, "failed": 0, "skipped": 1, "duplicates": 1, "flagged": 1})
+        remaining = FailedWebhook.objects.order_by('id')
+        self.assertEqual([failure.payload['entry'][0]['changes'][0]['value']['messages'][0]['id'] for failure in remaining],
+                         ["wamid.gravada", "wamid.seguinte"])
+        self.assertEqual(Expense.objects.filter(user=user).count(), 1)
+
+
+@override_settings(WEBHOOK_JOURNAL_BLOCK_RECORDS=2, WEBHOOK_JOURNAL_FLUSH_SECONDS=0.01)
+class WebhookJournalTests(TestCase):
+    """
+    Suite de testes para o diário de payloads de webhook e a sua reprodução.
+    """
+
+    def setUp(self):
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        self.journal_dir = Path(journal_dir.name)
+
+    def _write(self, received_ats):
+        writer = JournalWriter(self.journal_dir)
+        writer.start()
+        for received_at in received_ats:
+            writer.queue.put(JournalRecord(received_at, {"n": received_at}))
+        writer.stop()
+
+    def test_reads_time_range_in_order_across_segments(self):
+        """
+        Garante que a leitura junta os segmentos dos processos em ordem e respeita o período pedido.
+        """
+        self._write([100.0, 102.0, 104.0, 106.0, 108.0])
+        self._write([101.0, 103.0, 105.0])
+
+        segments = sorted(self.journal_dir.glob('19700101/*'))
+        self.assertEqual(len([segment for segment in segments if segment.suffix == '.idx']), 2)
+        records = list(iter_journal(101.0, 106.0, base_dir=self.journal_dir))
+        self.assertEqual([record.received_at for record in records], [101.0, 102.0, 103.0, 104.0, 105.0, 106.0])
+        self.assertEqual(records[0].payload, {"n": 101.0})
+
+    def test_replay_command_feeds_payloads_to_service(self):
+        """
+        Garante que o comando de reprodução passa os payloads do período pelo WebhookService.
+        """
+        self._write([100.0, 101.0, 200.0])
+
+        with override_settings(WEBHOOK_JOURNAL_DIR=str(self.journal_dir)), \
+             mock.patch.object(WebhookService, 'process_payload') as process_payload:
+            call_command(
+                'replay_webhook_journal', since='1970-01-01T00:00:00+00:00', until='1970-01-01T00:02:00+00:00',
+                speed=0, stdout=StringIO(),
+            )
+
+        self.assertEqual([call.args[0] for call in process_payload.call_args_list], [{"n": 100.0}, {"n": 101.0}])
+
+
+
+class FakeGraphServerTests(TestCase):
+    """
+    Suite de testes para o servidor falso da Graph API usado nos testes de carga.
+    """
+
+    def setUp(self):
+        self.server = FakeGraphServer(('127.0.0.1', 0), LatencyModel(0, 0))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.user = User.objects.create_user(username='5511900000020', phone_number='5511900000020')
+
+    def test_message_service_sends_through_fake_server(self):
+        """
+        Garante que o MessageService, apontado para o servidor falso, recebe um WAMID e grava a mensagem de saída.
+        """
+        with override_settings(META_GRAPH_BASE_URL=f"http://127.0.0.1:{self.server.server_port}"):
+            message = MessageService().send_text_message(self.user, "Olá!")
+
+        self.assertTrue(message.whatsapp_message_id.startswith('wamid.FAKE'))
+        self.assertEqual(self.server.sent, 1)
+
+    def test_records_sends_for_reply_matching(self):
+        """
+        Garante que os envios aceitos ficam disponíveis em /_fake/sends, com a mensagem respondida.
+        """
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        for wamid in ("wamid.IN1", "wamid.IN2"):
+            requests.post(f"{base_url}/v20.0/123/messages", json={"to": "5511900000020", "context": {"message_id": wamid}}, timeout=5)
+
+        sends = requests.get(f"{base_url}/_fake/sends", params={'after': 1}, timeout=5).json()
+
+        self.assertEqual(sends['last_seq'], 2)
+        self.assertEqual([send['context_id'] for send in sends['data']], ["wamid.IN2"])
+
+    def test_simulated_errors_use_graph_error_format(self):
+        """
+        Garante que as falhas simuladas respondem com o status e o corpo de erro da Graph API.
+        """
+        self.server.latency = LatencyModel(0, 0, error_rate=1)
+        response = requests.post(
+            f"http://127.0.0.1:{self.server.server_port}/v20.0/123/messages", json={"to": "5511900000020"}, timeout=5,
+        )
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['error']['code'], 2)
+        self.assertEqual(self.server.sent, 0)
@@ -1,10 +1,16 @@
 import logging
+import time
+from typing import Optional
 from django.http import HttpResponse, HttpRequest
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
+from core.metrics import WEBHOOK_ACCEPT_SECONDS, WEBHOOK_BACKPRESSURE_TOTAL
+from core.tracing import span, trace_id_for_wamid
+from .backpressure import HARD, NORMAL, defer_webhook, get_queue_pressure
+from .journal import record_webhook_payload
 from .tasks import process_webhook_payload
 
 # Inicializa o logger para este módulo.
@@ -39,7 +45,7 @@ class MetaWebhookView(APIView):
             logger.info("Webhook verification successful!")
             return HttpResponse(challenge, status=200)
         
-        logger.warning(f"Webhook verification failed. Token received: '{token}'")
+        logger.warning("Webhook verification failed. Token received: '%s'", token)
         return HttpResponse('Error, wrong validation token', status=403)
 
     def post(self, request: HttpRequest) -> Response:
@@ -48,25 +54,56 @@ class MetaWebhookView(APIView):
 
         Este método recebe o payload JSON da Meta, envia para a tarefa assíncrona do Celery (`process_webhook_payload`) e responde imediatamente com 200 OK.
         Isso garante que a Meta não receba um timeout, mesmo que o processamento da mensagem seja demorado.
+
+        Com a fila sobrecarregada (ver meta/backpressure.py), as mensagens são guardadas no banco para processamento
+        posterior e, acima do limite rígido, os eventos que não são mensagens (status de entrega) são descartados.
         """
         payload = request.data
-        
-        try:
-            # A função .delay() enfileira a tarefa. O payload é serializado
-            # e enviado para o Redis, de onde um worker do Celery o pegará.
-            task = process_webhook_payload.delay(payload)
-            logger.info(f"Webhook payload received and tasked to Celery worker with ID: {task.id}")
-            
+        received_at = time.time()
+        # Tudo o que a Meta envia vai para o diário de webhooks (gravado em segundo plano), antes de qualquer decisão.
+        record_webhook_payload(payload, received_at)
+        # O trace da mensagem nasce aqui, com id derivado do WAMID, e segue para o worker nos cabeçalhos da tarefa.
+        wamid = _get_first_wamid(payload)
+        trace_id = trace_id_for_wamid(wamid) if wamid else None
+
+        with WEBHOOK_ACCEPT_SECONDS.time(), span('webhook.accept', trace_id=trace_id, **{'messaging.wamid': wamid or ''}) as accept_span:
+            pressure_level = get_queue_pressure().level
+            accept_span.attributes['webhook.pressure'] = pressure_level
+            if pressure_level == HARD and wamid is None:
+                WEBHOOK_BACKPRESSURE_TOTAL.labels(action='shed').inc()
+                return Response(status=status.HTTP_200_OK)
+
+            if pressure_level == NORMAL:
+                try:
+                    # A função .delay() enfileira a tarefa. O payload é serializado
+                    # e enviado para o Redis, de onde um worker do Celery o pegará.
+                    task = process_webhook_payload.delay(payload, received_at=received_at)
+                    logger.info("Webhook payload received and tasked to Celery worker with ID: %s", task.id)
+                    return Response(status=status.HTTP_200_OK)
+                except Exception:
+                    # Falha ao enfileirar (ex: Redis fora do ar): a mensagem ainda pode ser guardada no banco.
+                    logger.error("Failed to queue webhook payload to Celery worker; deferring it.", exc_info=True)
+
+            try:
+                defer_webhook(payload, received_at)
+            except Exception:
+                # Captura uma falha crítica (nem fila nem banco disponíveis).
+                logger.critical("Failed to queue or defer webhook payload.", exc_info=True)
+                # Retorna um erro 500 para sinalizar que algo grave aconteceu (a Meta reenviará o webhook).
+                return Response(
+                    {"error": "Internal server error processing webhook."},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            WEBHOOK_BACKPRESSURE_TOTAL.labels(action='deferred').inc()
+            logger.warning("Webhook queue under pressure (%s); payload deferred.", pressure_level)
             return Response(status=status.HTTP_200_OK)
-        
-        except Exception as e:
-            # Captura uma falha crítica (ex: Redis fora do ar) ao tentar enfileirar a tarefa.
-            logger.critical(
-                "Failed to queue webhook payload to Celery worker.", 
-                exc_info=True
-            )
-            # Retorna um erro 500 para sinalizar que algo grave aconteceu.
-            return Response(
-                {"error": "Internal server error processing webhook."}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+
+def _get_first_wamid(payload) -> Optional[str]:
+    """
+    Extrai o id (WAMID) da primeira mensagem do payload, se houver. Eventos de status não têm mensagens.
+    """
+    try:
+        return payload['entry'][0]['changes'][0]['value']['messages'][0]['id']
+    except (KeyError, IndexError, TypeError):
+        return None
+
@@ -4,4 +4,5 @@ from .models import PaymentMethod
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'due_date')
+    list_select_related = ('user',)
     list_filter = ('user',)
\ No newline at end of file
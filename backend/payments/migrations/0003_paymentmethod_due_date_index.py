@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:28
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentmethod',
+            name='due_date',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text='Dia do vencimento da fatura (1-31)', null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)]),
+        ),
+    ]
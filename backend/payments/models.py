@@ -11,7 +11,7 @@ class PaymentMethod(models.Model):
     # Dia do vencimento da fatura (para cartões de crédito)
     due_date = models.PositiveIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(31)],
-        null=True, blank=True,
+        null=True, blank=True, db_index=True,
         help_text="Dia do vencimento da fatura (1-31)"
     )
     created_at = models.DateTimeField(auto_now_add=True)
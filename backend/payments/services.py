@@ -1,5 +1,13 @@
+import calendar
 import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
+
 from users.models import User
+from expenses.models import Expense
 from .models import PaymentMethod
 
 logger = logging.getLogger(__name__)
@@ -11,6 +19,9 @@ DEFAULT_PAYMENT_METHODS = [
     {"name": "Dinheiro"},
 ]
 
+# A fatura fecha este número de dias antes do vencimento; as compras após o fechamento vão para a próxima.
+INVOICE_CLOSING_DAYS_BEFORE_DUE = 7
+
 def create_default_payment_methods_for_user(user: User):
     """
     Cria as formas de pagamento padrão para um usuário recém-criado
@@ -27,4 +38,85 @@ def create_default_payment_methods_for_user(user: User):
         user.default_payment_method = created_methods[0]
         user.save()
         
-    logger.info(f"Formas de pagamento padrão criadas para o usuário {user.id}.")
\ No newline at end of file
+    logger.info(f"Formas de pagamento padrão criadas para o usuário {user.id}.")
+
+def get_effective_due_date(year: int, month: int, due_day: int) -> date:
+    """
+    Retorna a data de vencimento real em um mês. Dias que não existem no mês
+    (ex: 31 em abril, 30 em fevereiro) vencem no último dia do mês.
+    """
+    return date(year, month, min(due_day, calendar.monthrange(year, month)[1]))
+
+def get_payment_methods_due_on(target_date: date) -> QuerySet:
+    """
+    Busca, pelo índice de `due_date`, todas as formas de pagamento que vencem em `target_date`.
+    No último dia do mês, inclui também os vencimentos em dias que o mês não tem.
+    """
+    last_day = calendar.monthrange(target_date.year, target_date.month)[1]
+    if target_date.day == last_day:
+        methods = PaymentMethod.objects.filter(due_date__gte=target_date.day)
+    else:
+        methods = PaymentMethod.objects.filter(due_date=target_date.day)
+    return methods.filter(user__is_active=True, user__phone_number__isnull=False).select_related('user')
+
+def get_invoice_period(payment_method: PaymentMethod, due_date: date) -> tuple[date, date]:
+    """
+    Retorna o período [início, fim) das compras que compõem a fatura que vence em `due_date`:
+    do fechamento da fatura anterior até o fechamento desta.
+    """
+    previous_year, previous_month = (due_date.year - 1, 12) if due_date.month == 1 else (due_date.year, due_date.month - 1)
+    previous_due_date = get_effective_due_date(previous_year, previous_month, payment_method.due_date)
+    closing_offset = timedelta(days=INVOICE_CLOSING_DAYS_BEFORE_DUE)
+    return previous_due_date - closing_offset, due_date - closing_offset
+
+def get_invoice_amounts(payment_methods: list[PaymentMethod], due_date: date) -> dict:
+    """
+    Calcula o valor da fatura de cada forma de pagamento que vence em `due_date`.
+    As formas de pagamento com o mesmo período de fatura são somadas em uma única consulta agregada.
+    Retorna um dicionário {payment_method_id: valor}.
+    """
+    methods_by_period: dict[tuple[date, date], list] = {}
+    for payment_method in payment_methods:
+        methods_by_period.setdefault(get_invoice_period(payment_method, due_date), []).append(payment_method.id)
+
+    amounts = {}
+    for (start, end), method_ids in methods_by_period.items():
+        rows = (
+            Expense.objects
+            .filter(payment_method_id__in=method_ids, transaction_date__gte=_local_midnight(start), transaction_date__lt=_local_midnight(end))
+            .values_list('payment_method_id')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        amounts.update({method_id: total or Decimal('0.00') for method_id, total in rows})
+    return amounts
+
+def build_bill_reminders(days_ahead: int, today: date = None) -> list[tuple]:
+    """
+    Monta os lembretes das faturas que vencem daqui a `days_ahead` dias.
+    Retorna uma lista de tuplas (user_id, texto), apenas para faturas com valor em aberto.
+    """
+    today = today or timezone.localdate()
+    due_date = today + timedelta(days=days_ahead)
+    payment_methods = list(get_payment_methods_due_on(due_date))
+    amounts = get_invoice_amounts(payment_methods, due_date)
+
+    reminders = []
+    for payment_method in payment_methods:
+        amount = amounts.get(payment_method.id)
+        if not amount:
+            continue
+        reminders.append((payment_method.user_id, _format_bill_reminder(payment_method, due_date, days_ahead, amount)))
+
+    logger.info(f"{len(reminders)} bill reminders built for invoices due on {due_date}.")
+    return reminders
+
+def _format_bill_reminder(payment_method: PaymentMethod, due_date: date, days_ahead: int, amount: Decimal) -> str:
+    when = "hoje" if days_ahead == 0 else ("amanhã" if days_ahead == 1 else f"em {days_ahead} dias")
+    return (
+        f"📅 Lembrete: a fatura do *{payment_method.name}* vence {when} ({due_date.strftime('%d/%m')}).\n"
+        f"💳 Valor estimado: R$ {amount:.2f}"
+    )
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,23 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+
+from meta.tasks import send_text_message
+from .services import build_bill_reminders
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def send_bill_reminders():
+    """
+    Tarefa diária que enfileira os lembretes das faturas que vencem em `BILL_REMINDER_DAYS_AHEAD` dias.
+    Os envios são liberados em lotes espaçados para não estourar o limite de envio da API da Meta.
+    """
+    reminders = build_bill_reminders(settings.BILL_REMINDER_DAYS_AHEAD)
+    batch_size = settings.BILL_REMINDER_BATCH_SIZE
+
+    for index, (user_id, text) in enumerate(reminders):
+        countdown = (index // batch_size) * settings.BILL_REMINDER_BATCH_INTERVAL_SECONDS
+        send_text_message.apply_async(args=[str(user_id), text], countdown=countdown)
+
+    logger.info(f"{len(reminders)} bill reminders queued in batches of {batch_size}.")
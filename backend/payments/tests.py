@@ -1,3 +1,71 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.models import User
+from expenses.models import Expense
+from .models import PaymentMethod
+from .services import build_bill_reminders, get_effective_due_date, get_invoice_period, get_payment_methods_due_on
+from .tasks import send_bill_reminders
+
+
+class BillReminderTests(TestCase):
+    """
+    Suite de testes para os lembretes de vencimento de fatura.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='billuser', phone_number='5511900000004')
+        self.card_10 = PaymentMethod.objects.create(user=self.user, name="Crédito", due_date=10)
+        self.card_31 = PaymentMethod.objects.create(user=self.user, name="Nubank", due_date=31)
+        self.debit = PaymentMethod.objects.create(user=self.user, name="Débito")
+
+    def test_due_dates_in_short_months(self):
+        """
+        Garante que vencimentos em dias inexistentes caem no último dia do mês.
+        """
+        self.assertEqual(get_effective_due_date(2025, 2, 31), date(2025, 2, 28))
+        self.assertEqual(get_effective_due_date(2024, 2, 30), date(2024, 2, 29))
+        self.assertEqual(list(get_payment_methods_due_on(date(2025, 2, 28))), [self.card_31])
+        self.assertEqual(list(get_payment_methods_due_on(date(2025, 3, 10))), [self.card_10])
+        self.assertEqual(list(get_payment_methods_due_on(date(2025, 3, 30))), [])
+
+    def test_invoice_period_crosses_year(self):
+        """
+        Garante que o período da fatura vai do fechamento anterior ao fechamento atual.
+        """
+        self.assertEqual(get_invoice_period(self.card_10, date(2025, 1, 10)), (date(2024, 12, 3), date(2025, 1, 3)))
+
+    def test_reminder_uses_open_invoice_amount(self):
+        """
+        Garante que o lembrete soma apenas as compras do período da fatura.
+        """
+        in_period = Expense.objects.create(user=self.user, amount=Decimal('120.00'), description="mercado", payment_method=self.card_10)
+        after_closing = Expense.objects.create(user=self.user, amount=Decimal('50.00'), description="cinema", payment_method=self.card_10)
+        other_method = Expense.objects.create(user=self.user, amount=Decimal('80.00'), description="padaria", payment_method=self.debit)
+        Expense.objects.filter(pk__in=[in_period.pk, other_method.pk]).update(transaction_date=timezone.make_aware(datetime(2025, 2, 15, 12)))
+        Expense.objects.filter(pk=after_closing.pk).update(transaction_date=timezone.make_aware(datetime(2025, 3, 5, 12)))
+
+        reminders = build_bill_reminders(days_ahead=3, today=date(2025, 3, 7))
+
+        self.assertEqual(len(reminders), 1)
+        user_id, text = reminders[0]
+        self.assertEqual(user_id, self.user.id)
+        self.assertIn("Crédito", text)
+        self.assertIn("R$ 120.00", text)
+
+    @override_settings(BILL_REMINDER_BATCH_SIZE=2, BILL_REMINDER_BATCH_INTERVAL_SECONDS=30)
+    def test_reminders_are_queued_in_throttled_batches(self):
+        """
+        Garante que os envios são enfileirados em lotes com intervalo crescente.
+        """
+        reminders = [(f"user-{i}", f"lembrete {i}") for i in range(5)]
+        with mock.patch('payments.tasks.build_bill_reminders', return_value=reminders), \
+             mock.patch('payments.tasks.send_text_message.apply_async') as apply_async:
+            send_bill_reminders()
+
+        countdowns = [call.kwargs['countdown'] for call in apply_async.call_args_list]
+        self.assertEqual(countdowns, [0, 0, 30, 30, 60])
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import RecurringTransaction
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    list_display = ('description', 'user', 'kind', 'amount', 'day_of_month', 'is_active', 'last_materialized_on')
+    search_fields = ('description', 'user__username')
+    list_filter = ('kind', 'is_active')
+    raw_id_fields = ('user', 'category', 'payment_method')
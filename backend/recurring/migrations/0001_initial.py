@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:30
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('expenses', '0005_alter_expense_transaction_date'),
+        ('payments', '0003_paymentmethod_due_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTransaction',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('DESPESA', 'Despesa'), ('RENDA', 'Renda')], default='DESPESA', max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('description', models.CharField(max_length=255)),
+                ('day_of_month', models.PositiveIntegerField(help_text='Dia do mês em que o lançamento acontece (1-31)', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)])),
+                ('income_type', models.CharField(default='FIXA', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_materialized_on', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_transactions', to='expenses.category')),
+                ('payment_method', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_transactions', to='payments.paymentmethod')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day_of_month'],
+                'indexes': [models.Index(fields=['is_active', 'day_of_month'], name='recurring_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+import uuid
+from django.db import models
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+from payments.models import PaymentMethod
+
+class RecurringTransaction(models.Model):
+    """
+    Modelo de lançamento recorrente (despesa ou renda) que se repete todo mês no mesmo dia.
+    Os lançamentos reais são criados em lote pela tarefa diária de materialização.
+    """
+    KIND_CHOICES = [
+        ('DESPESA', 'Despesa'),
+        ('RENDA', 'Renda'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recurring_transactions')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='DESPESA')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.CharField(max_length=255)
+    day_of_month = models.PositiveIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(31)],
+        help_text="Dia do mês em que o lançamento acontece (1-31)"
+    )
+
+    # Campos usados apenas pelas despesas
+    category = models.ForeignKey('expenses.Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_transactions')
+    payment_method = models.ForeignKey(PaymentMethod, on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_transactions')
+    # Campo usado apenas pelas rendas
+    income_type = models.CharField(max_length=10, default='FIXA')
+
+    is_active = models.BooleanField(default=True)
+    # Data do último lançamento gerado; garante no máximo um lançamento por mês.
+    last_materialized_on = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'day_of_month'], name='recurring_due_idx'),
+        ]
+        ordering = ['day_of_month']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} recorrente: R${self.amount} - {self.description} (dia {self.day_of_month})"
@@ -0,0 +1,190 @@
+import calendar
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+from users.services import bump_data_version
+from expenses.models import Category, Expense
+from incomes.models import Income
+from payments.models import PaymentMethod
+from payments.services import get_effective_due_date
+from summaries.rollups import apply_bulk_expense_deltas
+from summaries.services import invalidate_monthly_summaries
+from .models import RecurringTransaction
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de modelos recorrentes materializados por transação.
+MATERIALIZATION_CHUNK_SIZE = 500
+
+def create_recurring_from_ai_plan(user: User, ai_plan: dict) -> Optional[RecurringTransaction]:
+    """
+    Cria um lançamento recorrente (ex: "aluguel 1500 todo dia 5") a partir do plano da IA.
+    Se o dia já passou neste mês, o primeiro lançamento fica para o mês seguinte.
+    """
+    description = ai_plan.get("description")
+    try:
+        amount = Decimal(str(ai_plan.get("amount")))
+        day_of_month = int(ai_plan.get("day_of_month"))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+    if not description or amount <= 0 or not 1 <= day_of_month <= 31:
+        return None
+
+    kind = 'RENDA' if str(ai_plan.get("kind", "")).upper() == 'RENDA' else 'DESPESA'
+    recurring = RecurringTransaction(user=user, kind=kind, amount=amount, description=description, day_of_month=day_of_month)
+
+    if kind == 'DESPESA':
+        category_name = (ai_plan.get("category") or "Outros").capitalize()
+        recurring.category, _ = Category.objects.get_or_create(user=user, name__iexact=category_name, defaults={'name': category_name})
+        payment_method_name = ai_plan.get("payment_method")
+        if payment_method_name:
+            recurring.payment_method, _ = PaymentMethod.objects.get_or_create(user=user, name=payment_method_name.capitalize())
+        else:
+            recurring.payment_method = user.default_payment_method
+    else:
+        income_type = str(ai_plan.get("income_type") or "FIXA").upper()
+        recurring.income_type = income_type if income_type in ['FIXA', 'VARIAVEL'] else 'FIXA'
+
+    today = timezone.localdate()
+    if get_effective_due_date(today.year, today.month, day_of_month) < today:
+        recurring.last_materialized_on = today
+
+    recurring.save()
+    logger.info(f"Recurring {kind.lower()} '{description}' created for user {user.id} on day {day_of_month}.")
+    return recurring
+
+def get_next_occurrence(recurring: RecurringTransaction, today: Optional[date] = None) -> date:
+    """
+    Retorna a data do próximo lançamento de um modelo recorrente.
+    """
+    today = today or timezone.localdate()
+    this_month = get_effective_due_date(today.year, today.month, recurring.day_of_month)
+    already_done = recurring.last_materialized_on and recurring.last_materialized_on >= today.replace(day=1)
+    if this_month >= today and not already_done:
+        return this_month
+    year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+    return get_effective_due_date(year, month, recurring.day_of_month)
+
+def materialize_due_occurrences(today: Optional[date] = None, chunk_size: int = MATERIALIZATION_CHUNK_SIZE) -> int:
+    """
+    Gera os lançamentos do mês de todos os modelos recorrentes que já venceram, para todos os usuários.
+    É idempotente por mês: cada modelo gera no máximo um lançamento por período, mesmo se a tarefa rodar
+    mais de uma vez. Se a tarefa ficar dias sem rodar (inclusive na virada do mês), a próxima execução
+    gera também os lançamentos dos meses que ficaram para trás. Retorna o número de lançamentos criados.
+    """
+    today = today or timezone.localdate()
+    pending_ids = list(
+        RecurringTransaction.objects
+        .filter(_pending_filter(today))
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+    created = 0
+    for start in range(0, len(pending_ids), chunk_size):
+        created += _materialize_chunk(pending_ids[start:start + chunk_size], today)
+
+    logger.info(f"{created} recurring transactions materialized for {today}.")
+    return created
+
+def _pending_filter(today: date) -> Q:
+    """
+    Pré-seleciona, pelo índice, os modelos que podem ter lançamentos pendentes até `today`:
+    os que vencem neste mês e ainda não foram gerados, e os que têm meses anteriores em atraso.
+    As datas exatas são calculadas por `_due_dates`.
+    """
+    period_start = today.replace(day=1)
+    previous_period_start = (period_start - timedelta(days=1)).replace(day=1)
+    last_day = calendar.monthrange(today.year, today.month)[1]
+    # No último dia do mês, vencem também os dias que o mês não tem (29, 30, 31).
+    due_until_day = 31 if today.day == last_day else today.day
+
+    not_done_this_period = Q(last_materialized_on__isnull=True) | Q(last_materialized_on__lt=period_start)
+    overdue = (
+        Q(last_materialized_on__lt=previous_period_start)
+        | Q(last_materialized_on__isnull=True, created_at__lt=timezone.make_aware(datetime.combine(period_start, time.min)))
+    )
+    return Q(is_active=True) & not_done_this_period & (Q(day_of_month__lte=due_until_day) | overdue)
+
+def _due_dates(template: RecurringTransaction, today: date) -> list[date]:
+    """
+    Retorna as datas dos lançamentos ainda não gerados de um modelo, do mês seguinte ao último gerado até `today`.
+    Modelos que nunca geraram lançamento começam no mês em que foram criados (ou no atual, se for anterior).
+    """
+    if template.last_materialized_on:
+        last = template.last_materialized_on
+        year, month = (last.year + 1, 1) if last.month == 12 else (last.year, last.month + 1)
+    else:
+        created_on = timezone.localdate(template.created_at) if template.created_at else today
+        year, month = min((created_on.year, created_on.month), (today.year, today.month))
+
+    due_dates = []
+    while (year, month) <= (today.year, today.month):
+        due_date = get_effective_due_date(year, month, template.day_of_month)
+        if due_date <= today:
+            due_dates.append(due_date)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return due_dates
+
+def _materialize_chunk(recurring_ids: list, today: date) -> int:
+    """
+    Materializa um lote de modelos em uma única transação: insere despesas e rendas com `bulk_create`,
+    marca o último período gerado, atualiza os rollups e invalida os resumos afetados.
+    """
+    with transaction.atomic():
+        # Relê os modelos com trava, ignorando os que outra execução já processou.
+        templates = list(
+            RecurringTransaction.objects
+            .select_for_update(skip_locked=True)
+            .filter(pk__in=recurring_ids)
+            .filter(_pending_filter(today))
+        )
+
+        expenses, incomes = [], []
+        materialized: list[RecurringTransaction] = []
+        affected_periods: dict[tuple[int, int], set] = {}
+        for template in templates:
+            due_dates = _due_dates(template, today)
+            if not due_dates:
+                continue
+            for due_date in due_dates:
+                # Meio-dia local, para que o lançamento caia no dia certo em qualquer conversão de fuso.
+                transaction_date = timezone.make_aware(datetime.combine(due_date, time(hour=12)))
+                if template.kind == 'RENDA':
+                    incomes.append(Income(
+                        user_id=template.user_id, amount=template.amount, description=template.description,
+                        income_type=template.income_type, transaction_date=transaction_date,
+                    ))
+                else:
+                    expenses.append(Expense(
+                        user_id=template.user_id, amount=template.amount, description=template.description,
+                        category_id=template.category_id, payment_method_id=template.payment_method_id,
+                        transaction_date=transaction_date,
+                    ))
+                affected_periods.setdefault((due_date.year, due_date.month), set()).add(template.user_id)
+            template.last_materialized_on = due_dates[-1]
+            materialized.append(template)
+
+        if not materialized:
+            return 0
+
+        Expense.objects.bulk_create(expenses)
+        Income.objects.bulk_create(incomes)
+        RecurringTransaction.objects.bulk_update(materialized, ['last_materialized_on'])
+        apply_bulk_expense_deltas(expenses)
+
+        for (year, month), user_ids in affected_periods.items():
+            invalidate_monthly_summaries(user_ids, year, month)
+        affected_user_ids = {template.user_id for template in materialized}
+        # `bulk_create` não dispara sinais; a versão dos dados é atualizada manualmente após o commit.
+        transaction.on_commit(lambda: [bump_data_version(user_id) for user_id in affected_user_ids])
+
+    return len(expenses) + len(incomes)
@@ -0,0 +1,9 @@
+from celery import shared_task
+from .services import materialize_due_occurrences
+
+@shared_task
+def materialize_recurring_transactions():
+    """
+    Tarefa diária que gera, para todos os usuários, os lançamentos recorrentes que venceram no mês.
+    """
+    return materialize_due_occurrences()
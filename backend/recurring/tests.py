@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from users.models import User
+from expenses.models import Category, Expense
+from incomes.models import Income
+from summaries.models import CategoryMonthlyRollup, MonthlySummary
+from .models import RecurringTransaction
+from .services import materialize_due_occurrences
+
+
+class RecurringMaterializationTests(TestCase):
+    """
+    Suite de testes para a geração em lote dos lançamentos recorrentes.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='recurringuser', phone_number='5511900000005')
+        self.housing = Category.objects.create(user=self.user, name="Moradia")
+        self.rent = RecurringTransaction.objects.create(
+            user=self.user, kind='DESPESA', amount=Decimal('1500.00'), description="aluguel",
+            day_of_month=5, category=self.housing
+        )
+        self.salary = RecurringTransaction.objects.create(
+            user=self.user, kind='RENDA', amount=Decimal('5000.00'), description="salário", day_of_month=31
+        )
+
+    def test_materializes_once_per_period(self):
+        """
+        Garante que cada modelo gera um único lançamento por mês, mesmo com execuções repetidas.
+        """
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 3, 6)), 1)
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 3, 7)), 0)
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 4, 5)), 1)
+
+        rents = Expense.objects.filter(user=self.user).order_by('transaction_date')
+        self.assertEqual([expense.transaction_date.date() for expense in rents], [date(2025, 3, 5), date(2025, 4, 5)])
+
+    def test_day_31_materializes_on_last_day_of_short_month(self):
+        """
+        Garante que o dia 31 vence no último dia de meses mais curtos.
+        """
+        materialize_due_occurrences(today=date(2025, 2, 27))
+        self.assertFalse(Income.objects.exists())
+
+        materialize_due_occurrences(today=date(2025, 2, 28))
+        self.assertEqual(Income.objects.get().transaction_date.date(), date(2025, 2, 28))
+
+    def test_missed_month_end_run_is_caught_up(self):
+        """
+        Garante que, se a tarefa não rodar nos últimos dias do mês, a execução seguinte gera os lançamentos
+        que ficaram para trás (inclusive de meses inteiros), uma única vez.
+        """
+        RecurringTransaction.objects.update(last_materialized_on=date(2025, 1, 31))
+        MonthlySummary.objects.create(user=self.user, month=2, year=2025, summary_text="antigo", insights_text="")
+
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 3, 1)), 2)
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 3, 2)), 0)
+        self.assertEqual(materialize_due_occurrences(today=date(2025, 4, 1)), 2)
+
+        self.assertEqual(
+            [income.transaction_date.date() for income in Income.objects.order_by('transaction_date')],
+            [date(2025, 2, 28), date(2025, 3, 31)],
+        )
+        self.assertEqual(
+            [expense.transaction_date.date() for expense in Expense.objects.order_by('transaction_date')],
+            [date(2025, 2, 5), date(2025, 3, 5)],
+        )
+        self.assertFalse(MonthlySummary.objects.filter(user=self.user, month=2, year=2025).exists())
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.last_materialized_on, date(2025, 3, 5))
+
+    def test_updates_rollups_and_invalidates_summary(self):
+        """
+        Garante que a inserção em lote atualiza os rollups e descarta o resumo do mês em cache.
+        """
+        MonthlySummary.objects.create(user=self.user, month=3, year=2025, summary_text="antigo", insights_text="")
+
+        materialize_due_occurrences(today=date(2025, 3, 10))
+
+        rollup = CategoryMonthlyRollup.objects.get(user=self.user, category=self.housing, year=2025, month=3)
+        self.assertEqual((rollup.total, rollup.expense_count), (Decimal('1500.00'), 1))
+        self.assertFalse(MonthlySummary.objects.filter(user=self.user, month=3, year=2025).exists())
@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import MonthlySummary
+from .models import MonthlySummary, CategoryMonthlyRollup
 
 @admin.register(MonthlySummary)
 class MonthlySummaryAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'total_income', 'total_expenses', 'balance', 'generated_at')
-    list_filter = ('user', 'year', 'month')
\ No newline at end of file
+    list_filter = ('user', 'year', 'month')
+
+@admin.register(CategoryMonthlyRollup)
+class CategoryMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'category', 'month', 'year', 'total', 'expense_count', 'updated_at')
+    list_filter = ('year', 'month')
+    raw_id_fields = ('user', 'category')
@@ -0,0 +1,187 @@
+import calendar
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from expenses.models import Expense
+from incomes.models import Income
+from .models import CategoryMonthlyRollup
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de meses anteriores usados como histórico para detectar anomalias por categoria.
+HISTORY_MONTHS = 6
+# Mínimo de meses com gasto na categoria para que o z-score seja considerado.
+MIN_HISTORY_MONTHS = 3
+# Z-score a partir do qual o gasto projetado de uma categoria é considerado fora do padrão.
+ANOMALY_Z_THRESHOLD = 2.0
+# Janela (em dias) usada para a taxa de consumo recente.
+BURN_RATE_WINDOW_DAYS = 7
+
+
+def compute_spending_analytics(user_ids: Iterable, today: Optional[date] = None) -> dict:
+    """
+    Calcula, em lote e de forma vetorizada, os indicadores do mês corrente para vários usuários:
+    taxa de consumo diária, projeção de gasto até o fim do mês, saldo projetado e anomalias por categoria.
+
+    Todas as séries são carregadas com um número fixo de consultas, independentemente da quantidade
+    de usuários. Retorna um dicionário {user_id: indicadores}, pronto para entrar no `insights_data`.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    today = today or timezone.localdate()
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    elapsed_days = today.day
+    user_index = {user_id: position for position, user_id in enumerate(user_ids)}
+
+    daily = _load_daily_series(user_ids, user_index, today, days_in_month)
+    incomes = _load_month_incomes(user_ids, user_index, today)
+
+    spent = daily[:, :elapsed_days].sum(axis=1)
+    window_start = max(0, elapsed_days - BURN_RATE_WINDOW_DAYS)
+    burn_rate = daily[:, window_start:elapsed_days].mean(axis=1)
+    projected_total = spent + burn_rate * (days_in_month - elapsed_days)
+    projected_balance = incomes - projected_total
+
+    anomalies = _detect_category_anomalies(user_ids, user_index, today, elapsed_days / days_in_month)
+
+    results = {}
+    for user_id, position in user_index.items():
+        results[user_id] = {
+            "daily_burn_rate": f"{burn_rate[position]:.2f}",
+            "projected_month_expenses": f"{projected_total[position]:.2f}",
+            "projected_balance": f"{projected_balance[position]:.2f}",
+            "category_anomalies": anomalies.get(user_id, []),
+        }
+
+    logger.info(f"Spending analytics computed for {len(user_ids)} users.")
+    return results
+
+
+def _load_daily_series(user_ids: list, user_index: dict, today: date, days_in_month: int) -> np.ndarray:
+    """
+    Carrega os gastos diários do mês de todos os usuários em uma única consulta agregada,
+    devolvendo uma matriz (usuários x dias do mês).
+    """
+    month_start, next_month_start = _month_bounds(today)
+    rows = (
+        Expense.objects
+        # Sem o limite superior, despesas agendadas para os meses seguintes cairiam nos dias deste mês.
+        .filter(user_id__in=user_ids, transaction_date__gte=month_start, transaction_date__lt=next_month_start)
+        .annotate(day=TruncDay('transaction_date'))
+        .values_list('user_id', 'day')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    daily = np.zeros((len(user_ids), days_in_month))
+    for user_id, day, total in rows:
+        day_of_month = timezone.localtime(day).day if timezone.is_aware(day) else day.day
+        daily[user_index[user_id], day_of_month - 1] += float(total)
+    return daily
+
+
+def _load_month_incomes(user_ids: list, user_index: dict, today: date) -> np.ndarray:
+    """
+    Carrega o total de rendas do mês de todos os usuários em uma única consulta.
+    """
+    month_start, next_month_start = _month_bounds(today)
+    rows = (
+        Income.objects
+        .filter(user_id__in=user_ids, transaction_date__gte=month_start, transaction_date__lt=next_month_start)
+        .values_list('user_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    incomes = np.zeros(len(user_ids))
+    for user_id, total in rows:
+        incomes[user_index[user_id]] = float(total)
+    return incomes
+
+
+def _detect_category_anomalies(user_ids: list, user_index: dict, today: date, month_fraction: float) -> dict:
+    """
+    Compara o gasto projetado do mês em cada categoria com o histórico dos meses anteriores (z-score).
+    Usa os rollups mensais, então o custo depende do número de pares (usuário, categoria), não de despesas.
+    """
+    periods = _previous_periods(today, HISTORY_MONTHS)
+    first_year, first_month = periods[0]
+    rows = (
+        CategoryMonthlyRollup.objects
+        .filter(Q(year__gt=first_year) | Q(year=first_year, month__gte=first_month), user_id__in=user_ids)
+        .values_list('user_id', 'category__name', 'year', 'month', 'total')
+    )
+
+    period_index = {period: position for position, period in enumerate(periods)}
+    current_column = len(periods)
+    pair_index: dict[tuple, int] = {}
+    cells = []
+    for user_id, category_name, year, month, total in rows:
+        column = current_column if (year, month) == (today.year, today.month) else period_index.get((year, month))
+        if column is None:
+            continue
+        pair = (user_id, category_name or "Sem Categoria")
+        row = pair_index.setdefault(pair, len(pair_index))
+        cells.append((row, column, float(total)))
+
+    if not cells:
+        return {}
+
+    matrix = np.zeros((len(pair_index), current_column + 1))
+    for row, column, total in cells:
+        matrix[row, column] += total
+
+    history = matrix[:, :current_column]
+    projected_current = matrix[:, current_column] / max(month_fraction, 1 / 31)
+    mean = history.mean(axis=1)
+    std = history.std(axis=1)
+    active_months = np.count_nonzero(history, axis=1)
+
+    valid = (std > 0) & (active_months >= MIN_HISTORY_MONTHS)
+    z_scores = np.zeros_like(mean)
+    np.divide(projected_current - mean, std, out=z_scores, where=valid)
+
+    anomalies: dict = {}
+    for (user_id, category_name), row in pair_index.items():
+        if not valid[row] or abs(z_scores[row]) < ANOMALY_Z_THRESHOLD:
+            continue
+        anomalies.setdefault(user_id, []).append({
+            "name": category_name,
+            "projected": f"{projected_current[row]:.2f}",
+            "historical_average": f"{mean[row]:.2f}",
+            "z_score": round(float(z_scores[row]), 1),
+        })
+    return anomalies
+
+
+def _previous_periods(today: date, months: int) -> list[tuple[int, int]]:
+    """
+    Lista os pares (ano, mês) dos `months` meses anteriores ao atual, do mais antigo para o mais recente.
+    """
+    periods = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        periods.append((year, month))
+    return list(reversed(periods))
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _month_bounds(today: date) -> tuple[datetime, datetime]:
+    """
+    Retorna o início do mês de `today` e o do mês seguinte, à meia-noite local.
+    """
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+    return _local_midnight(month_start), _local_midnight(next_month_start)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SummariesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'summaries'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from summaries.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """
+    Recalcula os totais mensais por categoria a partir do histórico completo de despesas.
+    Deve ser executado uma vez após a implantação dos rollups, ou para corrigir divergências.
+    """
+    help = "Recalcula os rollups mensais de despesas por categoria lendo o histórico uma única vez."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='user_ids', help="ID de um usuário específico (pode repetir).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Quantidade de linhas lidas por vez do banco.")
+
+    def handle(self, *args, **options):
+        start_time = time.monotonic()
+        written = rebuild_rollups(user_ids=options['user_ids'], chunk_size=options['chunk_size'])
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(f"{written} rollups gravados em {elapsed:.1f}s."))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_uuid7_primary_key'),
+        ('summaries', '0003_category_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='categorymonthlyrollup',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='monthly_rollups', to='expenses.category'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_uncategorized_rollups(apps, schema_editor):
+    """
+    Junta as linhas "sem categoria" duplicadas de um mesmo mês antes de criar a restrição.
+    """
+    CategoryMonthlyRollup = apps.get_model('summaries', 'CategoryMonthlyRollup')
+    duplicates = (
+        CategoryMonthlyRollup.objects.filter(category__isnull=True)
+        .values('user_id', 'year', 'month')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        rollups = CategoryMonthlyRollup.objects.filter(
+            category__isnull=True, user_id=group['user_id'], year=group['year'], month=group['month'],
+        )
+        totals = rollups.aggregate(total=Sum('total'), expense_count=Sum('expense_count'))
+        keep = rollups.order_by('id').first()
+        rollups.exclude(pk=keep.pk).delete()
+        CategoryMonthlyRollup.objects.filter(pk=keep.pk).update(total=totals['total'], expense_count=totals['expense_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_external_id'),
+        ('summaries', '0004_rollup_category_set_null'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_uncategorized_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='categorymonthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'year', 'month'), name='summaries_rollup_uncategorized_uniq'),
+        ),
+    ]
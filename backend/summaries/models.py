@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.db.models import Q
 
 class MonthlySummary(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -25,4 +26,37 @@ class MonthlySummary(models.Model):
         ordering = ['-year', '-month']
 
     def __str__(self):
-        return f"Resumo para {self.user.username} - {self.month}/{self.year}"
\ No newline at end of file
+        return f"Resumo para {self.user.username} - {self.month}/{self.year}"
+
+class CategoryMonthlyRollup(models.Model):
+    """
+    Total de despesas pré-calculado por usuário, categoria e mês.
+    Mantido de forma incremental a cada escrita de despesa, permite montar relatórios
+    de tendência sem varrer as despesas brutas.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='category_rollups')
+    category = models.ForeignKey('expenses.Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='monthly_rollups')
+    month = models.PositiveIntegerField()
+    year = models.PositiveIntegerField()
+
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    expense_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'category', 'year', 'month') # Uma linha por categoria e mês
+        constraints = [
+            # NULLs não conflitam no unique_together: sem esta restrição, duas escritas concorrentes
+            # criariam duas linhas "sem categoria" no mesmo mês.
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month'], condition=Q(category__isnull=True), name='summaries_rollup_uncategorized_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'year', 'month'], name='summaries_rollup_user_period'),
+        ]
+        ordering = ['-year', '-month']
+
+    def __str__(self):
+        return f"Rollup {self.category_id} - {self.month}/{self.year}: R${self.total}"
@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from expenses.models import Expense
+from .models import CategoryMonthlyRollup
+
+logger = logging.getLogger(__name__)
+
+
+def get_period(when: datetime) -> tuple[int, int]:
+    """
+    Retorna o par (ano, mês) de uma data no fuso horário local do projeto.
+    É o mesmo critério usado pelos filtros `transaction_date__month` das consultas.
+    """
+    local_when = timezone.localtime(when)
+    return local_when.year, local_when.month
+
+
+def apply_expense_delta(user_id, category_id, when: datetime, amount: Decimal, count: int = 1, return_total: bool = False) -> Optional[Decimal]:
+    """
+    Aplica um incremento (ou decremento) ao total pré-calculado de uma categoria no mês de `when`.
+    A linha é criada na primeira despesa do mês; as seguintes fazem apenas um UPDATE atômico.
+    Com `return_total=True`, retorna o total do mês já atualizado (uma leitura extra pela chave única).
+    """
+    year, month = get_period(when)
+    lookup = {'user_id': user_id, 'category_id': category_id, 'year': year, 'month': month}
+    rollups = CategoryMonthlyRollup.objects.filter(**lookup)
+
+    if not rollups.update(total=F('total') + amount, expense_count=F('expense_count') + count):
+        try:
+            with transaction.atomic():
+                CategoryMonthlyRollup.objects.create(total=amount, expense_count=max(count, 0), **lookup)
+            return amount if return_total else None
+        except IntegrityError:
+            # Outra escrita concorrente criou a linha primeiro; aplica o incremento sobre ela.
+            rollups.update(total=F('total') + amount, expense_count=F('expense_count') + count)
+
+    if return_total:
+        return rollups.values_list('total', flat=True).first()
+    return None
+
+
+def apply_bulk_expense_deltas(expenses: Iterable[Expense]) -> None:
+    """
+    Atualiza os rollups após uma inserção em lote (`bulk_create`), que não passa pelos serviços unitários.
+    As despesas são agrupadas por (usuário, categoria, mês), gerando um único UPDATE por grupo.
+    """
+    grouped: dict[tuple, list] = {}
+    for expense in expenses:
+        key = (expense.user_id, expense.category_id, *get_period(expense.transaction_date))
+        group = grouped.setdefault(key, [Decimal('0.00'), 0, expense.transaction_date])
+        group[0] += expense.amount
+        group[1] += 1
+
+    for (user_id, category_id, _, _), (amount, count, when) in grouped.items():
+        apply_expense_delta(user_id, category_id, when, amount, count=count)
+
+
+def move_expense_between_categories(expense: Expense, old_category_id, new_category_id) -> None:
+    """
+    Transfere o valor de uma despesa do total da categoria antiga para o da nova.
+    """
+    if old_category_id == new_category_id:
+        return
+    apply_expense_delta(expense.user_id, old_category_id, expense.transaction_date, -expense.amount, count=-1)
+    apply_expense_delta(expense.user_id, new_category_id, expense.transaction_date, expense.amount, count=1)
+
+
+def merge_category_rollups(user_id, from_category_id, to_category_id) -> None:
+    """
+    Soma todos os totais mensais de uma categoria nos da categoria de destino e remove os de origem.
+    Usado quando as despesas de uma categoria apagada são movidas em massa para outra.
+    """
+    source_rollups = CategoryMonthlyRollup.objects.filter(user_id=user_id, category_id=from_category_id)
+    for rollup in source_rollups:
+        when = timezone.make_aware(datetime(rollup.year, rollup.month, 1))
+        apply_expense_delta(user_id, to_category_id, when, rollup.total, count=rollup.expense_count)
+    source_rollups.delete()
+
+
+def rebuild_rollups(user_ids: Optional[Iterable] = None, chunk_size: int = 2000) -> int:
+    """
+    Recalcula os totais mensais a partir das despesas brutas, lendo o histórico uma única vez.
+    A agregação por mês é feita no banco e o resultado é consumido em streaming, um usuário por vez.
+    Retorna o número de linhas de rollup gravadas.
+    """
+    expenses = Expense.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        expenses = expenses.filter(user_id__in=user_ids)
+
+    rows = (
+        expenses
+        .annotate(period=TruncMonth('transaction_date'))
+        .values('user_id', 'category_id', 'period')
+        .annotate(total=Sum('amount'), expense_count=Count('id'))
+        .order_by('user_id', 'period', 'category_id')
+    )
+
+    written = 0
+    current_user_id = None
+    pending: list[CategoryMonthlyRollup] = []
+
+    for row in rows.iterator(chunk_size=chunk_size):
+        if row['user_id'] != current_user_id:
+            written += _replace_user_rollups(current_user_id, pending)
+            current_user_id, pending = row['user_id'], []
+
+        period = timezone.localtime(row['period']) if timezone.is_aware(row['period']) else row['period']
+        pending.append(CategoryMonthlyRollup(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            year=period.year,
+            month=period.month,
+            total=row['total'],
+            expense_count=row['expense_count'],
+        ))
+    written += _replace_user_rollups(current_user_id, pending)
+
+    # Remove os totais de usuários que não têm mais nenhuma despesa.
+    orphans = CategoryMonthlyRollup.objects.filter(
+        ~Exists(Expense.objects.filter(user_id=OuterRef('user_id')))
+    )
+    if user_ids is not None:
+        orphans = orphans.filter(user_id__in=user_ids)
+    orphans.delete()
+
+    logger.info(f"Rebuilt {written} monthly category rollups.")
+    return written
+
+
+def _replace_user_rollups(user_id, rollups: list[CategoryMonthlyRollup]) -> int:
+    """
+    Substitui, dentro de uma transação, todos os totais mensais de um usuário.
+    """
+    if user_id is None:
+        return 0
+    with transaction.atomic():
+        CategoryMonthlyRollup.objects.filter(user_id=user_id).delete()
+        CategoryMonthlyRollup.objects.bulk_create(rollups)
+    return len(rollups)
@@ -1,19 +1,31 @@
 import logging
 from decimal import Decimal
+from typing import Optional
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Q, Sum
 
 from users.models import User
+from users.services import get_or_set_user_cache
 from expenses.models import Expense
 from incomes.models import Income
 from ai.services import AIService
-from .models import MonthlySummary
+from .models import MonthlySummary, CategoryMonthlyRollup
+from .analytics import compute_spending_analytics
 
 logger = logging.getLogger(__name__)
 
-def generate_or_get_monthly_summary(user: User, force_regenerate: bool = False) -> MonthlySummary:
+# Janela padrão e máxima (em meses) dos relatórios de tendência.
+DEFAULT_TREND_MONTHS = 6
+MAX_TREND_MONTHS = 12
+
+# Tempo máximo que o texto do resumo mensal fica em cache; escritas do usuário o invalidam antes disso.
+SUMMARY_TEXT_CACHE_TIMEOUT = 60 * 60
+
+def generate_or_get_monthly_summary(user: User, force_regenerate: bool = False, analytics: Optional[dict] = None) -> MonthlySummary:
     """
     Função principal que gera ou busca do cache um resumo mensal para o usuário.
+    `analytics` recebe os indicadores já calculados em lote (ver `summaries.analytics`); se omitido,
+    eles são calculados apenas para este usuário.
     """
     now = timezone.now()
     month, year = now.month, now.year
@@ -50,7 +62,8 @@ def generate_or_get_monthly_summary(user: User, force_regenerate: bool = False)
         "payment_methods": [
             {"name": item['payment_method__name'], "total": f"{item['total']:.2f}"}
             for item in summary_by_payment
-        ]
+        ],
+        "analytics": analytics if analytics is not None else compute_spending_analytics([user.id]).get(user.id, {}),
     }
     insights_text = ai_service.generate_insight(insights_data) # (Precisaremos criar este método na AIService)
 
@@ -70,6 +83,27 @@ def generate_or_get_monthly_summary(user: User, force_regenerate: bool = False)
     )
     return summary_obj
 
+def get_monthly_summary_text(user: User) -> str:
+    """
+    Retorna o texto do resumo do mês corrente. Pedidos repetidos sem novas movimentações
+    são atendidos pelo cache, sem consultas ao banco nem chamadas à IA.
+    """
+    now = timezone.now()
+    return get_or_set_user_cache(
+        user.id, f"monthly-summary:{now.year}-{now.month}",
+        lambda: generate_or_get_monthly_summary(user).summary_text, SUMMARY_TEXT_CACHE_TIMEOUT
+    )
+
+def invalidate_monthly_summaries(user_ids, year: int, month: int) -> int:
+    """
+    Descarta os resumos em cache de um mês para os usuários informados, forçando a regeneração na próxima consulta.
+    Necessário após escritas em lote, cujas datas podem ser anteriores ao `generated_at` do resumo.
+    """
+    deleted, _ = MonthlySummary.objects.filter(user_id__in=user_ids, year=year, month=month).delete()
+    if deleted:
+        logger.info(f"{deleted} resumos de {month}/{year} invalidados após escrita em lote.")
+    return deleted
+
 def _format_summary_message(month_name: str, data: dict, insights: str) -> str:
     """
     Formata os dados calculados e os insights da IA em uma única string para o WhatsApp.
@@ -115,4 +149,92 @@ def _format_summary_message(month_name: str, data: dict, insights: str) -> str:
         response_lines.append(f"\n💡 *Análise do Fin:*")
         response_lines.append(f"_{insights}_")
 
-    return "\n".join(response_lines)
\ No newline at end of file
+    return "\n".join(response_lines)
+
+def get_spending_trend(user: User, months: int = DEFAULT_TREND_MONTHS) -> dict:
+    """
+    Monta os totais mês a mês, geral e por categoria, dos últimos `months` meses (incluindo o atual).
+    Lê apenas os rollups mensais pré-calculados, então o custo não cresce com o histórico do usuário.
+    """
+    periods = _last_periods(timezone.localtime(), months)
+    (first_year, first_month), (last_year, last_month) = periods[0], periods[-1]
+
+    period_filter = (
+        (Q(year__gt=first_year) | Q(year=first_year, month__gte=first_month)) &
+        (Q(year__lt=last_year) | Q(year=last_year, month__lte=last_month))
+    )
+    rows = (
+        CategoryMonthlyRollup.objects
+        .filter(period_filter, user=user)
+        .values_list('year', 'month', 'category__name', 'total')
+    )
+
+    monthly_totals = {period: Decimal('0.00') for period in periods}
+    by_category: dict[str, dict[tuple[int, int], Decimal]] = {}
+    for year, month, category_name, total in rows:
+        monthly_totals[(year, month)] += total
+        category_totals = by_category.setdefault(category_name or "Sem Categoria", {})
+        category_totals[(year, month)] = category_totals.get((year, month), Decimal('0.00')) + total
+
+    return {
+        "periods": periods,
+        "monthly_totals": [monthly_totals[period] for period in periods],
+        "categories": {
+            name: [totals.get(period, Decimal('0.00')) for period in periods]
+            for name, totals in sorted(by_category.items(), key=lambda item: -sum(item[1].values()))
+        },
+    }
+
+def generate_trend_report(user: User, months=None) -> str:
+    """
+    Gera o texto do relatório de tendência de gastos para o WhatsApp.
+    Aceita o número de meses vindo do plano da IA (pode ser string ou nulo).
+    """
+    try:
+        months = int(months) if months else DEFAULT_TREND_MONTHS
+    except (TypeError, ValueError):
+        months = DEFAULT_TREND_MONTHS
+    months = min(max(months, 2), MAX_TREND_MONTHS)
+
+    trend = get_spending_trend(user, months)
+    logger.info(f"Relatório de tendência de {months} meses gerado para o usuário {user.id}.")
+    return _format_trend_message(trend)
+
+def _last_periods(now, months: int) -> list[tuple[int, int]]:
+    """
+    Lista os pares (ano, mês) dos últimos `months` meses, do mais antigo para o atual.
+    """
+    periods = []
+    year, month = now.year, now.month
+    for _ in range(months):
+        periods.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(periods))
+
+def _format_trend_message(trend: dict) -> str:
+    """
+    Formata os totais mês a mês em uma única string para o WhatsApp.
+    """
+    periods = trend["periods"]
+    response_lines = [f"📈 *Seus Gastos nos Últimos {len(periods)} Meses*\n"]
+
+    previous_total = None
+    for (year, month), total in zip(periods, trend["monthly_totals"]):
+        line = f"• {month:02d}/{year}: R$ {total:.2f}"
+        if previous_total:
+            variation = (total - previous_total) / previous_total * 100
+            arrow = "▲" if variation >= 0 else "▼"
+            line += f" ({arrow} {abs(variation):.1f}%)"
+        response_lines.append(line)
+        previous_total = total
+
+    categories = trend["categories"]
+    if categories:
+        response_lines.append("\n➡️ *Por Categoria (mês a mês):*")
+        for category_name, totals in categories.items():
+            values = " → ".join(f"{total:.0f}" for total in totals)
+            response_lines.append(f"• {category_name}: {values}")
+    else:
+        response_lines.append("\nVocê ainda não tem despesas registradas nesse período.")
+
+    return "\n".join(response_lines)
@@ -0,0 +1,15 @@
+from django.db.models.signals import pre_delete
+
+from .rollups import merge_category_rollups
+
+
+def move_rollups_to_uncategorized(sender, instance, **kwargs):
+    """
+    Ao apagar uma categoria, soma os seus totais mensais aos das despesas sem categoria.
+    As despesas ficam sem categoria (SET_NULL), então os rollups precisam acompanhá-las em vez de sumir.
+    """
+    merge_category_rollups(instance.user_id, instance.id, None)
+
+
+def connect_signals():
+    pre_delete.connect(move_rollups_to_uncategorized, sender='expenses.Category', dispatch_uid='move-rollups-to-uncategorized')
@@ -1,11 +1,44 @@
+import time
+
 from celery import shared_task
+from django.conf import settings
+
+from core.db_routers import use_replica
+from core.profiling import sampled_profile
 from users.models import User
+from .analytics import compute_spending_analytics
 from .services import generate_or_get_monthly_summary
 
-@shared_task
-def generate_monthly_summaries_for_all_users():
+# Quantidade de usuários cujos indicadores são calculados de uma vez.
+ANALYTICS_BATCH_SIZE = 500
+
+@shared_task(bind=True)
+def generate_monthly_summaries_for_all_users(self):
     """
     Tarefa periódica que gera o resumo do mês para todos os usuários ativos.
+    Os usuários são divididos em lotes, cada um gerado por uma tarefa própria na fila 'batch';
+    assim nenhuma tarefa prende um worker pela rodada inteira.
+    """
+    with sampled_profile('summaries', self.request.id):
+        active_user_ids = [str(pk) for pk in User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)]
+        for start in range(0, len(active_user_ids), ANALYTICS_BATCH_SIZE):
+            generate_monthly_summaries_for_users.delay(active_user_ids[start:start + ANALYTICS_BATCH_SIZE])
+
+@shared_task(bind=True)
+def generate_monthly_summaries_for_users(self, user_ids: list):
+    """
+    Gera o resumo do mês para um lote de usuários. Os indicadores de análise são calculados de uma vez
+    para o lote, evitando consultas extras por usuário, e as leituras vão para a réplica, quando houver.
+
+    A tarefa roda por no máximo BATCH_TASK_TIME_SLICE_SECONDS: o que faltar volta para a fila como uma nova
+    tarefa, liberando o worker para o que estiver esperando.
     """
-    for user in User.objects.filter(is_active=True):
-        generate_or_get_monthly_summary(user, force_regenerate=True)
\ No newline at end of file
+    deadline = time.monotonic() + settings.BATCH_TASK_TIME_SLICE_SECONDS
+    with sampled_profile('summaries', self.request.id), use_replica():
+        users = list(User.objects.filter(pk__in=user_ids, is_active=True).order_by('pk'))
+        analytics_by_user = compute_spending_analytics([user.id for user in users])
+        for index, user in enumerate(users):
+            if index and time.monotonic() >= deadline:
+                generate_monthly_summaries_for_users.delay([str(pending.id) for pending in users[index:]])
+                return
+            generate_or_get_monthly_summary(user, force_regenerate=True, analytics=analytics_by_user.get(user.id, {}))
@@ -1,3 +1,222 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.celery import app
+from users.models import User
+from expenses.models import Category, Expense
+from incomes.models import Income
+from expenses.services import create_expense_from_ai_plan, edit_last_expense, delete_last_expense, change_last_expense_category
+from .models import CategoryMonthlyRollup
+from .rollups import apply_expense_delta, rebuild_rollups
+from .analytics import compute_spending_analytics, _previous_periods
+from .services import get_spending_trend
+from .tasks import generate_monthly_summaries_for_all_users, generate_monthly_summaries_for_users
+
+
+class CategoryMonthlyRollupTests(TestCase):
+    """
+    Suite de testes para a manutenção incremental dos totais mensais por categoria.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='rollupuser', phone_number='5511900000001')
+
+    def _rollup_totals(self):
+        return {
+            rollup.category.name: (rollup.total, rollup.expense_count)
+            for rollup in CategoryMonthlyRollup.objects.filter(user=self.user).select_related('category')
+        }
+
+    def test_expense_writes_update_rollup(self):
+        """
+        Garante que criar, editar, recategorizar e apagar despesas mantém o total mensal correto.
+        """
+        create_expense_from_ai_plan(self.user, {"amount": 10, "description": "café", "category": "Alimentação"})
+        create_expense_from_ai_plan(self.user, {"amount": 30, "description": "almoço", "category": "Alimentação"})
+        self.assertEqual(self._rollup_totals(), {"Alimentação": (Decimal('40.00'), 2)})
+
+        edit_last_expense(self.user, {"amount": 35})
+        self.assertEqual(self._rollup_totals(), {"Alimentação": (Decimal('45.00'), 2)})
+
+        change_last_expense_category(self.user, {"category": "Lazer"})
+        self.assertEqual(self._rollup_totals(), {"Alimentação": (Decimal('10.00'), 1), "Lazer": (Decimal('35.00'), 1)})
+
+        delete_last_expense(self.user)
+        self.assertEqual(self._rollup_totals(), {"Alimentação": (Decimal('10.00'), 1), "Lazer": (Decimal('0.00'), 0)})
+
+    def test_concurrent_first_uncategorized_write_reuses_row(self):
+        """
+        Garante que o grupo sem categoria tem uma única linha por mês, mesmo quando outra escrita a cria
+        entre o UPDATE e o INSERT.
+        """
+        when = timezone.make_aware(datetime(2025, 3, 10, 12))
+        apply_expense_delta(self.user.id, None, when, Decimal('10.00'))
+        real_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            # O primeiro UPDATE não encontra a linha, como se ela tivesse sido criada logo em seguida por outra escrita.
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update):
+            apply_expense_delta(self.user.id, None, when, Decimal('5.00'))
+
+        rollups = CategoryMonthlyRollup.objects.filter(user=self.user, category__isnull=True)
+        self.assertEqual(list(rollups.values_list('total', 'expense_count')), [(Decimal('15.00'), 2)])
+
+    def test_deleting_category_keeps_totals_as_uncategorized(self):
+        """
+        Garante que apagar categorias fora do serviço move os totais para o grupo sem categoria, como as despesas.
+        """
+        create_expense_from_ai_plan(self.user, {"amount": 20, "description": "cinema", "category": "Lazer"})
+        create_expense_from_ai_plan(self.user, {"amount": 15, "description": "uber", "category": "Transporte"})
+
+        Category.objects.filter(user=self.user, name__in=["Lazer", "Transporte"]).delete()
+
+        rollups = CategoryMonthlyRollup.objects.filter(user=self.user)
+        self.assertEqual(list(rollups.values_list('category_id', 'total', 'expense_count')), [(None, Decimal('35.00'), 2)])
+        self.assertEqual(Expense.objects.filter(user=self.user, category__isnull=True).count(), 2)
+        self.assertEqual(rebuild_rollups([self.user.id]), 1)
+        self.assertEqual(list(rollups.values_list('category_id', 'total', 'expense_count')), [(None, Decimal('35.00'), 2)])
+
+    def test_rebuild_matches_incremental_totals(self):
+        """
+        Garante que o backfill a partir do histórico produz os mesmos totais da manutenção incremental.
+        """
+        create_expense_from_ai_plan(self.user, {"amount": 12.5, "description": "uber", "category": "Transporte"})
+        create_expense_from_ai_plan(self.user, {"amount": 7.5, "description": "metrô", "category": "Transporte"})
+        incremental = self._rollup_totals()
+
+        CategoryMonthlyRollup.objects.all().delete()
+        written = rebuild_rollups()
+
+        self.assertEqual(written, 1)
+        self.assertEqual(self._rollup_totals(), incremental)
+
+    def test_spending_trend_reads_rollups(self):
+        """
+        Garante que o relatório de tendência usa os rollups e completa os meses sem gastos com zero.
+        """
+        category = Category.objects.create(user=self.user, name="Moradia")
+        Expense.objects.create(user=self.user, category=category, amount=Decimal('1500.00'), description="aluguel")
+        rebuild_rollups()
+
+        with self.assertNumQueries(1):
+            trend = get_spending_trend(self.user, months=3)
+
+        self.assertEqual(len(trend["periods"]), 3)
+        self.assertEqual(trend["monthly_totals"], [Decimal('0.00'), Decimal('0.00'), Decimal('1500.00')])
+        self.assertEqual(trend["categories"], {"Moradia": [Decimal('0.00'), Decimal('0.00'), Decimal('1500.00')]})
+
+
+class SpendingAnalyticsTests(TestCase):
+    """
+    Suite de testes para o cálculo vetorizado de projeções e anomalias.
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.users = [
+            User.objects.create_user(username=f'analyticsuser{i}', phone_number=f'551190000010{i}')
+            for i in range(3)
+        ]
+        self.category = Category.objects.create(user=self.users[0], name="Lazer")
+
+    def test_query_count_does_not_grow_with_users(self):
+        """
+        Garante que os indicadores de vários usuários são carregados com um número fixo de consultas.
+        """
+        with self.assertNumQueries(3):
+            results = compute_spending_analytics([user.id for user in self.users], today=self.today)
+        self.assertEqual(set(results), {user.id for user in self.users})
+
+    def test_projection_and_anomaly(self):
+        """
+        Garante a projeção de fim de mês e a detecção de uma categoria muito acima do histórico.
+        """
+        user = self.users[0]
+        for index, (year, month) in enumerate(_previous_periods(self.today, 6)):
+            CategoryMonthlyRollup.objects.create(
+                user=user, category=self.category, year=year, month=month,
+                total=Decimal('100.00') + index, expense_count=1
+            )
+        create_expense_from_ai_plan(user, {"amount": 3000, "description": "viagem", "category": "Lazer"})
+
+        analytics = compute_spending_analytics([user.id], today=self.today)[user.id]
+
+        self.assertGreaterEqual(Decimal(analytics["projected_month_expenses"]), Decimal('3000.00'))
+        self.assertEqual(Decimal(analytics["projected_balance"]), -Decimal(analytics["projected_month_expenses"]))
+        self.assertEqual([anomaly["name"] for anomaly in analytics["category_anomalies"]], ["Lazer"])
+
+    def test_future_dated_transactions_are_ignored(self):
+        """
+        Garante que lançamentos com data nos meses seguintes não entram na taxa de consumo nem no saldo do mês.
+        """
+        user = self.users[1]
+        today = date(2025, 4, 10)
+        for when in (datetime(2025, 4, 9, 12), datetime(2025, 5, 9, 12), datetime(2025, 5, 31, 12)):
+            Expense.objects.create(user=user, amount=Decimal('70.00'), description="gasto", transaction_date=timezone.make_aware(when))
+        Income.objects.create(user=user, amount=Decimal('500.00'), description="bônus", transaction_date=timezone.make_aware(datetime(2025, 5, 2, 12)))
+
+        analytics = compute_spending_analytics([user.id], today=today)[user.id]
+
+        self.assertEqual(analytics["daily_burn_rate"], "10.00")
+        self.assertEqual(analytics["projected_balance"], f"{-(70 + 10 * 20):.2f}")
+
+
+class MonthlySummaryTaskTests(TestCase):
+    """
+    Suite de testes para a geração dos resumos mensais na fila de lotes.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'batchuser{index}', phone_number=f'55119000001{index:02d}')
+            for index in range(3)
+        ]
+
+    def test_tasks_are_routed_by_queue(self):
+        """
+        Garante que as conversas, os envios ativos e as rotinas em lote vão para filas separadas.
+        """
+        routes = {
+            'meta.tasks.process_webhook_payload': 'interactive',
+            'meta.tasks.send_text_message': 'outbound',
+            'summaries.tasks.generate_monthly_summaries_for_all_users': 'batch',
+            'summaries.tasks.generate_monthly_summaries_for_users': 'batch',
+            'payments.tasks.send_bill_reminders': 'batch',
+        }
+        for task_name, queue_name in routes.items():
+            with self.subTest(task=task_name):
+                self.assertEqual(app.amqp.router.route({}, task_name)['queue'].name, queue_name)
+
+    def test_all_users_task_fans_out_batches(self):
+        """
+        Garante que a tarefa periódica só divide os usuários em lotes, sem gerar os resumos ela mesma.
+        """
+        with mock.patch('summaries.tasks.ANALYTICS_BATCH_SIZE', 2), \
+             mock.patch('summaries.tasks.generate_monthly_summaries_for_users.delay') as delay:
+            generate_monthly_summaries_for_all_users.apply()
+
+        self.assertEqual([len(call.args[0]) for call in delay.call_args_list], [2, 1])
+
+    @override_settings(BATCH_TASK_TIME_SLICE_SECONDS=0)
+    def test_batch_requeues_remaining_users_after_time_slice(self):
+        """
+        Garante que, esgotado o tempo do lote, os usuários restantes voltam para a fila.
+        """
+        user_ids = [str(user.id) for user in self.users]
+        with mock.patch('summaries.tasks.generate_or_get_monthly_summary') as generate, \
+             mock.patch('summaries.tasks.generate_monthly_summaries_for_users.delay') as delay:
+            generate_monthly_summaries_for_users.apply(args=[user_ids])
+
+        self.assertEqual(generate.call_count, 1)
+        delay.assert_called_once()
+        self.assertEqual(len(delay.call_args.args[0]), 2)
 
-# Create your tests here.
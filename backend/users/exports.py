@@ -0,0 +1,112 @@
+import csv
+import json
+from typing import Iterable, Iterator
+
+from core.db_routers import use_replica
+from expenses.models import Expense
+from incomes.models import Income
+from summaries.models import MonthlySummary
+
+# Linhas lidas do banco por vez; a memória usada pela exportação depende apenas deste valor.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPENSE_FIELDS = ('id', 'transaction_date', 'amount', 'description', 'category', 'payment_method')
+INCOME_FIELDS = ('id', 'transaction_date', 'amount', 'description', 'income_type')
+SUMMARY_FIELDS = ('year', 'month', 'total_income', 'total_expenses', 'balance', 'summary_text', 'insights_text', 'generated_at')
+
+
+class _Echo:
+    """
+    Pseudo-buffer para o csv.writer: devolve a linha formatada em vez de guardá-la.
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def _expense_rows(user) -> Iterator[tuple]:
+    expenses = (
+        Expense.objects
+        .filter(user=user)
+        .select_related('category', 'payment_method')
+        .order_by('transaction_date', 'id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for expense in expenses:
+        yield (
+            expense.id, expense.transaction_date.isoformat(), expense.amount, expense.description,
+            expense.category.name if expense.category else "",
+            expense.payment_method.name if expense.payment_method else "",
+        )
+
+
+def _income_rows(user) -> Iterator[tuple]:
+    incomes = (
+        Income.objects
+        .filter(user=user)
+        .order_by('transaction_date', 'id')
+        .values_list('id', 'transaction_date', 'amount', 'description', 'income_type')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for income_id, transaction_date, amount, description, income_type in incomes:
+        yield income_id, transaction_date.isoformat(), amount, description, income_type
+
+
+def _summary_rows(user) -> Iterator[tuple]:
+    summaries = (
+        MonthlySummary.objects
+        .filter(user=user)
+        .order_by('year', 'month')
+        .values_list(*SUMMARY_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for *values, generated_at in summaries:
+        yield (*values, generated_at.isoformat())
+
+
+EXPORT_DATASETS = {
+    'expenses': (EXPENSE_FIELDS, _expense_rows),
+    'incomes': (INCOME_FIELDS, _income_rows),
+    'summaries': (SUMMARY_FIELDS, _summary_rows),
+}
+
+
+def iter_export(user, dataset: str, export_format: str) -> Iterator[str]:
+    """
+    Gera, linha a linha, a exportação de um conjunto de dados do usuário em CSV ou NDJSON.
+    O cabeçalho do CSV é emitido antes da primeira consulta, para que o primeiro byte saia imediatamente.
+    """
+    fields, row_source = EXPORT_DATASETS[dataset]
+    serialize = _iter_csv if export_format == 'csv' else _iter_ndjson
+    # A exportação é só leitura e tolera o atraso da réplica.
+    yield from serialize(fields, _read_from_replica(row_source(user)))
+
+
+def _read_from_replica(rows: Iterator[tuple]) -> Iterator[tuple]:
+    """
+    Avança o iterador de linhas com as leituras marcadas para a réplica, buscando cada lote do banco dentro de
+    `use_replica()`. A marca é desfeita antes de cada `yield`: o gerador pausa no meio da resposta, e a marca
+    vazaria para o código que o consome entre uma linha e outra.
+    """
+    while True:
+        with use_replica():
+            row = next(rows, None)
+        if row is None:
+            return
+        yield row
+
+
+def _iter_csv(fields: tuple, rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _iter_ndjson(fields: tuple, rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=str) + "\n"
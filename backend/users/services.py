@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+
+# Chave de cache que guarda a versão dos dados financeiros de cada usuário.
+DATA_VERSION_CACHE_KEY = "user-data-version:{user_id}"
+
+
+def get_data_version(user_id) -> int:
+    """
+    Retorna a versão atual dos dados financeiros (despesas, rendas, categorias...) do usuário.
+    A versão muda a cada escrita e serve de sufixo para chaves de cache, invalidando-as sem varrer o cache.
+    """
+    key = DATA_VERSION_CACHE_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Sem versão no cache (primeiro acesso ou expulsão): começa uma nova, o que invalida tudo que era anterior.
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_data_version(user_id) -> int:
+    """
+    Gera uma nova versão para os dados do usuário. A versão é um timestamp em nanossegundos,
+    então também indica quando os dados foram alterados pela última vez.
+    """
+    version = time.time_ns()
+    cache.set(DATA_VERSION_CACHE_KEY.format(user_id=user_id), version, timeout=None)
+    return version
+
+
+# Cache de valores derivados dos dados do usuário (respostas formatadas, resumos...).
+USER_CACHE_KEY = "user-cache:{user_id}:{version}:{name}"
+
+
+def get_or_set_user_cache(user_id, name: str, builder, timeout: int):
+    """
+    Busca no cache um valor derivado dos dados do usuário, calculando-o com `builder` apenas se necessário.
+    A chave inclui a versão dos dados, então qualquer escrita do usuário invalida o valor automaticamente.
+    """
+    key = USER_CACHE_KEY.format(user_id=user_id, version=get_data_version(user_id), name=name)
+    return cache.get_or_set(key, builder, timeout)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .services import bump_data_version
+
+# Modelos cujas escritas alteram os dados financeiros vistos pelo usuário.
+VERSIONED_MODELS = [
+    'expenses.Expense',
+    'expenses.Category',
+    'incomes.Income',
+    'payments.PaymentMethod',
+]
+
+
+def bump_user_data_version(sender, instance, **kwargs):
+    """
+    Invalida os caches do usuário dono do objeto alterado.
+    A nova versão só é publicada após o commit, para que nenhum leitor grave em cache dados ainda não confirmados.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+def connect_signals():
+    for model in VERSIONED_MODELS:
+        post_save.connect(bump_user_data_version, sender=model, dispatch_uid=f'bump-data-version-save-{model}')
+        post_delete.connect(bump_user_data_version, sender=model, dispatch_uid=f'bump-data-version-delete-{model}')
@@ -1,6 +1,16 @@
+import contextlib
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from core.db_routers import _reads_from_replica, use_replica
+from expenses.models import Category, Expense
+from .exports import iter_export
 from .models import User
 
 class UserAPITests(APITestCase):
@@ -75,4 +85,70 @@ class UserAPITests(APITestCase):
         url = reverse('users:user-me')
         response = self.client.get(url)
         
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class UserExportTests(APITestCase):
+    """
+    Suite de testes para a exportação em streaming dos dados do usuário.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exportuser', password='StrongPassword123')
+        food = Category.objects.create(user=self.user, name="Alimentação")
+        Expense.objects.create(user=self.user, amount=Decimal('12.50'), description="pastel, caldo", category=food)
+        Expense.objects.create(user=self.user, amount=Decimal('30.00'), description="uber")
+        # A réplica (se configurada) é outra conexão e não enxerga a transação do teste.
+        replica_patcher = mock.patch('users.exports.use_replica', contextlib.nullcontext)
+        replica_patcher.start()
+        self.addCleanup(replica_patcher.stop)
+
+    def test_export_expenses_as_csv(self):
+        """
+        Testa se as despesas são exportadas em CSV, com cabeçalho e campos escapados.
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/users/me/export/expenses/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,transaction_date,amount,description,category,payment_method")
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"pastel, caldo",Alimentação', lines[1])
+
+    def test_export_as_ndjson_and_requires_login(self):
+        """
+        Testa se a exportação em NDJSON gera um objeto por linha e se exige autenticação.
+        """
+        response = self.client.get('/api/users/me/export/expenses/?fmt=ndjson')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/users/me/export/expenses/?fmt=ndjson')
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['amount'] for row in rows], ['12.50', '30.00'])
+
+        self.assertEqual(self.client.get('/api/users/me/export/incomes/?fmt=xml').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replica_flag_is_only_set_while_fetching_rows(self):
+        """
+        Garante que as consultas da exportação são marcadas para a réplica, mas a marca não fica ativa entre as linhas.
+        """
+        flags = []
+
+        def record_flag(execute, sql, params, many, context):
+            flags.append(_reads_from_replica.get())
+            return execute(sql, params, many, context)
+
+        without_replica = {alias: config for alias, config in settings.DATABASES.items() if alias != 'replica'}
+        with mock.patch('users.exports.use_replica', use_replica), \
+             mock.patch.dict(settings.DATABASES, without_replica, clear=True), \
+             connection.execute_wrapper(record_flag):
+            lines = []
+            for line in iter_export(self.user, 'expenses', 'csv'):
+                self.assertFalse(_reads_from_replica.get())
+                lines.append(line)
+
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(flags)
+        self.assertTrue(all(flags))
@@ -1,6 +1,8 @@
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from .exports import EXPORT_FORMATS, iter_export
 from .models import User
 from .serializers import UserSerializer
 
@@ -18,7 +20,7 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['list', 'destroy', 'update', 'partial_update']:
             self.permission_classes = [permissions.IsAdminUser]
-        elif self.action == 'me':
+        elif self.action in ['me', 'export']:
             self.permission_classes = [permissions.IsAuthenticated]
         else: # 'create'
             self.permission_classes = [permissions.AllowAny]
@@ -39,4 +41,21 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(
             {"detail": "Credenciais de autenticação não fornecidas."},
             status=status.HTTP_401_UNAUTHORIZED
-        )
\ No newline at end of file
+        )
+
+    @action(detail=False, methods=['get'], url_path=r'me/export/(?P<dataset>expenses|incomes|summaries)')
+    def export(self, request, dataset=None):
+        """
+        Exporta, em streaming, as despesas, rendas ou resumos do usuário logado em CSV ou NDJSON.
+        O formato é escolhido por `?fmt=csv` (padrão) ou `?fmt=ndjson`.
+        """
+        export_format = request.query_params.get('fmt', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Formato inválido. Use um de: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(iter_export(request.user, dataset, export_format), content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{export_format}"'
+        return response